@@ -0,0 +1,187 @@
+"""Hot/cold archival of old transactions
+
+The app mostly reads the last year of transactions, so rows dated before a
+cutoff move out of the partitioned hot table into `transactions_archive`,
+an unpartitioned, insert-only table with its own small indexes. The
+`transactions_history` view (TransactionHistory) is the union of both.
+
+Each user's rows before the cutoff move in one statement, so what is
+archived of an account is always the start of its ledger (apps.core.ledger):
+the same statement adds the archived flow to the account's opening_balance,
+which keeps the balance_after of hot rows and every ledger query over the
+hot table correct. Balance snapshots for the archived days are captured
+first, as charts fall back to the ledger only for days without one.
+
+The horizon is the date before which rows may be archived. Readers whose
+range starts before it (`transactions`, `table`) go through the view, the
+rest stay on the hot table. It is cached for HORIZON_SECONDS in the shared
+cache, and published before rows move so that no reader misses them with
+a shared cache; a per-process cache can lag by up to HORIZON_SECONDS.
+
+Writes dated before the horizon land in the hot table but can't see the
+archived balances before them; restore that range first when importing old
+statements.
+"""
+import uuid
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import snapshots
+from .ledger import SIGNED_AMOUNT
+from .models import Transaction, TransactionHistory
+
+ARCHIVE_TABLE = 'transactions_archive'
+HISTORY_VIEW = 'transactions_history'
+HORIZON_KEY = 'transactions:archive:horizon'
+HORIZON_SECONDS = 60
+ARCHIVED_ERROR = 'Transaction is archived; restore it first'
+
+# Moves rows between `source` and `target` for a chunk of users and shifts
+# their accounts' opening balances by the flow moved (sign +1 into the
+# archive, -1 out of it)
+MOVE_SQL = f"""
+WITH moved AS (
+    DELETE FROM {{source}} t
+    WHERE t.user_id = ANY(%(users)s::uuid[]) AND {{dates}}
+    RETURNING {{returning}}
+), inserted AS (
+    INSERT INTO {{target}} ({{columns}})
+    SELECT {{columns}} FROM moved
+    RETURNING account_id, type, amount
+), flows AS (
+    SELECT t.account_id, SUM({SIGNED_AMOUNT}) AS flow FROM inserted t GROUP BY t.account_id
+), shifted AS (
+    UPDATE accounts a
+    SET opening_balance = a.opening_balance + %(sign)s * flows.flow
+    FROM flows
+    WHERE a.id = flows.account_id
+)
+SELECT COUNT(*) FROM inserted
+"""
+
+COLUMNS_SQL = """
+SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+ORDER BY attnum
+"""
+
+
+def _columns():
+    return [field.column for field in Transaction._meta.concrete_fields]
+
+
+def _move(source, target, user_ids, dates, params, sign):
+    quote = connection.ops.quote_name
+    columns = [quote(column) for column in _columns()]
+    sql = MOVE_SQL.format(
+        source=source, target=target, dates=dates,
+        columns=', '.join(columns), returning=', '.join(f't.{column}' for column in columns),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'users': list(user_ids), 'sign': sign, **params})
+        return cursor.fetchone()[0]
+
+
+def _stored_horizon():
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(date) FROM {ARCHIVE_TABLE}")
+        latest = cursor.fetchone()[0]
+    return (latest + timedelta(days=1)).isoformat() if latest else ''
+
+
+def horizon():
+    """First date every transaction on or after is in the hot table; None when nothing is archived"""
+    value = cache.get(HORIZON_KEY)
+    if value is None:
+        value = _stored_horizon()
+        cache.set(HORIZON_KEY, value, HORIZON_SECONDS)
+    return date.fromisoformat(value) if value else None
+
+
+def publish_horizon(value=None):
+    """Share the horizon: `value` ahead of archiving up to it, else the stored one"""
+    cache.set(HORIZON_KEY, value.isoformat() if value else _stored_horizon(), HORIZON_SECONDS)
+
+
+def needs_history(since=None):
+    """Whether rows dated from `since` on (all rows when None) may include archived ones"""
+    edge = horizon()
+    return edge is not None and (since is None or since < edge)
+
+
+def transactions(since=None):
+    """Manager for reading rows dated from `since` on: the hot table's unless some are archived"""
+    return TransactionHistory.objects if needs_history(since) else Transaction.objects
+
+
+def table(since=None):
+    """Table or view name for raw SQL reading rows dated from `since` on"""
+    return HISTORY_VIEW if needs_history(since) else Transaction._meta.db_table
+
+
+def archived(user_id, ids):
+    """The ids among `ids` of the user's transactions that are in the archive,
+    which edits can't reach until they're restored. ValueError for an invalid id.
+    """
+    ids = [uuid.UUID(str(pk)) for pk in ids]
+    if not ids or horizon() is None:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id FROM {ARCHIVE_TABLE} WHERE user_id = %s AND id = ANY(%s)", [user_id, ids],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def archive_users(user_ids, cutoff):
+    """Move the users' transactions dated before `cutoff` to the archive, in one
+    transaction. Returns the number of rows moved.
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        oldest = (
+            Transaction.objects.filter(user_id__in=user_ids, date__lt=cutoff)
+            .order_by('date').values_list('date', flat=True).first()
+        )
+        if oldest is None:
+            return 0
+        snapshots.capture(snapshots.retained_days(oldest, cutoff - timedelta(days=1)), user_ids=user_ids)
+        return _move(Transaction._meta.db_table, ARCHIVE_TABLE, user_ids, 't.date < %(cutoff)s', {'cutoff': cutoff}, 1)
+
+
+def restore_users(user_ids, since=None):
+    """Move the users' archived transactions dated from `since` on (all when None)
+    back to the hot table. Returns the number of rows moved.
+    """
+    dates = 't.date >= %(since)s' if since else 'true'
+    with transaction.atomic():
+        return _move(ARCHIVE_TABLE, Transaction._meta.db_table, user_ids, dates, {'since': since}, -1)
+
+
+def sync_schema():
+    """Add columns the transactions table gained to the archive and rebuild the
+    history view over them. Returns the names of the columns added.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        described = {}
+        for relation in (Transaction._meta.db_table, ARCHIVE_TABLE, HISTORY_VIEW):
+            cursor.execute(COLUMNS_SQL, [relation])
+            described[relation] = cursor.fetchall()
+        hot = described[Transaction._meta.db_table]
+        if described[HISTORY_VIEW] == hot:
+            return []
+        cold = {name for name, _ in described[ARCHIVE_TABLE]}
+        added = [(name, kind) for name, kind in hot if name not in cold]
+        columns = ', '.join(quote(name) for name, _ in hot)
+        with transaction.atomic():
+            for name, kind in added:
+                cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN {quote(name)} {kind}")
+            cursor.execute(f"DROP VIEW {HISTORY_VIEW}")
+            cursor.execute(
+                f"CREATE VIEW {HISTORY_VIEW} AS SELECT {columns} FROM {Transaction._meta.db_table} "
+                f"UNION ALL SELECT {columns} FROM {ARCHIVE_TABLE}"
+            )
+    return [name for name, _ in added]
@@ -0,0 +1,71 @@
+"""Async support for DRF views
+
+DRF's APIView only dispatches synchronously. AsyncAPIView runs the usual
+authentication/permission/throttle checks in a worker thread and awaits
+coroutine handlers, so read-heavy views can issue independent queries
+concurrently with `gather_queries` instead of one after another.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework import views
+
+
+def _run_query(query):
+    close_old_connections()
+    try:
+        return query()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(*queries):
+    """Run blocking ORM callables concurrently and return their results in order.
+
+    Each callable runs on its own thread and therefore its own database
+    connection, so they must not depend on each other or on an open transaction.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_run_query, thread_sensitive=False)(query) for query in queries
+    ))
+
+
+class AsyncAPIView(views.APIView):
+    """APIView whose HTTP handlers are `async def`"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication touches the database, so it runs on the sync thread
+            await sync_to_async(self._initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def _initial(self, request, *args, **kwargs):
+        try:
+            self.initial(request, *args, **kwargs)
+        finally:
+            # Hand the connection back before awaiting queries that need their
+            # own; holding it here can exhaust a connection pool under load
+            close_old_connections()
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
@@ -1,10 +1,28 @@
 """Auth0 JWT Authentication for Django REST Framework"""
+import threading
+
 import jwt
 import requests
 from django.conf import settings
 from rest_framework import authentication, exceptions
 from .models import User
 
+_jwks_lock = threading.Lock()
+_jwks_client = None
+
+
+def jwks_client():
+    """The process's Auth0 JWKS client. DRF builds authenticators per request,
+    so the client, and the key set it caches, must outlive them.
+    """
+    global _jwks_client
+    with _jwks_lock:
+        if _jwks_client is None:
+            _jwks_client = jwt.PyJWKClient(
+                f'https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json', timeout=settings.AUTH0_JWKS_TIMEOUT,
+            )
+        return _jwks_client
+
 
 class DevAuthentication(authentication.BaseAuthentication):
     """
@@ -34,14 +52,8 @@ class DevAuthentication(authentication.BaseAuthentication):
 class Auth0JWTAuthentication(authentication.BaseAuthentication):
     """Authenticate requests using Auth0 JWT tokens"""
     
-    def __init__(self):
-        self.jwks_client = None
-    
     def get_jwks_client(self):
-        if not self.jwks_client:
-            jwks_url = f'https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json'
-            self.jwks_client = jwt.PyJWKClient(jwks_url)
-        return self.jwks_client
+        return jwks_client()
     
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
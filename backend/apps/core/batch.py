@@ -0,0 +1,132 @@
+"""Batched transaction mutations
+
+A batch is a list of create, update and delete operations from one client.
+`validate` checks every operation, including ownership of the transactions
+and accounts it names with one query per kind, and of categories against the
+category catalog. `apply` then
+writes the batch with a single bulk_create, bulk_update and DELETE inside one
+database transaction, so either every operation lands or none does.
+"""
+from django.db import transaction
+
+from . import archive, catalog, columnar, ledger, merchants
+from .models import Account, Transaction
+from .serializers import TransactionCreateSerializer, TransactionUpdateSerializer
+
+MAX_OPERATIONS = 500
+OPERATIONS = ('create', 'update', 'delete')
+
+
+def _parse(operation):
+    """(op, id, validated data, errors) for one raw operation"""
+    if not isinstance(operation, dict):
+        return None, None, None, {'op': ['Expected an object']}
+    op, pk, data = operation.get('op'), operation.get('id'), None
+    if op not in OPERATIONS:
+        return op, pk, None, {'op': [f'Must be one of: {", ".join(OPERATIONS)}']}
+    if op in ('update', 'delete'):
+        try:
+            pk = Transaction._meta.pk.to_python(pk)
+        except Exception:
+            pk = None
+        if pk is None:
+            return op, None, None, {'id': ['A valid transaction id is required']}
+    if op == 'delete':
+        return op, pk, None, {}
+    serializer_class = TransactionCreateSerializer if op == 'create' else TransactionUpdateSerializer
+    serializer = serializer_class(data=operation.get('data'))
+    if not serializer.is_valid():
+        return op, pk, None, serializer.errors
+    return op, pk, serializer.validated_data, {}
+
+
+def validate(user, operations):
+    """Parse a batch for `user`.
+
+    Returns (parsed, errors): parsed is a list of (op, id, data) in request
+    order, errors a list of {'index', 'op', 'errors'} for the invalid ones.
+    """
+    parsed, errors = [], []
+    for index, operation in enumerate(operations):
+        op, pk, data, problems = _parse(operation)
+        parsed.append((op, pk, data))
+        if problems:
+            errors.append({'index': index, 'op': op, 'errors': problems})
+    if errors:
+        return parsed, errors
+
+    targets = [pk for op, pk, _ in parsed if op != 'create']
+    accounts = {data['account_id'] for op, _, data in parsed if op == 'create'}
+
+    owned = set(Transaction.objects.filter(user=user, id__in=targets).values_list('id', flat=True)) if targets else set()
+    archived = archive.archived(user.id, set(targets) - owned)
+    own_accounts = set(Account.objects.filter(user=user, id__in=accounts).values_list('id', flat=True)) if accounts else set()
+    usable = catalog.for_user(user.id).by_id
+
+    seen = set()
+    for index, (op, pk, data) in enumerate(parsed):
+        problems = {}
+        if pk is not None:
+            if pk in archived:
+                problems['id'] = [archive.ARCHIVED_ERROR]
+            elif pk not in owned:
+                problems['id'] = ['Not found']
+            elif pk in seen:
+                problems['id'] = ['Transaction appears more than once in this batch']
+            seen.add(pk)
+        if op == 'create' and data['account_id'] not in own_accounts:
+            problems['account_id'] = ['Not found']
+        if data and data.get('category_id') and data['category_id'] not in usable:
+            problems['category_id'] = ['Not found']
+        if problems:
+            errors.append({'index': index, 'op': op, 'errors': problems})
+    return parsed, errors
+
+
+def apply(user, parsed):
+    """Write a validated batch. Returns per-operation results in request order.
+
+    Created and updated results carry the stored transaction; the caller
+    serializes them.
+    """
+    creates = {}
+    updates = {pk: data for op, pk, data in parsed if op == 'update'}
+    deletes = [pk for op, pk, _ in parsed if op == 'delete']
+
+    with transaction.atomic():
+        for index, (op, _, data) in enumerate(parsed):
+            if op == 'create':
+                creates[index] = Transaction(user=user, **data)
+        Transaction.objects.bulk_create(merchants.attach(creates.values()))
+
+        if updates:
+            txns = list(Transaction.objects.filter(user=user, id__in=updates))
+            fields = set()
+            for txn in txns:
+                for field, value in updates[txn.pk].items():
+                    setattr(txn, field, value)
+                    fields.add(field)
+            Transaction.objects.bulk_update(txns, sorted(fields))
+
+        changed = []
+        if deletes:
+            doomed = Transaction.objects.filter(user=user, id__in=deletes)
+            changed = list(doomed.values_list('account_id', 'date'))
+            doomed.delete()
+        if updates or deletes:
+            columnar.reset(user.id)
+        # Edits can't touch amount, type or date, so only creates and deletes move balances
+        ledger.recompute(changed + [(txn.account_id, txn.date) for txn in creates.values()])
+
+    written = [txn.pk for txn in creates.values()] + list(updates)
+    stored = Transaction.objects.in_bulk(written) if written else {}
+
+    results = []
+    for index, (op, pk, _) in enumerate(parsed):
+        if op == 'create':
+            results.append({'index': index, 'op': op, 'id': creates[index].pk, 'transaction': stored[creates[index].pk]})
+        elif op == 'update':
+            results.append({'index': index, 'op': op, 'id': pk, 'transaction': stored[pk]})
+        else:
+            results.append({'index': index, 'op': op, 'id': pk})
+    return results
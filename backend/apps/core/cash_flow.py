@@ -0,0 +1,37 @@
+"""Income and expenses per month or year
+
+The whole window is one grouped query with conditional sums, converted to
+the report currency, rather than two aggregates per period.
+"""
+from datetime import date
+
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+
+from . import archive, fx
+from .dates import add_months, month_start
+
+
+def periods(period, today):
+    """(period starts oldest first, end, truncation, label for a start): the
+    last 5 years for 'yearly', else the last 6 months
+    """
+    if period == 'yearly':
+        starts = [date(today.year - i, 1, 1) for i in range(4, -1, -1)]
+        return starts, date(today.year + 1, 1, 1), TruncYear('date'), lambda start: str(start.year)
+    current = month_start(today)
+    starts = [add_months(current, -i) for i in range(5, -1, -1)]
+    return starts, add_months(current, 1), TruncMonth('date'), lambda start: start.strftime('%b')
+
+
+def totals(user_id, currency, starts, end, trunc):
+    """Income and expenses per period in `currency`, one row per period with any"""
+    amount = fx.converted(currency)
+    return archive.transactions(starts[0]).filter(
+        user_id=user_id,
+        date__gte=starts[0],
+        date__lt=end
+    ).annotate(period=trunc).values('period').annotate(
+        income=Sum(amount, filter=Q(type='credit')),
+        expenses=Sum(amount, filter=Q(type='debit')),
+    ).order_by()
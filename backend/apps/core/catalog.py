@@ -0,0 +1,141 @@
+"""Per-process category catalog
+
+Most responses name categories: the list view returns the system set plus
+the user's own, and transaction, budget, rule and recurring payloads carry
+each row's category name, icon or color. System categories only change when
+seeds run and a user's own only through the category endpoints, so each
+process keeps them in memory: the system set, and the overlays of the
+MAX_USERS most recently seen users on top of it.
+
+Freshness is by version key in the shared cache. Writers call `changed`,
+which stamps a new version for the owner once their transaction commits;
+every lookup reads the current versions in one cache round trip and reloads
+only the parts that went stale, from the primary, so a lagging replica can't
+be cached under the new version. An overlay is also tied to the system
+version it was built on, as moving or deleting a system category re-paths
+the user categories below it.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Category
+
+MAX_USERS = 1000
+SYSTEM = 'system'
+
+_lock = threading.Lock()
+_system = {'version': None, 'catalog': None}
+_users = OrderedDict()  # user id -> (system version, user version, Catalog)
+
+
+@dataclass(frozen=True)
+class Entry:
+    """The parts of a Category that responses show"""
+    id: uuid.UUID
+    name: str
+    icon: str
+    color: str
+    is_system: bool
+    parent_id: Optional[uuid.UUID]
+    path: str
+
+
+FIELDS = tuple(Entry.__dataclass_fields__)
+
+
+class Catalog:
+    """Categories in display order, indexed by id and by name (first wins)"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_id = {entry.id: entry for entry in entries}
+        self.by_name = {}
+        for entry in entries:
+            self.by_name.setdefault(entry.name, entry)
+
+    def get(self, category_id):
+        """Entry for a UUID or its string form; None when unknown or malformed"""
+        if category_id is None:
+            return None
+        if not isinstance(category_id, uuid.UUID):
+            try:
+                category_id = uuid.UUID(str(category_id))
+            except ValueError:
+                return None
+        return self.by_id.get(category_id)
+
+
+def _key(owner):
+    return f'categories:version:{owner}'
+
+
+def _versions(*owners):
+    """Current shared versions for the owners; None when the cache can't hold one"""
+    keys = [_key(owner) for owner in owners]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Never written or evicted: let the first process to ask pick one for all
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _load(**filters):
+    rows = (
+        Category.objects.using(DEFAULT_DB_ALIAS).filter(**filters)
+        .order_by('created_at', 'id').values_list(*FIELDS)
+    )
+    return [Entry(*row) for row in rows]
+
+
+def _system_catalog(version):
+    with _lock:
+        if version is None or _system['version'] != version:
+            _system.update(version=version, catalog=Catalog(_load(is_system=True)))
+        return _system['catalog']
+
+
+def system():
+    """Catalog of the system categories"""
+    version, = _versions(SYSTEM)
+    return _system_catalog(version)
+
+
+def for_user(user_id):
+    """Catalog of the categories `user_id` can use: the system ones, then their own"""
+    system_version, user_version = _versions(SYSTEM, user_id)
+    base = _system_catalog(system_version)
+    versions = (system_version, user_version)
+    with _lock:
+        cached = _users.get(user_id)
+        if cached and None not in versions and cached[:2] == versions:
+            _users.move_to_end(user_id)
+            return cached[2]
+    catalog = Catalog(base.entries + _load(user_id=user_id, is_system=False))
+    with _lock:
+        _users[user_id] = (*versions, catalog)
+        _users.move_to_end(user_id)
+        while len(_users) > MAX_USERS:
+            _users.popitem(last=False)
+    return catalog
+
+
+def changed(user_id=None):
+    """Invalidate the system categories, or one user's, in every process once
+    the current transaction (if any) commits
+    """
+    key = _key(SYSTEM if user_id is None else user_id)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def clear_cache():
+    with _lock:
+        _system.update(version=None, catalog=None)
+        _users.clear()
@@ -0,0 +1,50 @@
+"""Category tree helpers
+
+Category.path lists the ids from a category's root down to itself, each
+followed by '/'. Database triggers (migration 0008) derive it from the parent
+on insert, re-parenting and parent deletion, so it is always current in the
+database; an instance created in this process holds '' until refreshed.
+
+A category's subtree is every row whose path starts with its path, and its
+root is the first id in the path, so rolling spend up the tree is a prefix
+filter in SQL, or a prefix check against catalog paths for totals already
+grouped by category, rather than a recursive query.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Q
+
+ID_LENGTH = 36
+
+
+def in_subtree(path, field='category__path'):
+    """Filter for rows whose category is the one at `path` or below it"""
+    return Q(**{f'{field}__startswith': path})
+
+
+def root_id(path):
+    """Root category id (as text) of the category at `path`"""
+    return path[:ID_LENGTH]
+
+
+def roll_up(totals, known):
+    """[(root catalog.Entry or None, total)] from {category_id: total}, largest first.
+
+    `known` is the owner's catalog.Catalog; uncategorized totals come back under None.
+    """
+    rolled = defaultdict(Decimal)
+    for category_id, total in totals.items():
+        entry = known.get(category_id)
+        rolled[known.get(root_id(entry.path)) if entry else None] += total
+    return sorted(rolled.items(), key=lambda item: item[1], reverse=True)
+
+
+def subtree_total(totals, known, path):
+    """Sum of {category_id: total} over the category at `path` and those below it"""
+    total = Decimal(0)
+    for category_id, amount in totals.items():
+        entry = known.get(category_id)
+        if entry and entry.path.startswith(path):
+            total += amount
+    return total
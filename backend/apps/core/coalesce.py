@@ -0,0 +1,185 @@
+"""Single-flight coalescing for expensive report responses
+
+Identical report requests arriving together (several devices opening the
+app, a frontend firing twice) share one computation. A request is identified
+by user, endpoint, parameters, today's date and the user's data version,
+which every successful write request bumps, so a shared result never
+predates the user's last change.
+
+Within a worker, callers join the computation already in flight. Across
+workers the shared cache (REDIS_URL, required in production) arbitrates:
+the first takes a lease and publishes its result for
+REPORT_COALESCE_RESULT_SECONDS, the rest poll for it and compute themselves
+if the lease holder fails or takes longer than REPORT_COALESCE_WAIT_SECONDS.
+Data versions live there too, so a write in any process retires results in
+all of them. When the cache is the per-process locmem one (runserver without
+REDIS_URL) only the in-worker half applies, and `cross_worker()` says so.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+POLL_SECONDS = 0.05
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+_lock = threading.Lock()
+_inflight = {}
+_stats = {'computed': 0, 'joined_in_process': 0, 'joined_across_workers': 0}
+_FAILED = object()
+
+
+def cross_worker():
+    """Whether results are shared beyond this process"""
+    return settings.CACHES['default']['BACKEND'] != LOCAL_CACHE
+
+
+def _version_key(user_id):
+    return f'coalesce:version:{user_id}'
+
+
+def data_changed(user_id):
+    """Retire results shared for the user; writes outside a request must call this"""
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def data_versions(user_ids):
+    """{user_id: current data version}, for other caches keyed on it"""
+    keys = {user_id: _version_key(user_id) for user_id in user_ids}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for user_id, key in keys.items():
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        versions[user_id] = found[key]
+    return versions
+
+
+async def _data_version(user_id):
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def stats():
+    """Computations run and joined by this worker since it started"""
+    with _lock:
+        counts = dict(_stats)
+    counts['saved'] = counts['joined_in_process'] + counts['joined_across_workers']
+    counts['cross_worker'] = cross_worker()
+    return counts
+
+
+async def _compute_shared(key, compute):
+    """Run `compute` unless another worker is, or just did"""
+    if not cross_worker():
+        _count('computed')
+        return await compute()
+    result_key, lease_key = f'{key}:result', f'{key}:lease'
+    result = await cache.aget(result_key)
+    if result is not None:
+        _count('joined_across_workers')
+        return result
+
+    wait = settings.REPORT_COALESCE_WAIT_SECONDS
+    if not await cache.aadd(lease_key, True, wait):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_SECONDS)
+            result = await cache.aget(result_key)
+            if result is not None:
+                _count('joined_across_workers')
+                return result
+            if not await cache.aget(lease_key):
+                break
+        # The holder failed or is too slow: compute without it
+        _count('computed')
+        return await compute()
+
+    try:
+        result = await compute()
+        _count('computed')
+        await cache.aset(result_key, result, settings.REPORT_COALESCE_RESULT_SECONDS)
+        return result
+    finally:
+        await cache.adelete(lease_key)
+
+
+async def shared(user_id, endpoint, params, compute):
+    """Result of `await compute()` for this user, endpoint and params, shared with
+    identical concurrent requests. The result must be picklable.
+    """
+    version = await _data_version(user_id)
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+    key = f'coalesce:{endpoint}:{user_id}:{version}:{date.today().isoformat()}:{digest}'
+
+    with _lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = Future()
+
+    if not leader:
+        # A Future from concurrent.futures can be awaited from any event loop
+        result = await asyncio.wrap_future(flight)
+        if result is not _FAILED:
+            _count('joined_in_process')
+            return result
+        _count('computed')
+        return await compute()
+
+    try:
+        result = await _compute_shared(key, compute)
+    except BaseException:
+        flight.set_result(_FAILED)
+        raise
+    else:
+        flight.set_result(result)
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+    return result
+
+
+def _note_write(request, response):
+    user = getattr(request, 'user', None)
+    if (
+        request.method not in SAFE_METHODS
+        and response.status_code < 400
+        and user is not None
+        and user.is_authenticated
+    ):
+        data_changed(user.pk)
+
+
+@sync_and_async_middleware
+def DataVersionMiddleware(get_response):
+    """Bump the user's data version after any successful write request"""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            _note_write(request, response)
+            return response
+    else:
+        def middleware(request):
+            response = get_response(request)
+            _note_write(request, response)
+            return response
+    return middleware
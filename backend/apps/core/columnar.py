@@ -0,0 +1,329 @@
+"""Per-user columnar transaction cache for analytics
+
+Trends and insights only need each transaction's day, amount, category and
+type, so rather than pulling history through the ORM every time, those four
+columns are kept per user as NumPy arrays in `.npy` files under
+ANALYTICS_CACHE_DIR and memory-mapped on use:
+
+- day: date ordinals (int32)
+- cents: amounts in minor units (int64)
+- category: index into the user's `categories`, -1 when uncategorized (int32)
+- type: DEBIT or CREDIT (int8)
+
+Files are rebuilt incrementally. A user's directory holds `meta.json` and
+one generation directory of arrays it points to; a refresh appends the rows
+created after the watermark (the latest created_at seen), writes a new
+generation and swaps meta.json in atomically, so readers holding the old
+maps are unaffected. Rows are re-read from WATERMARK_LAG before the
+watermark and deduplicated against the ids seen there, in case a slower
+transaction commits rows stamped earlier than ones already read.
+
+Nothing is queried while the user's data version (apps.core.coalesce) is
+the one the files were built at. Appends are not the only writes, though:
+code that re-categorizes or deletes transactions calls `reset`, and the next
+use rebuilds the user's files from scratch. Both tokens live in the shared
+Django cache, so a write in any worker or job is seen by every process
+using the same files. Each process also keeps the maps of the MAX_USERS
+most recently used users open.
+
+Refreshes hold an exclusive lock on the users' files (one of LOCK_STRIPES
+lock files), and re-read meta.json under it: a process that finds another
+one has just refreshed a user maps those files rather than querying and
+writing its own, and never removes a generation another one is writing.
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import archive, coalesce
+
+FORMAT = 1
+MAX_USERS = 1000
+WATERMARK_LAG = timedelta(minutes=5)
+DEBIT, CREDIT = 0, 1
+DTYPES = {'day': np.int32, 'cents': np.int64, 'category': np.int32, 'type': np.int8}
+EPOCH = date(1970, 1, 1).toordinal()
+LOCK_STRIPES = 64
+
+_lock = threading.Lock()
+_open = OrderedDict()  # user id -> (reset token, data version, Columns)
+
+
+@dataclass(frozen=True)
+class Columns:
+    """One user's transactions as parallel arrays, in no particular order"""
+    day: np.ndarray
+    cents: np.ndarray
+    category: np.ndarray
+    type: np.ndarray
+    categories: tuple  # category UUIDs, by index
+
+    def category_id(self, index):
+        return self.categories[index] if index >= 0 else None
+
+
+def months(days):
+    """Month of each date ordinal in `days`, counted from 1970-01 like `month_index`"""
+    return (np.asarray(days, dtype=np.int64) - EPOCH).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def month_index(day):
+    """A date's month counted from 1970-01"""
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def _reset_key(user_id):
+    return f'columnar:reset:{user_id}'
+
+
+def reset(user_id):
+    """Rebuild the user's columns from scratch on next use, in every process, once
+    the current transaction (if any) commits. For writes other than inserts.
+    """
+    key = _reset_key(user_id)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def _resets(user_ids):
+    keys = {user_id: _reset_key(user_id) for user_id in user_ids}
+    found = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return {user_id: found[key] for user_id, key in keys.items()}
+
+
+def _user_dir(user_id):
+    return Path(settings.ANALYTICS_CACHE_DIR) / str(user_id)
+
+
+@contextmanager
+def _locked(user_ids):
+    """Hold the file locks of the users' stripes, taken in order, across processes"""
+    directory = Path(settings.ANALYTICS_CACHE_DIR) / '.locks'
+    directory.mkdir(parents=True, exist_ok=True)
+    stripes = sorted({zlib.crc32(str(user_id).encode()) % LOCK_STRIPES for user_id in user_ids})
+    with ExitStack() as stack:
+        for stripe in stripes:
+            f = stack.enter_context(open(directory / str(stripe), 'a'))
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _read_meta(user_id):
+    try:
+        meta = json.loads((_user_dir(user_id) / 'meta.json').read_text())
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('format') == FORMAT else None
+
+
+def _map(user_id, meta):
+    """Columns for `meta`, memory-mapped; None when its generation has gone"""
+    directory = _user_dir(user_id) / meta['generation']
+    arrays = {}
+    for name, dtype in DTYPES.items():
+        if not meta['count']:
+            arrays[name] = np.empty(0, dtype=dtype)
+            continue
+        try:
+            arrays[name] = np.load(directory / f'{name}.npy', mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+    return Columns(categories=tuple(uuid.UUID(pk) for pk in meta['categories']), **arrays)
+
+
+def _write_meta(user_id, meta):
+    directory = _user_dir(user_id)
+    staged = directory / f'meta.{uuid.uuid4().hex}.json'
+    staged.write_text(json.dumps({**meta, 'format': FORMAT}))
+    os.replace(staged, directory / 'meta.json')
+    return meta
+
+
+def _write(user_id, meta, arrays):
+    """Store a new generation of arrays and point meta.json at it"""
+    directory = _user_dir(user_id)
+    generation = uuid.uuid4().hex
+    (directory / generation).mkdir(parents=True)
+    for name, values in arrays.items():
+        np.save(directory / generation / f'{name}.npy', values)
+    meta = _write_meta(user_id, {**meta, 'generation': generation, 'count': len(arrays['day'])})
+    # Maps already open keep working after their files are unlinked
+    for stale in directory.iterdir():
+        if stale.is_dir() and stale.name != generation:
+            shutil.rmtree(stale, ignore_errors=True)
+    return meta
+
+
+def _refresh(user_id, meta, rows, reset_token, version):
+    """Map `meta`'s columns (fresh ones when None) plus `rows`, writing what changed.
+    None when `meta`'s generation has gone.
+    """
+    if meta is None:
+        meta = {'categories': [], 'watermark': None, 'tail': [], 'generation': None, 'count': 0}
+        current = {name: np.empty(0, dtype=dtype) for name, dtype in DTYPES.items()}
+    else:
+        columns = _map(user_id, meta)
+        if columns is None:
+            return None
+        current = {name: getattr(columns, name) for name in DTYPES}
+    seen = {pk for pk, _ in meta['tail']}
+    categories = list(meta['categories'])
+    index = {pk: i for i, pk in enumerate(categories)}
+    tail = [(pk, datetime.fromisoformat(created)) for pk, created in meta['tail']]
+    # Rows read for a batch can start before this user's own re-read window
+    floor = datetime.fromisoformat(meta['watermark']) - WATERMARK_LAG if meta['watermark'] else None
+
+    added = {name: [] for name in DTYPES}
+    for _, pk, day, amount, txn_type, category_id, created_at in rows:
+        pk = str(pk)
+        if pk in seen or (floor and created_at <= floor):
+            continue
+        seen.add(pk)
+        tail.append((pk, created_at))
+        category = str(category_id) if category_id else None
+        if category is not None and category not in index:
+            index[category] = len(categories)
+            categories.append(category)
+        added['day'].append(day.toordinal())
+        added['cents'].append(int(amount * 100))
+        added['category'].append(index[category] if category is not None else -1)
+        added['type'].append(CREDIT if txn_type == 'credit' else DEBIT)
+
+    watermark = max((created for _, created in tail), default=None)
+    meta = {
+        **meta,
+        'reset': reset_token,
+        'version': version,
+        'categories': categories,
+        'watermark': watermark.isoformat() if watermark else None,
+        'tail': [(pk, created.isoformat()) for pk, created in tail if created > watermark - WATERMARK_LAG],
+    }
+    _user_dir(user_id).mkdir(parents=True, exist_ok=True)
+    if added['day'] or meta['generation'] is None:
+        meta = _write(user_id, meta, {
+            name: np.concatenate([current[name], np.asarray(added[name], dtype=dtype)])
+            for name, dtype in DTYPES.items()
+        })
+    else:
+        # Nothing new: only record that the files are current for this version
+        _write_meta(user_id, meta)
+    return _map(user_id, meta)
+
+
+def _rows(user_ids, since=None):
+    """(user_id, rows) for the users' transactions, archived ones included, created after `since`"""
+    rows = archive.transactions().using(DEFAULT_DB_ALIAS).filter(user_id__in=user_ids)
+    if since is not None:
+        rows = rows.filter(created_at__gt=since)
+    rows = (
+        rows.order_by('user_id')
+        .values_list('user_id', 'id', 'date', 'amount', 'type', 'category_id', 'created_at')
+        .iterator(chunk_size=5000)
+    )
+    for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+        yield user_id, user_rows
+
+
+def _remember(user_id, reset_token, version, columns):
+    with _lock:
+        _open[user_id] = (reset_token, version, columns)
+        _open.move_to_end(user_id)
+        while len(_open) > MAX_USERS:
+            _open.popitem(last=False)
+
+
+def _current(user_id, reset_token, version):
+    """Open columns for the user if their files are current, else the meta.json
+    to append to (None to rebuild from scratch)
+    """
+    meta = _read_meta(user_id)
+    # A user with no transactions has no watermark but still has a generation
+    if meta is None or meta['reset'] != reset_token or meta['generation'] is None:
+        return None, None
+    columns = _map(user_id, meta) if meta['version'] == version else None
+    if columns is not None:
+        _remember(user_id, reset_token, version, columns)
+    return columns, meta
+
+
+def load_many(user_ids):
+    """{user_id: Columns} for the users, refreshing stale files with at most three
+    queries (four if another process swaps files mid-refresh)
+    """
+    user_ids = list(user_ids)
+    resets, versions = _resets(user_ids), coalesce.data_versions(user_ids)
+    loaded, stale = {}, []
+    for user_id in user_ids:
+        with _lock:
+            cached = _open.get(user_id)
+            if cached and cached[:2] == (resets[user_id], versions[user_id]):
+                _open.move_to_end(user_id)
+                loaded[user_id] = cached[2]
+                continue
+        columns, _ = _current(user_id, resets[user_id], versions[user_id])
+        if columns is not None:
+            loaded[user_id] = columns
+        else:
+            stale.append(user_id)
+    if not stale:
+        return loaded
+
+    def refresh(batch, metas, since):
+        for user_id, rows in _rows(batch, since):
+            loaded[user_id] = _refresh(user_id, metas.get(user_id), rows, resets[user_id], versions[user_id])
+        for user_id in batch:
+            if user_id not in loaded:
+                loaded[user_id] = _refresh(user_id, metas.get(user_id), (), resets[user_id], versions[user_id])
+
+    with _locked(stale):
+        appended, rebuilt = {}, []
+        for user_id in stale:
+            # Another process may have refreshed them while this one waited
+            columns, meta = _current(user_id, resets[user_id], versions[user_id])
+            if columns is not None:
+                loaded[user_id] = columns
+            elif meta is not None:
+                appended[user_id] = meta
+            else:
+                rebuilt.append(user_id)
+        marked = {user_id: meta for user_id, meta in appended.items() if meta['watermark']}
+        if marked:
+            since = min(datetime.fromisoformat(meta['watermark']) for meta in marked.values()) - WATERMARK_LAG
+            refresh(list(marked), marked, since)
+        # Users who had no transactions yet: whatever they have now is new
+        unmarked = {user_id: meta for user_id, meta in appended.items() if not meta['watermark']}
+        if unmarked:
+            refresh(list(unmarked), unmarked, None)
+        # Rebuild from scratch where there was nothing usable, or the files went away mid-append
+        rebuilt += [user_id for user_id in appended if loaded[user_id] is None]
+        for user_id in rebuilt:
+            loaded.pop(user_id, None)
+        if rebuilt:
+            refresh(rebuilt, {}, None)
+
+    for user_id in appended.keys() | set(rebuilt):
+        _remember(user_id, resets[user_id], versions[user_id], loaded[user_id])
+    return {user_id: loaded[user_id] for user_id in user_ids}
+
+
+def load(user_id):
+    """Columns for one user, see `load_many`"""
+    return load_many([user_id])[user_id]
@@ -0,0 +1,18 @@
+"""Calendar helpers shared by reports, partitions and jobs"""
+from datetime import date
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    """First day of the month `months` away from `day`'s month"""
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(year, month):
+    """Half-open [start, end) range covering a calendar month"""
+    start = date(year, month, 1)
+    return start, add_months(start, 1)
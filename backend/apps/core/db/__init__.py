@@ -0,0 +1,6 @@
+"""PostgreSQL backend with a psycopg 3 connection pool
+
+Use ENGINE 'apps.core.db' and OPTIONS['pool'] = True or a dict of
+psycopg_pool.ConnectionPool arguments (min_size, max_size, max_lifetime,
+max_idle, timeout). This mirrors the built-in pool option of Django 5.1.
+"""
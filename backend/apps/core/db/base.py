@@ -0,0 +1,143 @@
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+from django.utils.asyncio import async_unsafe
+
+# One pool per database alias per process, shared by every thread's wrapper
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A forked child (e.g. a ProcessPoolExecutor worker) must not reuse the
+    # parent's sockets or wait on its worker threads; psycopg leaves them open
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pool_metrics():
+    """Wait time and saturation of this process's pools, keyed by alias.
+
+    Counters are cumulative since the pool opened. `saturation` is the share
+    of max_size checked out right now; `requests_waiting` > 0 means requests
+    are queueing for a connection.
+    """
+    metrics = {}
+    for alias, pool in list(_pools.items()):
+        stats = pool.get_stats()
+        in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+        requests = stats.get('requests_num', 0)
+        metrics[alias] = {
+            **stats,
+            'in_use': in_use,
+            'saturation': round(in_use / pool.max_size, 3),
+            'avg_wait_ms': round(stats.get('requests_wait_ms', 0) / requests, 3) if requests else 0.0,
+        }
+    return metrics
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    # Pools keep connections to the database NAME named when they opened, so
+    # drop them when the test runner switches to the test database and back
+    def create_test_db(self, *args, **kwargs):
+        close_pools()
+        return super().create_test_db(*args, **kwargs)
+
+    def destroy_test_db(self, *args, **kwargs):
+        close_pools()
+        return super().destroy_test_db(*args, **kwargs)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        return {} if options is True else dict(options)
+
+    @property
+    def pool(self):
+        options = self.pool_options
+        if options is None:
+            return None
+        pool = _pools.get(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(self.alias) or self._create_pool(options)
+                _pools[self.alias] = pool
+        return pool
+
+    def _create_pool(self, options):
+        if not is_psycopg3:
+            raise ImproperlyConfigured('Connection pooling requires psycopg 3.')
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured('Set CONN_MAX_AGE to 0 when pooling; the pool owns connection lifetime.')
+        from psycopg import sql
+        from psycopg_pool import ConnectionPool
+
+        timezone_name = self.timezone_name
+        role = self.settings_dict['OPTIONS'].get('assume_role')
+
+        def configure(connection):
+            # Runs once per physical connection and must leave it idle
+            if timezone_name and connection.info.parameter_status('TimeZone') != timezone_name:
+                connection.execute(sql.SQL('SET TIME ZONE {}').format(sql.Literal(timezone_name)))
+            if role:
+                connection.execute(sql.SQL('SET ROLE {}').format(sql.Literal(role)))
+            if not connection.autocommit:
+                connection.commit()
+
+        return ConnectionPool(
+            kwargs=self.get_connection_params(),
+            configure=configure,
+            check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+            name=self.alias,
+            open=True,
+            **options,
+        )
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        # 'pool' is ours, not a libpq connection parameter
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.getconn()
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is None:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            self.isolation_level = IsolationLevel(isolation_level)
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Return the connection to the pool it came from, then forget it
+            self.connection._pool.putconn(self.connection)
+            self.connection = None
@@ -0,0 +1,159 @@
+"""Read-replica routing
+
+Views opt in with ReplicaReadMixin. Their GET/HEAD handlers read from a
+replica chosen at random among those lagging at most REPLICA_MAX_LAG seconds;
+with none healthy they read from the primary. A user who wrote in the last
+REPLICA_STICKY_SECONDS reads from the primary too, so they see their own
+changes whichever worker answers: the write is noted in the shared cache and
+in a signed cookie on the response, and either one pins the reads. Every
+write, and every read outside an opted-in view, uses the primary.
+"""
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+# Alias for ORM reads in the current request; None means the primary. A
+# ContextVar follows the request into sync_to_async and gather_queries threads.
+_read_alias = ContextVar('replica_read_alias', default=None)
+_lag_cache = {}
+
+STICKY_COOKIE = 'primary_reads'
+STICKY_SALT = 'apps.core.db.replicas'
+
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def replica_lag(alias, max_age=None):
+    """Seconds `alias` is behind the primary, or None if it can't be queried.
+
+    Results are cached per process for REPLICA_LAG_CHECK_INTERVAL seconds.
+    A simulated replica adds its SIMULATED_LAG setting.
+    """
+    max_age = settings.REPLICA_LAG_CHECK_INTERVAL if max_age is None else max_age
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < max_age:
+        return cached[1]
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0]) + connections[alias].settings_dict.get('SIMULATED_LAG', 0)
+    except DatabaseError:
+        lag = None
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    healthy = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            healthy.append(alias)
+    return healthy
+
+
+def _sticky_key(user_id):
+    return f'replica:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for the next REPLICA_STICKY_SECONDS"""
+    cache.set(_sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def _pinned_by_cookie(request, user):
+    value = request.get_signed_cookie(
+        STICKY_COOKIE, default=None, salt=STICKY_SALT, max_age=settings.REPLICA_STICKY_SECONDS,
+    )
+    return value == str(user.pk)
+
+
+def read_alias_for(request):
+    user = request.user
+    if not settings.DATABASE_REPLICAS or not user.is_authenticated:
+        return DEFAULT_DB_ALIAS
+    if _pinned_by_cookie(request, user) or cache.get(_sticky_key(user.pk)):
+        return DEFAULT_DB_ALIAS
+    healthy = healthy_replicas()
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaReadMixin:
+    """Serve this view's safe-method reads from a replica when one is fresh enough"""
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication reads the user from the primary
+        _read_alias.set(None)
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            alias = read_alias_for(request)
+            _read_alias.set(alias if alias != DEFAULT_DB_ALIAS else None)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _read_alias.set(None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _note_write(request, response):
+    user = getattr(request, 'user', None)
+    if (
+        settings.DATABASE_REPLICAS
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+        and user is not None
+        and user.is_authenticated
+    ):
+        pin_to_primary(user.pk)
+        response.set_signed_cookie(
+            STICKY_COOKIE, str(user.pk), salt=STICKY_SALT, max_age=settings.REPLICA_STICKY_SECONDS,
+            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+        )
+
+
+@sync_and_async_middleware
+def ReplicaStickinessMiddleware(get_response):
+    """Pin a user's reads to the primary after any successful write request.
+
+    DRF sets request.user on the underlying HttpRequest when it authenticates,
+    so it is available here once the view has run.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            _note_write(request, response)
+            return response
+    else:
+        def middleware(request):
+            response = get_response(request)
+            _note_write(request, response)
+            return response
+    return middleware
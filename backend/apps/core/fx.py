@@ -0,0 +1,195 @@
+"""Currency conversion for report aggregates
+
+Rates are stored against FX_BASE_CURRENCY (units of quote per one base), so
+an amount converts from `source` to `target` as amount * rate(target) / rate(source).
+Conversion happens in SQL: dated rows use the latest rate on or before their
+date inside the aggregate, current balances use today's rates from a
+per-process cache. Rows already in the target currency are left untouched.
+A date outside the loaded rates uses the nearest one, but a currency with no
+rates at all converts to NULL and drops out of sums; reports list such
+currencies (`unconvertible`) as `unconverted_currencies`, so the totals they
+leave out don't pass silently.
+"""
+import bisect
+import csv
+import math
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Round
+
+from .models import Account, ExchangeRate
+
+AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=2)
+RATE_FIELD = DecimalField(max_digits=20, decimal_places=10)
+
+# Units per USD used by the stand-in provider until a real rates feed is wired up
+REFERENCE_RATES = {'NGN': 1550, 'GBP': 0.79, 'EUR': 0.92, 'GHS': 15.5, 'KES': 129, 'ZAR': 18.4}
+
+_latest = {'loaded_at': None, 'rates': {}}
+
+
+def _rate_on(currency, on):
+    """Units of `currency` per base currency on `on`; dates before the first known rate use it"""
+    rates = ExchangeRate.objects.filter(base=settings.FX_BASE_CURRENCY, quote=currency)
+    return Coalesce(
+        Subquery(rates.filter(date__lte=on).order_by('-date').values('rate')[:1]),
+        Subquery(rates.order_by('date').values('rate')[:1]),
+        output_field=RATE_FIELD,
+    )
+
+
+def converted(target, amount='amount', currency='account__currency', on='date'):
+    """Expression for a dated row's `amount` in `target`, to wrap in Sum() and friends.
+
+    `currency` and `on` name fields of the queried model; `on` may also be a date.
+    """
+    base = settings.FX_BASE_CURRENCY
+    on = on if isinstance(on, date) else OuterRef(on)
+    source_rate = Case(
+        When(**{currency: base}, then=Value(Decimal(1))),
+        default=_rate_on(OuterRef(currency), on),
+        output_field=RATE_FIELD,
+    )
+    target_rate = Value(Decimal(1), output_field=RATE_FIELD) if target == base else _rate_on(target, on)
+    return Case(
+        When(**{currency: target}, then=F(amount)),
+        default=Round(F(amount) * target_rate / source_rate, 2),
+        output_field=AMOUNT_FIELD,
+    )
+
+
+def latest_rates():
+    """{currency: units per base currency} as of today, cached per process for FX_CACHE_SECONDS"""
+    now = time.monotonic()
+    if _latest['loaded_at'] is None or now - _latest['loaded_at'] > settings.FX_CACHE_SECONDS:
+        base = settings.FX_BASE_CURRENCY
+        rates = dict(
+            ExchangeRate.objects.filter(base=base, date__lte=date.today())
+            .order_by('quote', '-date').distinct('quote')
+            .values_list('quote', 'rate')
+        )
+        rates[base] = Decimal(1)
+        _latest.update(loaded_at=now, rates=rates)
+    return _latest['rates']
+
+
+def unconvertible(user_id, target):
+    """Currencies of the user's accounts that can't be converted to `target`
+    for want of any rates, sorted
+    """
+    rates = latest_rates()
+    currencies = set(Account.objects.filter(user_id=user_id).values_list('currency', flat=True).distinct())
+    currencies.discard(target)
+    return sorted(currencies if target not in rates else currencies - rates.keys())
+
+
+def clear_cache():
+    _latest['loaded_at'] = None
+
+
+def converted_balance(target, amount='balance', currency='currency'):
+    """Expression for a current `amount` in `target` at today's rates, as a CASE over the cached rates"""
+    rates = latest_rates()
+    whens = [When(**{currency: target}, then=F(amount))]
+    if target in rates:
+        whens += [
+            When(**{currency: code}, then=Round(F(amount) * Value(rates[target] / rate, output_field=RATE_FIELD), 2))
+            for code, rate in rates.items() if code != target
+        ]
+    return Case(*whens, default=Value(None), output_field=AMOUNT_FIELD)
+
+
+def rate_table(currencies, start, end):
+    """{currency: ([dates], [rates])} covering start..end, for `convert`.
+
+    Each series begins with the latest rate on or before `start`, or with the
+    earliest known rate when there is none, like the SQL conversion.
+    """
+    base = settings.FX_BASE_CURRENCY
+    rates = ExchangeRate.objects.filter(base=base, quote__in=set(currencies) - {base}, date__lte=end)
+    before = rates.filter(quote=OuterRef('quote'), date__lte=start).order_by('-date').values('date')[:1]
+    table = {}
+    for quote, day, rate in (
+        rates.filter(date__gte=Coalesce(Subquery(before), Value(date.min)))
+        .order_by('quote', 'date').values_list('quote', 'date', 'rate')
+    ):
+        days, values = table.setdefault(quote, ([], []))
+        days.append(day)
+        values.append(rate)
+    return table
+
+
+def convert(amount, source, target, on, table):
+    """`amount` from `source` to `target` at the rates in effect on `on`, or None without rates"""
+    if source == target:
+        return amount
+    base = settings.FX_BASE_CURRENCY
+
+    def rate(currency):
+        if currency == base:
+            return Decimal(1)
+        if currency not in table:
+            return None
+        days, values = table[currency]
+        return values[max(bisect.bisect_right(days, on) - 1, 0)]
+
+    source_rate, target_rate = rate(source), rate(target)
+    if source_rate is None or target_rate is None:
+        return None
+    return (amount * target_rate / source_rate).quantize(Decimal('0.01'))
+
+
+def normalize(rows):
+    """Yield (date, quote, rate) against the base currency from (date, base, quote, rate) rows.
+
+    Pairs quoted the other way round are inverted; crosses not involving the
+    base currency are skipped.
+    """
+    base = settings.FX_BASE_CURRENCY
+    for day, pair_base, quote, rate in rows:
+        rate = Decimal(str(rate))
+        if pair_base == base and quote != base:
+            yield day, quote, rate
+        elif quote == base and pair_base != base and rate:
+            yield day, pair_base, (Decimal(1) / rate).quantize(Decimal('1e-10'))
+
+
+def read_rates_file(path):
+    """(date, base, quote, rate) rows from a CSV file with those column headers"""
+    with open(path, newline='') as handle:
+        for row in csv.DictReader(handle):
+            yield (
+                datetime.strptime(row['date'], '%Y-%m-%d').date(),
+                row['base'].strip().upper(),
+                row['quote'].strip().upper(),
+                row['rate'],
+            )
+
+
+def stand_in_rates(start, end):
+    """Deterministic daily USD rates around REFERENCE_RATES, for development and tests"""
+    day = start
+    while day <= end:
+        for quote, reference in REFERENCE_RATES.items():
+            drift = 1 + 0.02 * math.sin(day.toordinal() / 29 + sum(map(ord, quote)))
+            yield day, 'USD', quote, round(reference * drift, 6)
+        day += timedelta(days=1)
+
+
+def save_rates(rows, source, batch_size=5000):
+    """Upsert rates and drop the cached latest rates. Returns the number of rows written."""
+    base = settings.FX_BASE_CURRENCY
+    objs = [
+        ExchangeRate(base=base, quote=quote, date=day, rate=rate, source=source)
+        for day, quote, rate in normalize(rows)
+    ]
+    ExchangeRate.objects.bulk_create(
+        objs, batch_size=batch_size, update_conflicts=True,
+        unique_fields=['base', 'quote', 'date'], update_fields=['rate', 'source'],
+    )
+    clear_cache()
+    return len(objs)
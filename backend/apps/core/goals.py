@@ -0,0 +1,152 @@
+"""Goal contribution analytics
+
+`with_contribution_stats` annotates a goal queryset with contribution totals in
+the same grouped query that fetches the goals; `projection` turns those
+annotations into the required monthly contribution, a projected completion
+date and whether the goal is on pace, without touching the database.
+"""
+import math
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .dates import add_months, month_start
+from .models import GoalContribution
+
+TRAILING_MONTHS = 3
+
+# Add to the goal and record the contribution in one statement. The UPDATE
+# holds the row lock only for its own duration and computes the new balance
+# from the committed one, so concurrent contributors never lose an update.
+CONTRIBUTE_SQL = """
+WITH goal AS (
+    UPDATE goals
+    SET current_amount = current_amount + %(amount)s,
+        status = CASE
+            WHEN status = 'active' AND current_amount + %(amount)s >= target_amount THEN 'completed'
+            ELSE status
+        END
+    WHERE id = %(goal_id)s AND user_id = %(user_id)s
+    RETURNING id, current_amount, status
+), contribution AS (
+    INSERT INTO goal_contributions (id, goal_id, amount, date, created_at)
+    SELECT %(id)s, id, %(amount)s, %(date)s, now() FROM goal
+)
+SELECT current_amount, status FROM goal
+"""
+
+
+def with_contribution_stats(goals, today=None):
+    """Annotate contributed_total, contribution_count, recent_total and last_contribution_date.
+
+    recent_total covers the TRAILING_MONTHS complete months before the current one.
+    """
+    today = today or date.today()
+    recent = Q(contributions__date__gte=add_months(today, -TRAILING_MONTHS), contributions__date__lt=month_start(today))
+    zero = Value(Decimal(0), output_field=DecimalField(max_digits=15, decimal_places=2))
+    return goals.annotate(
+        contributed_total=Coalesce(Sum('contributions__amount'), zero),
+        contribution_count=Count('contributions'),
+        recent_total=Coalesce(Sum('contributions__amount', filter=recent), zero),
+        last_contribution_date=Max('contributions__date'),
+    )
+
+
+def months_until(today, target):
+    """Whole months from today to target, counting a started month; at least 1"""
+    months = (target.year - today.year) * 12 + target.month - today.month
+    if target.day > today.day:
+        months += 1
+    return max(months, 1)
+
+
+def projection(goal, today=None):
+    """Derived goal analytics from a goal annotated by with_contribution_stats.
+
+    The projected completion date is the first day of the month the trailing
+    average would reach the target in.
+    """
+    today = today or date.today()
+    remaining = max(goal.target_amount - goal.current_amount, Decimal(0))
+    average = getattr(goal, 'recent_total', Decimal(0)) / TRAILING_MONTHS
+
+    if remaining == 0:
+        return {
+            'remaining_amount': 0.0,
+            'monthly_contribution_needed': 0.0,
+            'avg_monthly_contribution': float(round(average, 2)),
+            'projected_completion_date': getattr(goal, 'last_contribution_date', None) or today,
+            'pace': 'completed',
+        }
+
+    needed = None
+    if goal.target_date:
+        months_left = months_until(today, goal.target_date) if goal.target_date > today else 1
+        needed = float(round(remaining / months_left, 2))
+
+    projected = add_months(today, math.ceil(remaining / average)) if average > 0 else None
+    if not getattr(goal, 'contribution_count', 0):
+        pace = 'not_started'
+    elif goal.target_date is None:
+        pace = 'no_target_date'
+    elif projected is not None and projected <= goal.target_date:
+        pace = 'on_track'
+    else:
+        pace = 'behind'
+
+    return {
+        'remaining_amount': float(remaining),
+        'monthly_contribution_needed': needed,
+        'avg_monthly_contribution': float(round(average, 2)),
+        'projected_completion_date': projected,
+        'pace': pace,
+    }
+
+
+def contribute(goal_id, user_id, amount, on=None, using=DEFAULT_DB_ALIAS):
+    """Record a contribution and add it to the goal atomically.
+
+    Returns the goal's (current_amount, status) afterwards, or None when the
+    user has no such goal.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(CONTRIBUTE_SQL, {
+            'id': uuid.uuid4(),
+            'goal_id': goal_id,
+            'user_id': user_id,
+            'amount': amount,
+            'date': on or date.today(),
+        })
+        return cursor.fetchone()
+
+
+def contribution_history(goal, today=None):
+    """Monthly contribution totals from the first contribution to this month, gaps filled"""
+    today = today or date.today()
+    rows = {
+        row['month']: row for row in
+        GoalContribution.objects.filter(goal=goal)
+        .annotate(month=TruncMonth('date')).values('month')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    }
+    if not rows:
+        return []
+    history, cumulative = [], Decimal(0)
+    month, last = min(rows), month_start(today)
+    while month <= max(last, max(rows)):
+        row = rows.get(month, {})
+        total = row.get('total') or Decimal(0)
+        cumulative += total
+        history.append({
+            'month': month.isoformat(),
+            'total': float(total),
+            'count': row.get('count', 0),
+            'cumulative': float(cumulative),
+        })
+        month = add_months(month, 1)
+    return history
@@ -0,0 +1,300 @@
+"""Batch insight generation with vectorized anomaly detection
+
+Users are processed in chunks. Monthly (user, category, type) totals are
+summed from the users' transaction columns (apps.core.columnar) into dense
+NumPy arrays, the rest costs a fixed handful of grouped queries, and every
+detector runs over the whole chunk at once.
+"""
+import calendar
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import Count, Min, Q, Sum
+
+from . import catalog, columnar
+from .columnar import month_index
+from .dates import add_months, month_start
+from .models import Budget, Category, Insight, Transaction, User
+
+HISTORY_MONTHS = 6
+SPIKE_Z = 3.5
+MIN_AMOUNT = 5000
+INCOME_DROP_RATIO = 0.7
+NEW_MERCHANT_DAYS = 30
+NEW_MERCHANT_SHARE = 0.1
+
+CURRENCY_SYMBOLS = {'NGN': '₦', 'USD': '$', 'GBP': '£', 'EUR': '€'}
+
+
+def format_amount(amount, currency):
+    return f'{CURRENCY_SYMBOLS.get(currency, currency + " ")}{amount:,.0f}'
+
+
+def robust_z(history, latest):
+    """Median/MAD z-score of `latest` against each row of `history`"""
+    median = np.median(history, axis=1)
+    deviation = np.abs(history - median[:, None])
+    mad = np.median(deviation, axis=1)
+    # Mostly-flat histories have MAD 0; fall back to the mean absolute deviation
+    scale = np.where(mad > 0, 1.4826 * mad, 1.2533 * deviation.mean(axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, (latest - median) / scale, np.where(latest > median, np.inf, 0.0))
+    return z, median
+
+
+class ChunkSeries:
+    """Monthly totals for a chunk of users as dense arrays.
+
+    Columns run from the oldest history month to the current (partial) month:
+    `HISTORY_MONTHS` history columns, the last complete month, then the current one.
+    """
+
+    def __init__(self, user_ids, today):
+        self.today = today
+        self.current = month_start(today)
+        self.start = add_months(self.current, -(HISTORY_MONTHS + 1))
+        self.months = HISTORY_MONTHS + 2
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+
+        first, last = month_index(self.start), month_index(self.current)
+        self.series_keys = []
+        series_index = {}
+        debit_rows, debit_cols, debit_vals = [], [], []
+        credit_rows, credit_cols, credit_vals = [], [], []
+        for user_id, columns in columnar.load_many(user_ids).items():
+            months = columnar.months(columns.day)
+            rows = (months >= first) & (months <= last)
+            cols, cents = months[rows] - first, columns.cents[rows]
+            credit = columns.type[rows] == columnar.CREDIT
+            debit = ~credit
+            credit_rows.append(np.full(credit.sum(), self.user_index[user_id]))
+            credit_cols.append(cols[credit])
+            credit_vals.append(cents[credit])
+
+            categories, category_rows = np.unique(columns.category[rows][debit], return_inverse=True)
+            debit_rows.append(category_rows + len(self.series_keys))
+            debit_cols.append(cols[debit])
+            debit_vals.append(cents[debit])
+            for index in categories:
+                series_index[user_id, columns.category_id(index)] = len(self.series_keys)
+                self.series_keys.append((user_id, columns.category_id(index)))
+
+        self.series_index = series_index
+        # Summed in cents, so totals are exact before the one division
+        debits = np.zeros((len(self.series_keys), self.months), dtype=np.int64)
+        credits = np.zeros((len(user_ids), self.months), dtype=np.int64)
+        if debit_rows:
+            np.add.at(debits, (np.concatenate(debit_rows), np.concatenate(debit_cols)), np.concatenate(debit_vals))
+            np.add.at(credits, (np.concatenate(credit_rows), np.concatenate(credit_cols)), np.concatenate(credit_vals))
+        self.debits, self.credits = debits / 100, credits / 100
+        self.series_users = np.array(
+            [self.user_index[user_id] for user_id, _ in self.series_keys], dtype=np.int64
+        )
+
+    def monthly_spend_by_user(self):
+        totals = np.zeros((len(self.user_index), self.months))
+        np.add.at(totals, self.series_users, self.debits)
+        return totals
+
+
+def detect_spending_spikes(series):
+    """(series_row, latest, median) for categories whose last complete month is an outlier"""
+    history = series.debits[:, :HISTORY_MONTHS]
+    latest = series.debits[:, HISTORY_MONTHS]
+    z, median = robust_z(history, latest)
+    active_months = (history > 0).sum(axis=1)
+    hits = np.nonzero((z > SPIKE_Z) & (latest >= MIN_AMOUNT) & (active_months >= 3))[0]
+    return [(int(i), float(latest[i]), float(median[i])) for i in hits]
+
+
+def detect_income_drops(series):
+    """(user_row, latest, median) where last month's income fell well below its usual level"""
+    history = series.credits[:, :HISTORY_MONTHS]
+    latest = series.credits[:, HISTORY_MONTHS]
+    median = np.median(history, axis=1)
+    hits = np.nonzero((median >= MIN_AMOUNT) & (latest < INCOME_DROP_RATIO * median))[0]
+    return [(int(i), float(latest[i]), float(median[i])) for i in hits]
+
+
+def monthly_limit(budget, days_in_month):
+    amount = float(budget.amount)
+    if budget.period == 'weekly':
+        return amount * days_in_month / 7
+    if budget.period == 'yearly':
+        return amount / 12
+    return amount
+
+
+def detect_budget_risk(series, budgets):
+    """(budget, spent, projected, limit) for budgets on course to be exceeded this month"""
+    if not budgets:
+        return []
+    days_in_month = calendar.monthrange(series.today.year, series.today.month)[1]
+    elapsed = series.today.day
+
+    limits = np.array([monthly_limit(b, days_in_month) for b in budgets])
+    rows = np.array([series.series_index.get((b.user_id, b.category_id), -1) for b in budgets])
+    # Only index known series: a chunk with budgets but no debits has none at all
+    known = rows >= 0
+    spent = np.zeros(len(budgets))
+    spent[known] = series.debits[rows[known], -1]
+    projected = spent / elapsed * days_in_month
+    hits = np.nonzero((limits > 0) & (projected > limits) & (spent >= MIN_AMOUNT))[0]
+    return [(budgets[i], float(spent[i]), float(projected[i]), float(limits[i])) for i in hits]
+
+
+def detect_unusual_merchants(series, merchant_rows):
+    """(user_id, merchant, total) for merchants first seen recently that took a large share of spend"""
+    if not merchant_rows:
+        return []
+    typical = np.median(series.monthly_spend_by_user()[:, :HISTORY_MONTHS + 1], axis=1)
+    users = np.array([series.user_index[row[0]] for row in merchant_rows])
+    totals = np.array([float(row[3] or 0) for row in merchant_rows])
+    first_seen = np.array([row[2].toordinal() for row in merchant_rows])
+    cutoff = (series.today - timedelta(days=NEW_MERCHANT_DAYS)).toordinal()
+    threshold = np.maximum(MIN_AMOUNT, NEW_MERCHANT_SHARE * typical[users])
+    hits = np.nonzero((first_seen >= cutoff) & (totals >= threshold))[0]
+    return [(merchant_rows[i][0], merchant_rows[i][1], float(totals[i])) for i in hits]
+
+
+def generate_for_users(user_ids, today=None):
+    """Detect and store insights for one chunk of users. Returns the number created."""
+    today = today or date.today()
+    users = dict(User.objects.filter(id__in=user_ids).values_list('id', 'currency'))
+    user_ids = list(users)
+    if not user_ids:
+        return 0
+
+    series = ChunkSeries(user_ids, today)
+    latest_month = add_months(series.current, -1)
+    budgets = list(Budget.objects.filter(user_id__in=user_ids))
+    merchant_rows = list(
+        Transaction.objects
+        .filter(user_id__in=user_ids, type='debit', date__gte=series.start)
+        .exclude(merchant_name='')
+        .values_list('user_id', 'merchant_name')
+        .annotate(
+            first_seen=Min('date'),
+            recent_total=Sum('amount', filter=Q(date__gte=today - timedelta(days=NEW_MERCHANT_DAYS))),
+            count=Count('id'),
+        )
+        .order_by()
+    )
+
+    spikes = detect_spending_spikes(series)
+    category_ids = {series.series_keys[i][1] for i, _, _ in spikes} | {b.category_id for b in budgets}
+    # System categories come from the catalog; only users' own need a query
+    system = catalog.system()
+    category_names = {pk: system.by_id[pk].name for pk in category_ids if pk in system.by_id}
+    own = category_ids - set(category_names) - {None}
+    if own:
+        category_names.update(Category.objects.filter(id__in=own).values_list('id', 'name'))
+
+    candidates = []
+    for row, latest, median in spikes:
+        user_id, category_id = series.series_keys[row]
+        name = category_names.get(category_id, 'Uncategorized')
+        candidates.append(Insight(
+            user_id=user_id, type='spending_spike', severity='warning',
+            title=f'Unusual {name} spending 📈',
+            message=(
+                f'You spent {format_amount(latest, users[user_id])} on {name} in {latest_month:%B}, '
+                f'well above your usual {format_amount(median, users[user_id])}.'
+            ),
+            data={
+                'key': f'spending_spike:{category_id}:{latest_month:%Y-%m}',
+                'category_id': str(category_id) if category_id else None,
+                'amount': latest, 'typical': median,
+            },
+        ))
+
+    for budget, spent, projected, limit in detect_budget_risk(series, budgets):
+        name = category_names.get(budget.category_id, 'Uncategorized')
+        currency = users[budget.user_id]
+        percentage = spent / limit * 100
+        candidates.append(Insight(
+            user_id=budget.user_id, type='budget_warning', severity='warning',
+            title=f'{name} budget alert ⚠️',
+            message=(
+                f'Your {name} budget is {percentage:.0f}% used and on pace for '
+                f'{format_amount(projected, currency)} against {format_amount(limit, currency)} this month.'
+            ),
+            data={
+                'key': f'budget_warning:{budget.id}:{series.current:%Y-%m}',
+                'budget_id': str(budget.id), 'spent': spent, 'projected': projected,
+            },
+        ))
+
+    for user_id, merchant, total in detect_unusual_merchants(series, merchant_rows):
+        candidates.append(Insight(
+            user_id=user_id, type='unusual_merchant', severity='info',
+            title=f'New merchant: {merchant} 🔎',
+            message=(
+                f'You spent {format_amount(total, users[user_id])} at {merchant} in the last '
+                f'{NEW_MERCHANT_DAYS} days, a merchant you have not used before.'
+            ),
+            data={'key': f'unusual_merchant:{merchant.lower()}', 'merchant': merchant, 'amount': total},
+        ))
+
+    for row, latest, median in detect_income_drops(series):
+        user_id = user_ids[row]
+        currency = users[user_id]
+        candidates.append(Insight(
+            user_id=user_id, type='income_drop', severity='warning',
+            title='Income dropped 📉',
+            message=(
+                f'Your income in {latest_month:%B} was {format_amount(latest, currency)}, '
+                f'down from a usual {format_amount(median, currency)}.'
+            ),
+            data={'key': f'income_drop:{latest_month:%Y-%m}', 'amount': latest, 'typical': median},
+        ))
+
+    # Keys are scoped to their period, so an insight the user dismissed stays dismissed
+    existing = set(
+        Insight.objects.filter(user_id__in=user_ids, data__has_key='key')
+        .values_list('user_id', 'data__key')
+    )
+    new = []
+    for insight in candidates:
+        key = (insight.user_id, insight.data['key'])
+        if key not in existing:
+            existing.add(key)
+            new.append(insight)
+    Insight.objects.bulk_create(new, batch_size=1000)
+    return len(new)
+
+
+def _generate_chunk(args):
+    user_ids, today = args
+    return len(user_ids), generate_for_users(user_ids, today)
+
+
+def user_chunks(chunk_size, user_ids=None):
+    ids = user_ids if user_ids is not None else list(
+        User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def run(chunk_size=500, workers=None, today=None, user_ids=None):
+    """Generate insights for every active user, fanning chunks out to a process pool.
+
+    Yields (users_processed, insights_created) per chunk as they finish.
+    """
+    today = today or date.today()
+    workers = workers or os.cpu_count() or 1
+    chunks = [(chunk, today) for chunk in user_chunks(chunk_size, user_ids)]
+
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield _generate_chunk(chunk)
+        return
+
+    # Forked workers must open their own connections rather than share the parent's socket
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_generate_chunk, chunks)
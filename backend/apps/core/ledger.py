@@ -0,0 +1,160 @@
+"""Per-account running balance ledger
+
+Every transaction stores `balance_after`, the account's balance once it and
+everything before it in (date, created_at, id) order has been applied, on top
+of the account's `opening_balance`. A balance on any date is then the
+balance_after of the account's last transaction on or before it: one probe of
+transactions_ledger_idx per account and date.
+
+Writers call `recompute` with the earliest date they touched per account. Only
+that suffix of the ledger, and of the balance snapshots sampled from it, is
+rewritten, continuing from the last balance before it; rows whose balance
+didn't change are left alone.
+
+Call it in the transaction that made the change. It first locks the accounts
+(in id order, so writers can't deadlock each other), so a concurrent writer to
+the same account waits until this one commits and then recomputes with its
+rows in view. FOR NO KEY UPDATE rather than FOR UPDATE, as the foreign key
+checks of inserted transactions hold KEY SHARE locks on the same rows.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import Account
+
+SIGNED_AMOUNT = "CASE WHEN t.type = 'credit' THEN t.amount ELSE -t.amount END"
+
+# Balance of account `a` at the end of {day}, for use inside larger statements
+BALANCE_ON = """COALESCE((
+    SELECT t.balance_after FROM transactions t
+    WHERE t.account_id = a.id AND t.date <= {day}
+    ORDER BY t.date DESC, t.created_at DESC, t.id DESC
+    LIMIT 1
+), a.opening_balance)"""
+
+LOCK_SQL = """
+SELECT id FROM accounts WHERE id = ANY(%s::uuid[]) ORDER BY id FOR NO KEY UPDATE
+"""
+
+CHANGED = """
+    SELECT account_id, MIN(since) AS since
+    FROM unnest(%s::uuid[], %s::date[]) AS c(account_id, since)
+    GROUP BY account_id
+"""
+
+RECOMPUTE_SQL = f"""
+WITH changed AS ({CHANGED}), start AS (
+    SELECT c.account_id, c.since, COALESCE((
+        SELECT t.balance_after FROM transactions t
+        WHERE t.account_id = c.account_id AND t.date < c.since
+        ORDER BY t.date DESC, t.created_at DESC, t.id DESC
+        LIMIT 1
+    ), a.opening_balance) AS balance
+    FROM changed c
+    JOIN accounts a ON a.id = c.account_id
+), ledger AS (
+    SELECT t.id, t.date, s.balance + SUM({SIGNED_AMOUNT})
+        OVER (PARTITION BY t.account_id ORDER BY t.date, t.created_at, t.id) AS balance
+    FROM transactions t
+    JOIN start s ON s.account_id = t.account_id AND t.date >= s.since
+)
+UPDATE transactions t
+SET balance_after = ledger.balance
+FROM ledger
+WHERE t.id = ledger.id AND t.date = ledger.date
+  AND t.balance_after IS DISTINCT FROM ledger.balance
+"""
+
+# Balance snapshots sample the ledger, so the same suffix of them goes stale
+REFRESH_SNAPSHOTS_SQL = f"""
+UPDATE balance_snapshots s
+SET balance = fresh.balance
+FROM (
+    SELECT s.id, {BALANCE_ON.format(day='s.date')} AS balance
+    FROM ({CHANGED}) c
+    JOIN accounts a ON a.id = c.account_id
+    JOIN balance_snapshots s ON s.account_id = a.id AND s.date >= c.since
+) fresh
+WHERE s.id = fresh.id AND s.balance IS DISTINCT FROM fresh.balance
+"""
+
+REBUILD_OPENING_SQL = f"""
+UPDATE accounts a
+SET opening_balance = a.balance - COALESCE((
+    SELECT SUM({SIGNED_AMOUNT}) FROM transactions t WHERE t.account_id = a.id
+), 0)
+WHERE a.id = ANY(%s::uuid[])
+RETURNING a.id
+"""
+
+# Moves each account's opening balance by however far its ledger is, today,
+# from the balance reported for it
+ALIGN_SQL = f"""
+WITH reported AS (
+    SELECT r.account_id, r.balance, %s::date AS today
+    FROM unnest(%s::uuid[], %s::numeric[]) AS r(account_id, balance)
+), drift AS (
+    SELECT a.id, r.balance - {BALANCE_ON.format(day='r.today')} AS amount
+    FROM reported r
+    JOIN accounts a ON a.id = r.account_id
+)
+UPDATE accounts a
+SET opening_balance = a.opening_balance + drift.amount
+FROM drift
+WHERE a.id = drift.id AND drift.amount <> 0
+RETURNING a.id
+"""
+
+
+def recompute(changes):
+    """Rewrite balance_after, and balance snapshots, from each changed point on.
+
+    `changes` is an iterable of (account_id, date) pairs, the earliest date of
+    a transaction inserted, deleted or whose amount, type or date changed
+    (for a moved transaction, the earlier of its old and new dates).
+    Returns the number of rows rewritten.
+    """
+    changes = list(changes)
+    if not changes:
+        return 0
+    params = [[account for account, _ in changes], [day for _, day in changes]]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(LOCK_SQL, [list({str(account) for account in params[0]})])
+        cursor.execute(RECOMPUTE_SQL, params)
+        rewritten = cursor.rowcount
+        cursor.execute(REFRESH_SNAPSHOTS_SQL, params)
+    return rewritten
+
+
+def align(balances, today=None):
+    """Make each account's ledger balance today the one in `balances`
+    ({account_id: balance}), e.g. as reported by the bank. A difference the
+    ledger can't explain is put before its first transaction: the opening
+    balance moves by it and the account's ledger and snapshots are recomputed.
+    Returns the number of rows rewritten.
+    """
+    if not balances:
+        return 0
+    accounts = [str(account) for account in balances]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(LOCK_SQL, [accounts])
+        cursor.execute(ALIGN_SQL, [today or date.today(), accounts, list(balances.values())])
+        moved = [row[0] for row in cursor.fetchall()]
+        return recompute((account, date.min) for account in moved)
+
+
+def rebuild_accounts(account_ids):
+    """Re-derive the accounts' opening balances from their current balances and
+    recompute their whole ledgers, e.g. after bulk imports that skipped `recompute`
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_OPENING_SQL, [[str(account) for account in account_ids]])
+            accounts = [row[0] for row in cursor.fetchall()]
+        return recompute((account, date.min) for account in accounts)
+
+
+def rebuild(user_ids):
+    """`rebuild_accounts` for every account of the users"""
+    return rebuild_accounts(Account.objects.filter(user_id__in=user_ids).values_list('id', flat=True))
@@ -0,0 +1,86 @@
+"""
+Archive old transactions
+Moves transactions dated before a cutoff from the hot table into
+transactions_archive, or back with --restore, one chunk of users per
+statement (see apps.core.archive), so it can run against a live database
+and be resumed
+"""
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core import archive, partitions
+from apps.core.dates import add_months, month_start
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Move old transactions to the archive table, or restore them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.TRANSACTION_ARCHIVE_MONTHS,
+            help='Archive transactions dated before the start of the month this many months ago'
+        )
+        parser.add_argument('--before', type=date.fromisoformat, help='Archive transactions dated before this date instead')
+        parser.add_argument('--restore', action='store_true', help='Move archived transactions back to the hot table')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='With --restore, only restore transactions dated from this date on')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per statement')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Archiving needs PostgreSQL')
+        added = archive.sync_schema()
+        if added:
+            self.stdout.write(f'Added {", ".join(added)} to {archive.ARCHIVE_TABLE}')
+
+        if options['restore']:
+            moved = self.in_chunks(options['batch_size'], lambda users: archive.restore_users(users, options['since']))
+            archive.publish_horizon()
+            self.vacuum()
+            self.stdout.write(self.style.SUCCESS(f'✅ Restored {moved} transactions'))
+            return
+
+        cutoff = options['before'] or add_months(month_start(date.today()), -options['months'])
+        current = archive.horizon()
+        horizon = max(cutoff, current) if current else cutoff
+        archive.publish_horizon(horizon)
+
+        def archive_chunk(users):
+            moved = archive.archive_users(users, cutoff)
+            # Keep the published horizon alive for the whole run
+            archive.publish_horizon(horizon)
+            return moved
+
+        moved = self.in_chunks(options['batch_size'], archive_chunk)
+        if partitions.is_partitioned():
+            for name in partitions.monthly_partitions_before(cutoff):
+                if partitions.drop_partition_if_empty(name):
+                    self.stdout.write(f'Dropped empty partition {name}')
+        self.vacuum()
+        self.stdout.write(self.style.SUCCESS(f'✅ Archived {moved} transactions dated before {cutoff}'))
+
+    def in_chunks(self, batch_size, move):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        moved = 0
+        last = None
+        while True:
+            chunk = list((users.filter(id__gt=last) if last else users)[:batch_size])
+            if not chunk:
+                return moved
+            moved += move(chunk)
+            last = chunk[-1]
+            self.stdout.write(f'  {moved} moved')
+
+    def vacuum(self):
+        """Let the hot table reuse the freed space and refresh planner statistics"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"VACUUM (ANALYZE) {partitions.PARENT_TABLE}")
+            cursor.execute(f"VACUUM (ANALYZE) {archive.ARCHIVE_TABLE}")
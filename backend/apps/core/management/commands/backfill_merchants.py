@@ -0,0 +1,42 @@
+"""
+Backfill transaction merchants
+Links stored transactions to canonical merchants in (date, id) order, one
+chunk per statement, so it can run against a live database and be resumed
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from apps.core import merchants
+from apps.core.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Link transactions to canonical merchants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-resolve transactions that already have a merchant, e.g. after alias changes')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Transactions per statement')
+
+    def handle(self, *args, **options):
+        rows = Transaction.objects.order_by('date', 'id')
+        if options['all']:
+            merchants.aliases_changed()
+        else:
+            rows = rows.filter(merchant__isnull=True)
+        rows = rows.annotate(text=Coalesce(NullIf('merchant_name', Value('')), 'description'))
+        rows = rows.values_list('id', 'date', 'text')
+
+        scanned = linked = 0
+        last = None
+        while True:
+            chunk = rows.filter(Q(date__gt=last[1]) | Q(date=last[1], id__gt=last[0])) if last else rows
+            chunk = list(chunk[:options['batch_size']])
+            if not chunk:
+                break
+            linked += merchants.link(chunk)
+            scanned += len(chunk)
+            last = chunk[-1]
+            self.stdout.write(f'  {scanned} scanned, {linked} linked')
+        self.stdout.write(self.style.SUCCESS(f'✅ Linked {linked} of {scanned} transactions to merchants'))
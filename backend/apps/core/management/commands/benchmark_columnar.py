@@ -0,0 +1,134 @@
+"""
+Benchmark the columnar analytics cache on a synthetic multi-year history
+Seeds a throwaway user inside a transaction that is rolled back afterwards and
+keeps its column files in a temporary directory
+"""
+import gc
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+
+from apps.core import columnar
+from apps.core.models import Account, Category, Connection, Transaction, User
+
+
+def rss_kb():
+    """Resident memory of this process, in KiB (Linux /proc)"""
+    for line in Path('/proc/self/status').read_text().splitlines():
+        if line.startswith('VmRSS:'):
+            return int(line.split()[1])
+    return 0
+
+
+class Command(BaseCommand):
+    help = 'Compare latency and RSS of monthly category totals from ORM iteration and the columnar cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=5, help='Years of synthetic history')
+        parser.add_argument('--per-day', type=int, default=6, help='Transactions per day')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per variant')
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='columnar-bench-')
+        try:
+            with override_settings(ANALYTICS_CACHE_DIR=directory), transaction.atomic():
+                user = self.seed(options['years'], options['per_day'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE transactions')
+
+                variants = [
+                    ('ORM iteration', lambda: self.orm_totals(user)),
+                    ('columnar, cold (query + write files)', lambda: self.columnar_totals(user, cold=True)),
+                    ('columnar, files mapped from disk', lambda: self.columnar_totals(user, drop_maps=True)),
+                    ('columnar, maps held in process', lambda: self.columnar_totals(user)),
+                ]
+                expected = None
+                for label, fn in variants:
+                    ms, rss, totals = self.measure(options['runs'], fn)
+                    expected = expected if expected is not None else totals
+                    check = 'same totals' if totals == expected else 'TOTALS DIFFER'
+                    self.stdout.write(f'{label:<40} {ms:8.1f} ms   RSS +{rss / 1024:6.1f} MiB   {check}')
+
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def seed(self, years, per_day):
+        user = User.objects.create(username=f'bench-{uuid.uuid4().hex[:8]}')
+        conn = Connection.objects.create(user=user, mono_id=f'bench_{uuid.uuid4().hex}', institution_name='Bench')
+        account = Account.objects.create(
+            user=user, connection=conn, name='Bench', type='current', account_number_masked='****0000'
+        )
+        categories = [
+            Category.objects.create(user=user, name=f'Bench {i}', icon='📦', color='#64748b')
+            for i in range(15)
+        ] + [None]
+
+        batch = []
+        today = date.today()
+        for day_offset in range(years * 365):
+            tx_date = today - timedelta(days=day_offset)
+            for _ in range(per_day):
+                batch.append(Transaction(
+                    user=user, account=account, date=tx_date, description='bench',
+                    amount=Decimal(random.randint(500, 5000000)) / 100, type=random.choice(['debit', 'credit']),
+                    category=random.choice(categories),
+                ))
+            if len(batch) >= 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {years * 365 * per_day} transactions')
+        return user
+
+    def orm_totals(self, user):
+        """Full history as model instances, summed in Python per (month, category, type)"""
+        rows = list(Transaction.objects.filter(user=user))
+        peak = rss_kb()
+        totals = defaultdict(int)
+        for txn in rows:
+            totals[txn.date.year, txn.date.month, txn.category_id, txn.type] += int(txn.amount * 100)
+        return peak, dict(totals)
+
+    def columnar_totals(self, user, cold=False, drop_maps=False):
+        """The same totals with one scatter-add over the user's columns"""
+        if cold:
+            shutil.rmtree(columnar._user_dir(user.id), ignore_errors=True)
+        if cold or drop_maps:
+            columnar._open.clear()
+        columns = columnar.load(user.id)
+        months = columnar.months(columns.day)
+        keys, inverse = np.unique(
+            np.stack([months, columns.category, columns.type]), axis=1, return_inverse=True,
+        )
+        sums = np.zeros(keys.shape[1], dtype=np.int64)
+        np.add.at(sums, inverse.ravel(), columns.cents)
+        peak = rss_kb()
+        totals = {}
+        for (month, category, kind), total in zip(keys.T.tolist(), sums.tolist()):
+            key = (1970 + month // 12, month % 12 + 1, columns.category_id(category), ('debit', 'credit')[kind])
+            totals[key] = total
+        return peak, totals
+
+    def measure(self, runs, fn):
+        """(mean ms, RSS growth at the variant's peak in KiB, result of the last run)"""
+        gc.collect()
+        baseline = rss_kb()
+        elapsed, peaks = 0.0, []
+        for _ in range(runs):
+            started = time.perf_counter()
+            peak, totals = fn()
+            elapsed += time.perf_counter() - started
+            peaks.append(peak)
+        return elapsed * 1000 / runs, max(peaks) - baseline, totals
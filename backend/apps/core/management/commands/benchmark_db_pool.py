@@ -0,0 +1,94 @@
+"""
+Benchmark per-request database latency with the connection pool versus
+opening a fresh connection for every request
+Each simulated request connects, runs a couple of small queries and closes,
+as a Django request does with CONN_MAX_AGE = 0
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from apps.core.db.base import close_pools, pool_metrics
+
+QUERIES = [
+    'SELECT id, email FROM users ORDER BY id LIMIT 1',
+    'SELECT count(*) FROM accounts',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare request latency with pooled connections against connect-per-request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per client')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (threads)')
+        parser.add_argument('--max-size', type=int, help='Pool max_size (default: DB_POOL_MAX_SIZE)')
+
+    def handle(self, *args, **options):
+        base = {**connections['default'].settings_dict, 'CONN_MAX_AGE': 0}
+        base['OPTIONS'] = {k: v for k, v in base['OPTIONS'].items() if k != 'pool'}
+        pool_options = {**settings.DB_POOL_OPTIONS}
+        if options['max_size']:
+            pool_options['max_size'] = options['max_size']
+        pool_options['min_size'] = min(pool_options['min_size'], pool_options['max_size'])
+
+        variants = [
+            ('connect', {**base, 'ENGINE': 'django.db.backends.postgresql'}),
+            ('pool', {**base, 'ENGINE': 'apps.core.db', 'OPTIONS': {**base['OPTIONS'], 'pool': pool_options}}),
+        ]
+        try:
+            for label, settings_dict in variants:
+                latencies, elapsed = self.run(settings_dict, options['requests'], options['concurrency'])
+                count = len(latencies)
+
+                def pct(p):
+                    return latencies[min(count - 1, int(count * p))] * 1000
+
+                self.stdout.write(
+                    f'{label:<8} {count} requests x{options["concurrency"]} in {elapsed:.2f}s = '
+                    f'{count / elapsed:8.1f} req/s   p50 {pct(0.5):6.2f} ms  p95 {pct(0.95):6.2f} ms  '
+                    f'p99 {pct(0.99):6.2f} ms'
+                )
+            stats = pool_metrics().get('benchmark_pool', {})
+            self.stdout.write(
+                f'pool: {stats.get("connections_num", 0)} connections opened, '
+                f'avg wait {stats.get("avg_wait_ms", 0):.2f} ms, '
+                f'{stats.get("requests_queued", 0)} requests queued, '
+                f'{stats.get("requests_errors", 0)} timeouts'
+            )
+        finally:
+            close_pools()
+
+    def run(self, settings_dict, requests, concurrency):
+        backend = load_backend(settings_dict['ENGINE'])
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            # Wrappers are per thread, like Django's connection handler; pools are per process
+            wrapper = backend.DatabaseWrapper(settings_dict, alias='benchmark_pool')
+            local = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    for sql in QUERIES:
+                        cursor.execute(sql)
+                        cursor.fetchall()
+                wrapper.close()
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return latencies, elapsed
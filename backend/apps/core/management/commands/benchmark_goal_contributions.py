@@ -0,0 +1,114 @@
+"""
+Benchmark concurrent contributions to a single goal
+Every writer adds the same amount to one goal, one request at a time, and the
+goal's final balance is compared with the contributions recorded. `naive` is
+read-modify-save, `locked` is SELECT ... FOR UPDATE in a transaction and
+`atomic` is the single UPDATE ... RETURNING used by the contribute endpoint.
+"""
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from apps.core import goals
+from apps.core.db.base import close_pools
+from apps.core.models import Goal, GoalContribution, User
+
+ALIAS = 'benchmark_goals'
+AMOUNT = Decimal('1.25')
+
+
+def naive(goal_id, user_id):
+    goal = Goal.objects.using(ALIAS).get(pk=goal_id, user_id=user_id)
+    goal.current_amount += AMOUNT
+    goal.save(using=ALIAS, update_fields=['current_amount'])
+    GoalContribution.objects.using(ALIAS).create(goal=goal, amount=AMOUNT, date=date.today())
+
+
+def locked(goal_id, user_id):
+    with transaction.atomic(using=ALIAS):
+        goal = Goal.objects.using(ALIAS).select_for_update().get(pk=goal_id, user_id=user_id)
+        goal.current_amount += AMOUNT
+        goal.save(using=ALIAS, update_fields=['current_amount'])
+        GoalContribution.objects.using(ALIAS).create(goal=goal, amount=AMOUNT, date=date.today())
+
+
+def atomic(goal_id, user_id):
+    goals.contribute(goal_id, user_id, AMOUNT, using=ALIAS)
+
+
+VARIANTS = {'naive': naive, 'locked': locked, 'atomic': atomic}
+
+
+class Command(BaseCommand):
+    help = 'Measure per-goal contribution throughput and lost updates under concurrent writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=50, help='Concurrent writers (threads)')
+        parser.add_argument('--contributions', type=int, default=20, help='Contributions per writer')
+        parser.add_argument('--variant', action='append', choices=list(VARIANTS),
+                            help='Variant to run (repeatable, default: all)')
+        parser.add_argument('--email', default='test@example.com', help='User to create the throwaway goal for')
+
+    def handle(self, *args, **options):
+        user = User.objects.get(email=options['email'])
+        writers, per_writer = options['writers'], options['contributions']
+
+        # A pool sized to the writer count, so every writer holds a connection at once
+        settings_dict = {**connections['default'].settings_dict}
+        if settings.DB_POOL:
+            pool = {**settings.DB_POOL_OPTIONS, 'max_size': writers}
+            pool['min_size'] = min(pool['min_size'], writers)
+            settings_dict['OPTIONS'] = {**settings_dict['OPTIONS'], 'pool': pool}
+        connections.settings[ALIAS] = settings_dict
+
+        try:
+            for name in options['variant'] or list(VARIANTS):
+                goal = Goal.objects.create(
+                    user=user, name=f'Benchmark ({name})', emoji='🏁',
+                    target_amount=AMOUNT * writers * per_writer * 2,
+                )
+                try:
+                    elapsed, errors = self.run(VARIANTS[name], goal.pk, user.pk, writers, per_writer)
+                    goal.refresh_from_db()
+                    recorded = goal.contributions.count()
+                    total = goal.contributions.aggregate(total=Sum('amount'))['total'] or Decimal(0)
+                    lost = (total - goal.current_amount) / AMOUNT
+                    line = (
+                        f'{name:<7} {recorded} contributions x{writers} writers in {elapsed:.2f}s = '
+                        f'{recorded / elapsed:8.1f} /s   balance {goal.current_amount} of {total} recorded, '
+                        f'{lost:.0f} lost updates, {errors} errors'
+                    )
+                    self.stdout.write(self.style.SUCCESS(f'✅ {line}') if not lost and not errors else f'❌ {line}')
+                finally:
+                    goal.delete()
+        finally:
+            connections[ALIAS].close()
+            close_pools()
+
+    def run(self, contribute, goal_id, user_id, writers, per_writer):
+        errors = []
+        start = threading.Barrier(writers + 1)
+
+        def writer():
+            start.wait()
+            for _ in range(per_writer):
+                try:
+                    contribute(goal_id, user_id)
+                except Exception as exc:
+                    errors.append(exc)
+            connections[ALIAS].close()
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, len(errors)
@@ -0,0 +1,98 @@
+"""
+Benchmark spending trends on a synthetic multi-year history
+Seeds a throwaway user inside a transaction that is rolled back afterwards and
+keeps its column files in a temporary directory
+"""
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import override_settings
+
+from apps.core.models import Account, Category, Connection, Transaction, User
+from apps.core.trends import period_window, spending_trends
+
+
+class Command(BaseCommand):
+    help = 'Time spending trends over the columnar cache against a per-period ORM loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=5, help='Years of synthetic history')
+        parser.add_argument('--per-day', type=int, default=6, help='Debits per day')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per variant')
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='trends-bench-')
+        try:
+            with override_settings(ANALYTICS_CACHE_DIR=directory), transaction.atomic():
+                user = self.seed(options['years'], options['per_day'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE transactions')
+
+                for period, horizon in [('monthly', 6), ('monthly', 60), ('weekly', 12), ('weekly', 260)]:
+                    columnar_ms = self.time(options['runs'], lambda: spending_trends(user.id, period, horizon))
+                    orm_ms = self.time(options['runs'], lambda: self.orm_loop(user, period, horizon))
+                    self.stdout.write(
+                        f'{period:<8} horizon={horizon:<4} columnar {columnar_ms:8.1f} ms   ORM loop {orm_ms:8.1f} ms'
+                    )
+
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def seed(self, years, per_day):
+        user = User.objects.create(username=f'bench-{uuid.uuid4().hex[:8]}')
+        conn = Connection.objects.create(user=user, mono_id=f'bench_{uuid.uuid4().hex}', institution_name='Bench')
+        account = Account.objects.create(
+            user=user, connection=conn, name='Bench', type='current', account_number_masked='****0000'
+        )
+        categories = [
+            Category.objects.create(user=user, name=f'Bench {i}', icon='📦', color='#64748b')
+            for i in range(15)
+        ]
+
+        batch = []
+        today = date.today()
+        for day_offset in range(years * 365):
+            tx_date = today - timedelta(days=day_offset)
+            for _ in range(per_day):
+                batch.append(Transaction(
+                    user=user, account=account, date=tx_date, description='bench',
+                    amount=Decimal(random.randint(500, 50000)), type='debit',
+                    category=random.choice(categories),
+                ))
+            if len(batch) >= 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {years * 365 * per_day} transactions')
+        return user
+
+    def orm_loop(self, user, period, horizon):
+        """The straightforward alternative: one aggregate per period, rolling stats in Python"""
+        visible_start, _, _, end = period_window(period, horizon, date.today())
+        step = timedelta(weeks=1) if period == 'weekly' else None
+        start = visible_start
+        series = {}
+        while start < end:
+            stop = start + step if step else (start + timedelta(days=32)).replace(day=1)
+            rows = Transaction.objects.filter(
+                user=user, type='debit', date__gte=start, date__lt=stop
+            ).values('category_id').annotate(total=Sum('amount'))
+            for row in rows:
+                series.setdefault(row['category_id'], []).append(row['total'])
+            start = stop
+        return {key: sum(values[-3:]) / 3 for key, values in series.items()}
+
+    def time(self, runs, fn):
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        return (time.perf_counter() - started) * 1000 / runs
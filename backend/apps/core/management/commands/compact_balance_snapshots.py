@@ -0,0 +1,57 @@
+"""
+Record and compact balance snapshots
+Records yesterday's and today's end-of-day balances for every account, then
+thins old snapshots to the retention tiers; meant to run nightly from the
+scheduler. --backfill records every retained day back to the first
+transaction or the start of the longest chart period, --reconcile checks snapshots against their transactions.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+
+from apps.core import snapshots
+from apps.core.models import Transaction, User
+
+
+class Command(BaseCommand):
+    help = 'Record end-of-day balance snapshots and thin old ones to daily/weekly/monthly tiers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Run as of this date (YYYY-MM-DD)')
+        parser.add_argument('--backfill', action='store_true', help='Record every retained day since the first transaction or chart period start')
+        parser.add_argument('--reconcile', action='store_true', help='Compare snapshots with transaction-derived balances')
+        parser.add_argument('--fix', action='store_true', help='With --reconcile, correct mismatched snapshots')
+        parser.add_argument('--email', action='append', help='Only this user (repeatable, default: everyone)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Users per statement')
+
+    def handle(self, *args, **options):
+        today = options['date'] or date.today()
+        users = User.objects.order_by('id')
+        if options['email']:
+            users = users.filter(email__in=options['email'])
+        user_ids = list(users.values_list('id', flat=True))
+        batches = [user_ids[i:i + options['batch_size']] for i in range(0, len(user_ids), options['batch_size'])]
+
+        if options['reconcile']:
+            mismatched = 0
+            for batch in batches:
+                for account_id, day, balance, derived in snapshots.reconcile(batch, fix=options['fix']):
+                    mismatched += 1
+                    self.stdout.write(f'  {account_id} {day}: snapshot {balance}, transactions say {derived}')
+            verb = 'Fixed' if options['fix'] else 'Found'
+            style = self.style.SUCCESS if not mismatched or options['fix'] else self.style.WARNING
+            self.stdout.write(style(f'{"✅" if not mismatched or options["fix"] else "⚠️"} {verb} {mismatched} mismatched snapshots'))
+            return
+
+        if options['backfill']:
+            first = Transaction.objects.filter(user_id__in=user_ids).aggregate(first=Min('date'))['first'] or today
+            longest = today - timedelta(days=max(span for _, span in snapshots.PERIODS.values()))
+            days = snapshots.retained_days(min(first, longest), today)
+        else:
+            days = [today - timedelta(days=1), today]
+        written = sum(snapshots.capture(days, user_ids=batch) for batch in batches)
+        deleted = snapshots.compact(today)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Recorded {written} snapshots over {len(days)} days, compacted away {deleted}'
+        ))
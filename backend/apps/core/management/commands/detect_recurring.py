@@ -0,0 +1,55 @@
+"""
+Detect recurring transactions and subscriptions from transaction history
+Creates RecurringTransaction entries (as suggestions by default) and flags matched transactions
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.core import recurring_detection
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Detect weekly, monthly and yearly recurring series for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', type=str, help='Only scan this user')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Users per streaming query')
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help="Create detected series as 'active' instead of 'suggested'"
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Print detections without saving')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['email']:
+            user_ids = list(User.objects.filter(email=options['email']).values_list('id', flat=True))
+
+        started = time.perf_counter()
+        users = detected = created = flagged = 0
+        for user_id, found, user_created, user_flagged in recurring_detection.run(
+            chunk_size=options['chunk_size'],
+            status='active' if options['activate'] else 'suggested',
+            user_ids=user_ids,
+            dry_run=options['dry_run'],
+        ):
+            users += 1
+            detected += len(found)
+            created += user_created
+            flagged += user_flagged
+            if options['dry_run'] or options['email']:
+                for series in found:
+                    self.stdout.write(
+                        f'{user_id} {series.name}: {series.frequency} {series.amount:,.2f} '
+                        f'next {series.next_date} ({len(series.transaction_ids)} transactions)'
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Scanned {users} users in {time.perf_counter() - started:.1f}s: {detected} series detected, '
+            f'{created} recurring entries created, {flagged} transactions flagged'
+        ))
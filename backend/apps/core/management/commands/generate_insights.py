@@ -0,0 +1,46 @@
+"""
+Generate insights for all users
+Runs the vectorized detectors in apps.core.insights over chunks of users in a process pool
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.core import insights
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Detect spending spikes, budget risk, unusual merchants and income drops'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users per chunk')
+        parser.add_argument('--workers', type=int, help='Worker processes (defaults to CPU count)')
+        parser.add_argument('--email', type=str, help='Only generate insights for this user')
+        parser.add_argument('--date', type=date.fromisoformat, help='Run as of this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['email']:
+            user_ids = list(User.objects.filter(email=options['email']).values_list('id', flat=True))
+
+        started = time.perf_counter()
+        users = created = 0
+        for chunk_users, chunk_created in insights.run(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            today=options['date'],
+            user_ids=user_ids,
+        ):
+            users += chunk_users
+            created += chunk_created
+            self.stdout.write(f'Processed {users} users, {created} insights created')
+
+        elapsed = time.perf_counter() - started
+        rate = users / elapsed * 3600 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {created} insights for {users} users in {elapsed:.1f}s ({rate:,.0f} users/hour)'
+        ))
@@ -0,0 +1,27 @@
+"""
+Load exchange rates
+From a CSV file (date,base,quote,rate) or, without --file, the stand-in
+provider's daily rates for the last --days days
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.core import fx
+
+
+class Command(BaseCommand):
+    help = 'Upsert daily exchange rates from a CSV file or the stand-in provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='CSV with date,base,quote,rate columns')
+        parser.add_argument('--days', type=int, default=365, help='Days of stand-in rates up to today')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            rows, source = fx.read_rates_file(options['file']), 'file'
+        else:
+            today = date.today()
+            rows, source = fx.stand_in_rates(today - timedelta(days=options['days']), today), 'stand-in'
+        saved = fx.save_rates(rows, source)
+        self.stdout.write(self.style.SUCCESS(f'✅ Saved {saved} {source} exchange rates'))
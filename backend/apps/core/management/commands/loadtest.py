@@ -0,0 +1,94 @@
+"""
+Simple closed-loop HTTP load test
+Hammers one or more API URLs from a pool of threads and reports throughput,
+latency percentiles and (optionally) the server's resident memory
+"""
+import threading
+import time
+from pathlib import Path
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+def process_tree_rss_kb(pid):
+    """Resident memory of a process and all its descendants, in KiB (Linux /proc)"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        status = Path(f'/proc/{current}/status')
+        if not status.exists():
+            continue
+        for line in status.read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                total += int(line.split()[1])
+        for task in Path(f'/proc/{current}/task').glob('*/children'):
+            pending.extend(int(child) for child in task.read_text().split())
+    return total
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of API endpoints under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs to request round-robin')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+        parser.add_argument('--header', action='append', default=[], help='Extra header, "Name: value"')
+        parser.add_argument('--server-pid', type=int, help='Sample RSS of this process tree (e.g. gunicorn master)')
+
+    def handle(self, *args, **options):
+        headers = dict(h.split(': ', 1) for h in options['header'])
+        urls = options['urls']
+        deadline = time.perf_counter() + options['duration']
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def client(offset):
+            session = requests.Session()
+            i = offset
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = session.get(urls[i % len(urls)], headers=headers, timeout=30)
+                    if response.status_code >= 400:
+                        failed += 1
+                except requests.RequestException:
+                    failed += 1
+                local.append(time.perf_counter() - started)
+                i += 1
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        rss_samples = []
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            if options['server_pid']:
+                rss_samples.append(process_tree_rss_kb(options['server_pid']))
+            time.sleep(0.5)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        count = len(latencies)
+        if not count:
+            self.stdout.write(self.style.ERROR('No requests completed'))
+            return
+
+        def pct(p):
+            return latencies[min(count - 1, int(count * p))] * 1000
+
+        self.stdout.write(
+            f'{count} requests in {elapsed:.1f}s = {count / elapsed:.1f} req/s, {errors[0]} errors\n'
+            f'latency p50 {pct(0.5):.1f} ms  p95 {pct(0.95):.1f} ms  p99 {pct(0.99):.1f} ms'
+        )
+        if rss_samples:
+            self.stdout.write(
+                f'server RSS peak {max(rss_samples) / 1024:.1f} MiB, '
+                f'{count / elapsed / (max(rss_samples) / 1024):.2f} req/s per MiB'
+            )
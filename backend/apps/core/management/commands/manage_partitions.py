@@ -0,0 +1,134 @@
+"""
+Maintain monthly partitions of the transactions table
+Pre-creates upcoming partitions, splits the pre-partitioning legacy
+partition into months, detaches/archives old ones and shows EXPLAIN output
+proving report queries only touch the partitions they need
+"""
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core import cash_flow, monthly_report, partitions
+from apps.core.dates import add_months, month_bounds, month_start
+from apps.core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Create future transaction partitions and detach or archive old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.TRANSACTION_PARTITIONS_AHEAD,
+            help='Number of future months to pre-create partitions for'
+        )
+        parser.add_argument(
+            '--split-legacy',
+            action='store_true',
+            help='Move transactions_legacy into monthly partitions, one month per transaction'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            help='Detach monthly partitions that end more than this many months ago'
+        )
+        parser.add_argument(
+            '--archive-schema',
+            type=str,
+            help='Move detached partitions into this schema instead of leaving them in public'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print EXPLAIN plans for the monthly report and cash flow queries'
+        )
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='User whose report queries --explain plans (default: the first)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be detached'
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            raise CommandError('transactions is not a partitioned table (PostgreSQL only)')
+
+        created = partitions.ensure_future_partitions(options['ahead'])
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+        self.stdout.write(f'{len(created)} partitions created')
+
+        if options['split_legacy']:
+            self.split_legacy()
+
+        if options['retain_months'] is not None:
+            self.detach_old(options['retain_months'], options['archive_schema'], options['dry_run'])
+
+        if options['explain']:
+            self.explain_reports(options['email'])
+
+        self.stdout.write(self.style.SUCCESS('✅ Partitions up to date'))
+
+    def split_legacy(self):
+        """Split the legacy partition newest month first, until it is gone"""
+        partitions.index_legacy()
+        while True:
+            created = partitions.split_legacy_month()
+            if created is None:
+                break
+            for name in created:
+                self.stdout.write(f'Split {name} out of {partitions.LEGACY_PARTITION}')
+        self.stdout.write(f'{partitions.LEGACY_PARTITION} is fully split')
+
+    def detach_old(self, retain_months, archive_schema, dry_run):
+        """Detach monthly partitions older than the retention window"""
+        cutoff = add_months(month_start(date.today()), -retain_months)
+        for name in partitions.monthly_partitions_before(cutoff):
+            if dry_run:
+                self.stdout.write(f'Would detach {name}')
+                continue
+            with transaction.atomic():
+                partitions.detach_partition(name)
+                if archive_schema:
+                    partitions.archive_partition(name, archive_schema)
+            if archive_schema:
+                self.stdout.write(f'Detached {name} into {archive_schema}')
+            else:
+                self.stdout.write(f'Detached {name}')
+
+    def explain_reports(self, email=None):
+        """EXPLAIN the date-bounded queries MonthlyReportView and CashFlowView run,
+        built by the same functions, for one user (`email`, else the first)
+        """
+        users = User.objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError(f'No user {email}' if email else 'No users to explain reports for')
+        today = datetime.now().date()
+
+        start, end = month_bounds(today.year, today.month)
+        sql, params, _ = monthly_report.report_query(user.id, user.currency, start, end)
+        queries = [(f'MonthlyReportView {start:%Y-%m}', sql, params)]
+        for period in ('monthly', 'yearly'):
+            starts, end, trunc, _ = cash_flow.periods(period, today)
+            totals = cash_flow.totals(user.id, user.currency, starts, end, trunc)
+            label = f'CashFlowView {period} {starts[0]:%Y-%m}..{add_months(end, -1):%Y-%m}'
+            queries.append((label, *totals.query.sql_with_params()))
+
+        total = len(partitions.list_partitions())
+        self.stdout.write(f'Plans for {user.email}')
+        for label, sql, params in queries:
+            plan, scanned = partitions.explain(sql, params)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for line in plan:
+                self.stdout.write(f'  {line}')
+            self.stdout.write(f'  -> scans {len(scanned)} of {total} partitions: {", ".join(scanned)}')
@@ -0,0 +1,53 @@
+"""
+Apply stored Mono webhook events
+Every --interval seconds, claims the pending events and syncs each connection
+they name once (see apps.core.webhooks), so syncs per poll are bounded by the
+number of connections however many events arrive. Runs until stopped, or
+until the queue is empty with --once; several can run side by side
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core import webhooks
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Mono webhook events, coalescing them per connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no events are pending')
+        parser.add_argument('--batch-size', type=int, default=settings.WEBHOOK_BATCH_SIZE,
+                            help='Events claimed per transaction')
+        parser.add_argument('--interval', type=float, default=settings.WEBHOOK_POLL_SECONDS,
+                            help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        totals = dict.fromkeys(('events', 'synced', 'reauth', 'failed', 'unmatched'), 0)
+        try:
+            while True:
+                stats = webhooks.process_pending(options['batch_size'])
+                for key, value in stats.items():
+                    totals[key] += value
+                if stats['events']:
+                    self.stdout.write(
+                        f'{stats["events"]} events: {stats["synced"]} connections synced, '
+                        f'{stats["reauth"]} need reauth, {stats["failed"]} failed, {stats["unmatched"]} unmatched'
+                    )
+                if options['once']:
+                    if stats['events']:
+                        continue
+                    break
+                if stats['events'] == options['batch_size']:
+                    # Backlog: keep draining
+                    continue
+                # Events arriving until the next poll coalesce into one sync per connection
+                connections.close_all()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Applied {totals["events"]} events with {totals["synced"]} connection syncs'
+        ))
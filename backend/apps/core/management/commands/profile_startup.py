@@ -0,0 +1,81 @@
+"""
+Profile what a worker does before serving its first request
+Runs Django setup, preloading and optionally warm-up in a fresh interpreter
+under `python -X importtime` and reports the slowest imports
+"""
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+set_up = time.perf_counter()
+from apps.core import startup
+startup.preload()
+phases = {'django.setup': set_up - started, 'preload': time.perf_counter() - set_up}
+if '--warm-up' in sys.argv:
+    for step, ms in startup.warm_up().items():
+        phases[f'warm-up: {step}'] = None if ms is None else ms / 1000
+print(json.dumps(phases))
+"""
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulative µs)] from `-X importtime` stderr output"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Report time spent per imported module, and per phase, while a worker starts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Modules and packages to list')
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='self',
+                            help='Rank modules by their own import time or including what they import')
+        parser.add_argument('--warm-up', action='store_true', help='Also run and time the worker warm-up')
+
+    def handle(self, *args, **options):
+        command = [sys.executable, '-X', 'importtime', '-c', PROBE]
+        if options['warm_up']:
+            command.append('--warm-up')
+        probe = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if probe.returncode:
+            raise CommandError(f'Start-up failed:\n{probe.stderr[-4000:]}')
+        phases = json.loads(probe.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(probe.stderr)
+
+        self.stdout.write('Phases')
+        for phase, seconds in phases.items():
+            took = 'failed' if seconds is None else f'{seconds * 1000:9.1f} ms'
+            self.stdout.write(f'  {phase:<32} {took}')
+
+        column = 1 if options['sort'] == 'self' else 2
+        self.stdout.write(f'\nSlowest imports by {options["sort"]} time ({len(modules)} modules)')
+        self.stdout.write(f'  {"self ms":>9} {"cumul. ms":>10}  module')
+        for name, own, cumulative in sorted(modules, key=lambda m: m[column], reverse=True)[:options['limit']]:
+            self.stdout.write(f'  {own / 1000:9.1f} {cumulative / 1000:10.1f}  {name}')
+
+        packages = defaultdict(lambda: [0, 0])
+        for name, own, _ in modules:
+            packages[name.split('.')[0]][0] += own
+            packages[name.split('.')[0]][1] += 1
+        self.stdout.write('\nImport time by top-level package')
+        for package, (own, count) in sorted(packages.items(), key=lambda p: p[1][0], reverse=True)[:options['limit']]:
+            self.stdout.write(f'  {own / 1000:9.1f} ms  {count:4} modules  {package}')
+
+        total = sum(own for _, own, _ in modules)
+        self.stdout.write(self.style.SUCCESS(f'✅ {total / 1000:.1f} ms importing {len(modules)} modules'))
@@ -0,0 +1,45 @@
+"""
+Rebuild running balances
+Re-derives opening balances from current account balances and recomputes
+balance_after for every transaction, e.g. after a bulk import or to backfill
+the ledger after migration 0006. Accounts are processed in id order, one
+transaction per batch, so locks are held for one batch at a time and an
+interrupted run can be resumed with --missing.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from apps.core import ledger
+from apps.core.models import Account, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-account running balance ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', action='append', help='Only this user (repeatable, default: everyone)')
+        parser.add_argument('--missing', action='store_true',
+                            help='Skip accounts whose transactions all have a balance_after already')
+        parser.add_argument('--batch-size', type=int, default=200, help='Accounts per transaction')
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by('id')
+        if options['email']:
+            accounts = accounts.filter(user__email__in=options['email'])
+        if options['missing']:
+            transactions = Transaction.objects.filter(account_id=OuterRef('id'))
+            accounts = accounts.filter(
+                Exists(transactions.filter(balance_after__isnull=True)) | ~Exists(transactions)
+            )
+        done = rewritten = 0
+        last = None
+        while True:
+            batch = accounts.filter(id__gt=last) if last else accounts
+            batch = list(batch.values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            rewritten += ledger.rebuild_accounts(batch)
+            done += len(batch)
+            last = batch[-1]
+            self.stdout.write(f'{done} accounts, {rewritten} rows changed')
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt ledgers for {done} accounts, {rewritten} rows changed'))
@@ -0,0 +1,121 @@
+"""
+Replay Mono webhook events against a running server
+Posts recorded events from a JSON-lines file, or a synthetic storm of balance
+updates spread over existing connections, and reports how fast they were
+accepted. With --process it then drains the queue in this process and counts
+the connection syncs and queries it took
+"""
+import json
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.core import webhooks
+from apps.core.models import Connection
+
+
+def synthetic_events(count, keys, reauth_share):
+    for _ in range(count):
+        key = random.choice(keys)
+        if random.random() < reauth_share:
+            yield {'event': 'mono.events.reauthorisation_required', 'data': {'account': {'_id': key}}}
+            continue
+        yield {
+            'event': 'mono.events.account_updated',
+            'data': {
+                'meta': {'data_status': 'AVAILABLE', 'auth_method': 'internet_banking'},
+                'account': {'_id': key, 'currency': 'NGN', 'balance': random.randint(0, 500_000_000)},
+            },
+        }
+
+
+class Command(BaseCommand):
+    help = 'Post recorded or synthetic Mono webhook events to the webhook endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api/v1/webhooks/mono', help='Webhook endpoint')
+        parser.add_argument('--file', help='JSON-lines file of recorded event payloads to replay in order')
+        parser.add_argument('--events', type=int, default=5000, help='Synthetic events to send')
+        parser.add_argument('--connections', type=int, default=50, help='Connections the synthetic events name')
+        parser.add_argument('--reauth-share', type=float, default=0.0,
+                            help='Share of synthetic events that ask for reauthorisation')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent senders')
+        parser.add_argument('--secret', default=settings.MONO_WEBHOOK_SECRET, help='mono-webhook-secret header')
+        parser.add_argument('--process', action='store_true', help='Apply the queued events afterwards')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file']) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        else:
+            keys = list(Connection.objects.order_by('?').values_list('mono_id', flat=True)[:options['connections']])
+            if not keys:
+                raise CommandError('No connections to send events for; seed some first')
+            events = list(synthetic_events(options['events'], keys, options['reauth_share']))
+
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+        queue = iter(events)
+
+        def sender():
+            session = requests.Session()
+            headers = {'mono-webhook-secret': options['secret']}
+            local, codes = [], {}
+            while True:
+                with lock:
+                    payload = next(queue, None)
+                if payload is None:
+                    break
+                started = time.perf_counter()
+                try:
+                    code = session.post(options['url'], json=payload, headers=headers, timeout=30).status_code
+                except requests.RequestException:
+                    code = 'error'
+                local.append(time.perf_counter() - started)
+                codes[code] = codes.get(code, 0) + 1
+            with lock:
+                latencies.extend(local)
+                for code, count in codes.items():
+                    statuses[code] = statuses.get(code, 0) + count
+
+        threads = [threading.Thread(target=sender) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        count = len(latencies)
+
+        def pct(p):
+            return latencies[min(count - 1, int(count * p))] * 1000
+
+        self.stdout.write(
+            f'{count} events in {elapsed:.1f}s = {count / elapsed:.1f} events/s, responses {statuses}\n'
+            f'latency p50 {pct(0.5):.1f} ms  p95 {pct(0.95):.1f} ms  p99 {pct(0.99):.1f} ms'
+        )
+
+        if options['process']:
+            totals = dict.fromkeys(('events', 'synced', 'reauth', 'failed', 'unmatched'), 0)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                while True:
+                    stats = webhooks.process_pending()
+                    if not stats['events']:
+                        break
+                    for key, value in stats.items():
+                        totals[key] += value
+            self.stdout.write(
+                f'Applied {totals["events"]} events in {time.perf_counter() - started:.2f}s: '
+                f'{totals["synced"]} syncs, {totals["reauth"]} reauth, {totals["failed"]} failed, '
+                f'{totals["unmatched"]} unmatched, {len(queries)} queries'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ Replayed {count} events'))
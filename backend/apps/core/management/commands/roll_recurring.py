@@ -0,0 +1,21 @@
+"""
+Roll recurring transactions forward
+Advances next_date of every active recurring item whose due date has passed;
+meant to run daily from the scheduler
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.core import recurrence
+
+
+class Command(BaseCommand):
+    help = 'Advance next_date of past-due recurring transactions to their next occurrence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Roll forward as of this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        updated = recurrence.roll_forward(today=options['date'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Advanced {updated} recurring transactions'))
@@ -0,0 +1,72 @@
+"""
+Run scheduled bank connection syncs
+Claims connections whose next_sync_at has passed and syncs them on a thread
+pool, at most --concurrency at once and --per-institution per bank, retrying
+failures with exponential backoff (see apps.core.scheduler). Runs until
+stopped, or until nothing is due with --once
+"""
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Sync due bank connections within global and per-institution concurrency caps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no connection is due')
+        parser.add_argument('--concurrency', type=int, default=settings.SYNC_MAX_CONCURRENCY,
+                            help='Syncs running at once in total')
+        parser.add_argument('--per-institution', type=int, default=settings.SYNC_MAX_PER_INSTITUTION,
+                            help='Syncs running at once per institution')
+        parser.add_argument('--interval', type=float, default=settings.SYNC_POLL_SECONDS,
+                            help='Seconds between checks for due connections')
+        parser.add_argument('--stats-every', type=float, default=60, help='Seconds between queue lag reports')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        running = {}  # future -> institution
+        synced = failed = 0
+        reported = time.monotonic()
+        self.report()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sync') as pool:
+            try:
+                while True:
+                    claimed = scheduler.claim(
+                        Counter(running.values()), concurrency - len(running), options['per_institution'],
+                    )
+                    for pk, institution in claimed:
+                        running[pool.submit(scheduler.sync_one, pk)] = institution
+                    if not running:
+                        if options['once']:
+                            break
+                        connections.close_all()
+                        time.sleep(options['interval'])
+                    else:
+                        done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                        for future in done:
+                            running.pop(future)
+                            if future.result():
+                                synced += 1
+                            else:
+                                failed += 1
+                    if time.monotonic() - reported >= options['stats_every']:
+                        reported = time.monotonic()
+                        self.report()
+            except KeyboardInterrupt:
+                pass
+        self.report()
+        self.stdout.write(self.style.SUCCESS(f'✅ {synced} connections synced, {failed} failed'))
+
+    def report(self):
+        stats = scheduler.queue_stats()
+        self.stdout.write(
+            f'{stats["due"]} due, lag {stats["lag_seconds"]}s, stalest sync {stats["stalest_sync_seconds"]}s, '
+            f'{stats["never_synced"]} never synced, {stats["reauth_required"]} need reauth'
+        )
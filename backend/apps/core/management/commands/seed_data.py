@@ -4,6 +4,7 @@ Creates demo categories, accounts, transactions, budgets, goals, and recurring
 """
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from apps.core import catalog, ledger, merchants
 from apps.core.models import (
     Category, Account, Transaction, Budget, Goal, 
     GoalContribution, RecurringTransaction, Connection
@@ -133,12 +134,15 @@ class Command(BaseCommand):
             ('Other Income', '📥', '#64748b'),
         ]
 
-        for name, icon, color in expense_categories + income_categories:
-            Category.objects.get_or_create(
-                name=name,
-                is_system=True,
-                defaults={'icon': icon, 'color': color}
-            )
+        existing = catalog.system().by_name
+        missing = [
+            Category(name=name, icon=icon, color=color, is_system=True)
+            for name, icon, color in expense_categories + income_categories
+            if name not in existing
+        ]
+        if missing:
+            Category.objects.bulk_create(missing)
+            catalog.changed()
         
         self.stdout.write(f'Created {len(expense_categories) + len(income_categories)} categories')
 
@@ -187,7 +191,7 @@ class Command(BaseCommand):
             self.stdout.write('Transactions already exist, skipping...')
             return
 
-        categories = {c.name: c for c in Category.objects.filter(is_system=True)}
+        categories = {name: entry.id for name, entry in catalog.system().by_name.items()}
         
         # Transaction templates
         expense_templates = [
@@ -233,7 +237,7 @@ class Command(BaseCommand):
                     merchant_name=merchant,
                     amount=amount,
                     type='debit',
-                    category=categories.get(cat_name),
+                    category_id=categories.get(cat_name),
                 ))
             
             # Income - salary once a month, occasional freelance
@@ -247,7 +251,7 @@ class Command(BaseCommand):
                     merchant_name=template[0],
                     amount=Decimal(template[3][0]),
                     type='credit',
-                    category=categories.get(template[2]),
+                    category_id=categories.get(template[2]),
                 ))
             
             # Random freelance income
@@ -261,10 +265,11 @@ class Command(BaseCommand):
                     merchant_name=template[0],
                     amount=Decimal(random.randint(template[3][0], template[3][1])),
                     type='credit',
-                    category=categories.get(template[2]),
+                    category_id=categories.get(template[2]),
                 ))
 
-        Transaction.objects.bulk_create(transactions)
+        Transaction.objects.bulk_create(merchants.attach(transactions))
+        ledger.rebuild([user.id])
         self.stdout.write(f'Created {len(transactions)} transactions')
 
     def create_budgets(self, user):
@@ -273,7 +278,7 @@ class Command(BaseCommand):
             self.stdout.write('Budgets already exist, skipping...')
             return
 
-        categories = {c.name: c for c in Category.objects.filter(is_system=True)}
+        categories = {name: entry.id for name, entry in catalog.system().by_name.items()}
         
         budgets_data = [
             ('Food & Dining', 80000),
@@ -285,11 +290,11 @@ class Command(BaseCommand):
         ]
         
         for cat_name, amount in budgets_data:
-            category = categories.get(cat_name)
-            if category:
+            category_id = categories.get(cat_name)
+            if category_id:
                 Budget.objects.create(
                     user=user,
-                    category=category,
+                    category_id=category_id,
                     amount=Decimal(amount),
                     period='monthly',
                 )
@@ -338,7 +343,7 @@ class Command(BaseCommand):
             self.stdout.write('Recurring transactions already exist, skipping...')
             return
 
-        categories = {c.name: c for c in Category.objects.filter(is_system=True)}
+        categories = {name: entry.id for name, entry in catalog.system().by_name.items()}
         today = date.today()
         
         recurring_data = [
@@ -366,7 +371,8 @@ class Command(BaseCommand):
                 amount=Decimal(amount),
                 frequency=freq,
                 next_date=next_date,
-                category=categories.get(cat_name),
+                day_of_month=due_day,
+                category_id=categories.get(cat_name),
                 account=accounts[0],
                 status='active',
                 reminder_days=3,
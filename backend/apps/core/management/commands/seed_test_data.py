@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from apps.core import catalog, ledger
+from apps.core.merchants import attach as attach_merchants
 from apps.core.models import (
     User, Connection, Account, Category, Transaction,
     CategoryRule, Budget, Goal, GoalContribution,
@@ -112,6 +114,7 @@ class Command(BaseCommand):
             categories[slug] = cat
             if created:
                 self.stdout.write(f'  ✅ Created category: {name}')
+                catalog.changed()
         
         return categories
 
@@ -227,7 +230,8 @@ class Command(BaseCommand):
                     is_recurring=True,
                 ))
         
-        Transaction.objects.bulk_create(transactions)
+        Transaction.objects.bulk_create(attach_merchants(transactions))
+        ledger.rebuild([user.id])
         self.stdout.write(f'  ✅ Created {len(transactions)} transactions')
 
     def create_budgets(self, user, categories):
@@ -0,0 +1,187 @@
+"""Merchant name normalization
+
+`normalize_merchant` collapses raw merchant names and descriptions to a key.
+`resolve` maps keys to canonical Merchant rows. MerchantAlias patterns
+come first:
+- exact keys go through one dict lookup
+- prefixes are bucketed by their first token
+- regexes are compiled into one alternation
+
+A key no alias claims is its own merchant, created on first sight.
+
+Each process caches the compiled aliases, checked against a version key in
+the shared cache that `aliases_changed` bumps, and the keys it has resolved
+to ids, so steady-state ingestion costs no queries.
+"""
+import re
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+
+from .models import Merchant, MerchantAlias
+
+_NOISE = re.compile(r'[^a-z ]+')
+_DISPLAY_NOISE = re.compile(r"[^A-Za-z&'. -]+")
+_SPACES = re.compile(r'\s+')
+_PREFIXES = ('pos ', 'web ', 'trf ', 'nip ', 'ussd ', 'purchase ', 'payment to ', 'transfer to ')
+
+MAX_KEYS = 50000
+VERSION_KEY = 'merchants:aliases:version'
+
+LINK_SQL = """
+UPDATE transactions t
+SET merchant_id = m.merchant_id
+FROM unnest(%s::uuid[], %s::date[], %s::bigint[]) AS m(id, date, merchant_id)
+WHERE t.id = m.id AND t.date = m.date AND t.merchant_id IS DISTINCT FROM m.merchant_id
+"""
+
+_lock = threading.Lock()
+_aliases = {'version': None, 'rules': None}
+_keys = {}  # key -> merchant id
+
+
+def normalize_merchant(text):
+    """Collapse raw merchant/description text to a grouping key.
+
+    "UBER *TRIP 1234" and "Uber trip" both become "uber trip".
+    """
+    key = _SPACES.sub(' ', _NOISE.sub(' ', (text or '').lower())).strip()
+    for prefix in _PREFIXES:
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+    return key
+
+
+class AliasRules:
+    """MerchantAlias patterns compiled for matching normalized keys"""
+
+    def __init__(self, aliases):
+        self.exact = {}
+        self.prefixes = defaultdict(list)  # first token -> [(prefix, merchant id)], longest first
+        regexes = []
+        for match_type, pattern, merchant_id in aliases:
+            if match_type == 'regex':
+                try:
+                    re.compile(pattern)
+                except re.error:
+                    continue
+                regexes.append((pattern, merchant_id))
+                continue
+            key = normalize_merchant(pattern)
+            if not key:
+                continue
+            if match_type == 'exact':
+                self.exact[key] = merchant_id
+            elif match_type == 'prefix':
+                self.prefixes[key.split(' ', 1)[0]].append((key, merchant_id))
+        for bucket in self.prefixes.values():
+            bucket.sort(key=lambda item: len(item[0]), reverse=True)
+        self.regex_ids = [merchant_id for _, merchant_id in regexes]
+        self.regex = re.compile(
+            '|'.join(f'(?P<m{i}>{pattern})' for i, (pattern, _) in enumerate(regexes))
+        ) if regexes else None
+
+    def match(self, key):
+        """Merchant id an alias assigns to `key`, or None"""
+        if key in self.exact:
+            return self.exact[key]
+        for prefix, merchant_id in self.prefixes.get(key.split(' ', 1)[0], ()):
+            if key == prefix or key.startswith(prefix + ' '):
+                return merchant_id
+        if self.regex:
+            found = self.regex.match(key)
+            if found:
+                return self.regex_ids[int(found.lastgroup[1:])]
+        return None
+
+
+def _rules():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    with _lock:
+        if version is None or _aliases['version'] != version:
+            aliases = MerchantAlias.objects.using(DEFAULT_DB_ALIAS).values_list('match_type', 'pattern', 'merchant_id')
+            _aliases.update(version=version, rules=AliasRules(aliases))
+        return _aliases['rules']
+
+
+def _remember(found):
+    with _lock:
+        if len(_keys) + len(found) > MAX_KEYS:
+            _keys.clear()
+        _keys.update(found)
+
+
+def display_name(text):
+    """Name for a new merchant: the first raw text seen, minus digits and symbols"""
+    return _SPACES.sub(' ', _DISPLAY_NOISE.sub(' ', text)).strip()[:255]
+
+
+def resolve(texts):
+    """Merchant ids for raw merchant texts, in order; None where the text normalizes
+    to nothing. Creates a canonical merchant for each key not seen before.
+    """
+    rules = _rules()
+    texts = list(texts)
+    keys = [normalize_merchant(text) for text in texts]
+    ids, missing = {}, set()
+    for key in set(keys) - {''}:
+        merchant_id = rules.match(key) or _keys.get(key)
+        if merchant_id:
+            ids[key] = merchant_id
+        else:
+            missing.add(key)
+    if missing:
+        found = dict(Merchant.objects.filter(key__in=missing).values_list('key', 'id'))
+        new = missing - set(found)
+        if new:
+            raw = {}
+            for key, text in zip(keys, texts):
+                if key in new:
+                    raw.setdefault(key, text)
+            Merchant.objects.bulk_create(
+                [Merchant(key=key, name=display_name(raw[key])) for key in sorted(new)], ignore_conflicts=True,
+            )
+            found.update(Merchant.objects.filter(key__in=new).values_list('key', 'id'))
+        ids.update(found)
+        # Only cache ids once they're committed, in case the caller rolls back
+        transaction.on_commit(lambda: _remember(found))
+    return [ids.get(key) for key in keys]
+
+
+def attach(transactions):
+    """Set merchant_id on unsaved Transaction instances from their merchant name or description"""
+    transactions = list(transactions)
+    ids = resolve(txn.merchant_name or txn.description for txn in transactions)
+    for txn, merchant_id in zip(transactions, ids):
+        txn.merchant_id = merchant_id
+    return transactions
+
+
+def link(rows):
+    """Point stored transactions at their merchants. `rows` are (id, date, merchant
+    text); returns the number of transactions changed.
+    """
+    rows = list(rows)
+    merchant_ids = resolve(text for _, _, text in rows)
+    with connection.cursor() as cursor:
+        cursor.execute(LINK_SQL, [[row[0] for row in rows], [row[1] for row in rows], merchant_ids])
+        return cursor.rowcount
+
+
+def clear_cache():
+    with _lock:
+        _aliases.update(version=None, rules=None)
+        _keys.clear()
+
+
+def aliases_changed():
+    """Make every process recompile aliases; existing transactions keep their
+    merchant until `backfill_merchants --all` re-resolves them
+    """
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
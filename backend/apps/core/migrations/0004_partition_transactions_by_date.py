@@ -0,0 +1,118 @@
+# Converts the transactions table into a RANGE (date) partitioned table.
+#
+# The existing table is attached as a single `transactions_legacy` partition
+# instead of being copied: its bound is proven by a CHECK constraint that is
+# validated (SHARE UPDATE EXCLUSIVE, reads and writes keep flowing) and the
+# unique (id, date) index that becomes its primary key is built CONCURRENTLY
+# beforehand, so the final swap only holds a brief lock.
+
+from datetime import date
+
+from django.db import migrations, models
+
+LEGACY_BOUND = 'transactions_legacy_bound'
+MONTHS_AHEAD = 3
+USER_DATE_INDEX = models.Index(fields=['user', 'date'], name='transactions_user_date_idx')
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _cutover(cursor):
+    cursor.execute("SELECT GREATEST(COALESCE(MAX(date), CURRENT_DATE), CURRENT_DATE) FROM transactions")
+    return _next_month(cursor.fetchone()[0])
+
+
+def prepare_legacy_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cutover = _cutover(cursor)
+        cursor.execute(f"ALTER TABLE transactions DROP CONSTRAINT IF EXISTS {LEGACY_BOUND}")
+        cursor.execute(
+            f"ALTER TABLE transactions ADD CONSTRAINT {LEGACY_BOUND} "
+            f"CHECK (date < '{cutover.isoformat()}') NOT VALID"
+        )
+        cursor.execute(f"ALTER TABLE transactions VALIDATE CONSTRAINT {LEGACY_BOUND}")
+        cursor.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS transactions_legacy_id_date "
+            "ON transactions (id, date)"
+        )
+        cursor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS transactions_legacy_user_date "
+            "ON transactions (user_id, date)"
+        )
+
+
+def swap_in_partitioned_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        Transaction = apps.get_model('core', 'Transaction')
+        schema_editor.add_index(Transaction, USER_DATE_INDEX)
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = %s",
+            [LEGACY_BOUND]
+        )
+        cutover = date.fromisoformat(cursor.fetchone()[0].split("'")[1])
+
+        partitions = []
+        month = cutover
+        for _ in range(MONTHS_AHEAD + 1):
+            following = _next_month(month)
+            partitions.append(
+                f"CREATE TABLE transactions_p{month.year}_{month.month:02d} PARTITION OF transactions "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}');"
+            )
+            month = following
+
+        # One multi-statement batch runs as a single implicit transaction.
+        cursor.execute(f"""
+            LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE;
+            ALTER TABLE transactions DROP CONSTRAINT transactions_pkey;
+            ALTER TABLE transactions ADD CONSTRAINT transactions_legacy_pkey
+                PRIMARY KEY USING INDEX transactions_legacy_id_date;
+            ALTER TABLE transactions RENAME TO transactions_legacy;
+
+            CREATE TABLE transactions (LIKE transactions_legacy INCLUDING DEFAULTS)
+                PARTITION BY RANGE (date);
+            ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (id, date);
+            ALTER TABLE transactions ADD CONSTRAINT transactions_account_id_fk
+                FOREIGN KEY (account_id) REFERENCES accounts (id) DEFERRABLE INITIALLY DEFERRED;
+            ALTER TABLE transactions ADD CONSTRAINT transactions_user_id_fk
+                FOREIGN KEY (user_id) REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED;
+            ALTER TABLE transactions ADD CONSTRAINT transactions_category_id_fk
+                FOREIGN KEY (category_id) REFERENCES categories (id) DEFERRABLE INITIALLY DEFERRED;
+
+            ALTER TABLE transactions ATTACH PARTITION transactions_legacy
+                FOR VALUES FROM (MINVALUE) TO ('{cutover.isoformat()}');
+
+            CREATE INDEX transactions_part_account_id ON transactions (account_id);
+            CREATE INDEX transactions_part_category_id ON transactions (category_id);
+            CREATE INDEX transactions_user_date_idx ON transactions (user_id, date);
+
+            {' '.join(partitions)}
+            CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
+        """)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0003_recurringtransaction_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(prepare_legacy_table, atomic=False),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='transaction', index=USER_DATE_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(swap_in_partitioned_table, atomic=False),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Adds the per-account running balance ledger (see apps.core.ledger). The
+# columns start empty: one UPDATE of every transaction would lock the whole
+# table for its duration, so existing data is backfilled afterwards, a batch
+# of accounts per transaction, with `manage.py rebuild_ledger --missing`.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'created_at', 'id'], name='transactions_ledger_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Materialized category paths (see apps.core.categories).
+#
+# Existing trees are backfilled with one recursive query, then two triggers
+# keep paths current: a BEFORE trigger derives a row's path from its parent's
+# on every insert and update (rejecting moves under the row's own subtree),
+# and an AFTER trigger re-derives the children of a row whose path changed,
+# which cascades down the subtree. Re-parenting, and Django's SET_NULL when a
+# parent is deleted, are both plain updates of parent_id.
+
+from django.db import migrations, models
+
+BACKFILL = """
+WITH RECURSIVE tree AS (
+    SELECT id, id::text || '/' AS path FROM categories WHERE parent_id IS NULL
+    UNION ALL
+    SELECT c.id, tree.path || c.id::text || '/'
+    FROM categories c JOIN tree ON c.parent_id = tree.id
+    WHERE position(c.id::text IN tree.path) = 0
+)
+UPDATE categories SET path = tree.path FROM tree WHERE categories.id = tree.id
+"""
+
+INSTALL_TRIGGERS = """
+CREATE FUNCTION categories_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path text;
+BEGIN
+    IF NEW.parent_id IS NULL THEN
+        NEW.path := NEW.id::text || '/';
+        RETURN NEW;
+    END IF;
+    SELECT path INTO parent_path FROM categories WHERE id = NEW.parent_id;
+    IF position(NEW.id::text IN COALESCE(parent_path, '')) > 0 THEN
+        RAISE EXCEPTION 'category % cannot be moved under its own subtree', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    NEW.path := COALESCE(parent_path, '') || NEW.id::text || '/';
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION categories_update_children() RETURNS trigger AS $$
+BEGIN
+    IF NEW.path IS DISTINCT FROM OLD.path THEN
+        UPDATE categories SET path = '' WHERE parent_id = NEW.id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER categories_set_path BEFORE INSERT OR UPDATE ON categories
+    FOR EACH ROW EXECUTE FUNCTION categories_set_path();
+CREATE TRIGGER categories_update_children AFTER UPDATE ON categories
+    FOR EACH ROW EXECUTE FUNCTION categories_update_children();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS categories_update_children ON categories;
+DROP TRIGGER IF EXISTS categories_set_path ON categories;
+DROP FUNCTION IF EXISTS categories_update_children();
+DROP FUNCTION IF EXISTS categories_set_path();
+"""
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(BACKFILL)
+        cursor.execute(INSTALL_TRIGGERS)
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DROP_TRIGGERS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_balancesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='categories_path_idx', opclasses=['text_pattern_ops']),
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
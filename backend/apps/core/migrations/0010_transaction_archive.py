@@ -0,0 +1,76 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:06
+#
+# Creates the cold `transactions_archive` table with the columns of
+# transactions, and the `transactions_history` view over both that
+# TransactionHistory maps (see apps.core.archive). Rows are moved by
+# `manage.py archive_transactions`.
+
+from django.db import migrations, models
+
+
+def create_archive(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor != 'postgresql':
+            cursor.execute("CREATE TABLE transactions_archive AS SELECT * FROM transactions WHERE 1 = 0")
+        else:
+            # Archived rows are never updated, so pages can be packed full
+            cursor.execute("""
+                CREATE TABLE transactions_archive (LIKE transactions INCLUDING DEFAULTS)
+                    WITH (fillfactor = 100);
+                ALTER TABLE transactions_archive
+                    ADD CONSTRAINT transactions_archive_pkey PRIMARY KEY (id, date),
+                    ADD CONSTRAINT transactions_archive_account_fk
+                        FOREIGN KEY (account_id) REFERENCES accounts (id) ON DELETE CASCADE,
+                    ADD CONSTRAINT transactions_archive_user_fk
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                    ADD CONSTRAINT transactions_archive_category_fk
+                        FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE SET NULL,
+                    ADD CONSTRAINT transactions_archive_merchant_fk
+                        FOREIGN KEY (merchant_id) REFERENCES merchants (id) ON DELETE SET NULL;
+            """)
+        cursor.execute("CREATE INDEX transactions_archive_user_date ON transactions_archive (user_id, date)")
+        cursor.execute("CREATE INDEX transactions_archive_date ON transactions_archive (date)")
+        cursor.execute(
+            "CREATE VIEW transactions_history AS "
+            "SELECT * FROM transactions UNION ALL SELECT * FROM transactions_archive"
+        )
+
+
+def drop_archive(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM transactions_archive LIMIT 1")
+        if cursor.fetchone():
+            raise RuntimeError('transactions_archive is not empty: run `archive_transactions --restore` first')
+        cursor.execute("DROP VIEW transactions_history")
+        cursor.execute("DROP TABLE transactions_archive")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_merchants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_archive, drop_archive),
+        migrations.CreateModel(
+            name='TransactionHistory',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('description', models.CharField(max_length=500)),
+                ('merchant_name', models.CharField(blank=True, max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('type', models.CharField(max_length=10)),
+                ('notes', models.TextField(blank=True)),
+                ('is_recurring', models.BooleanField(default=False)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=15, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'transactions_history',
+                'ordering': ['-date', '-created_at'],
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:14
+#
+# Serves the columnar cache's "created since the watermark" reads
+# (apps.core.columnar) on both sides of the transactions_history view.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at'], name='transactions_user_created_idx'),
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX transactions_archive_user_created ON transactions_archive (user_id, created_at)",
+            "DROP INDEX transactions_archive_user_created",
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_transaction_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='export',
+            index=models.Index(condition=models.Q(('status', 'processing')), fields=['created_at'], name='exports_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:28
+#
+# Schedules existing connections for the sync scheduler (apps.core.scheduler)
+# at random times over the next day, rather than all at once.
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connection',
+            name='next_sync_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='sync_failures',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(condition=models.Q(('status', 'connected')), fields=['next_sync_at'], name='connections_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(condition=models.Q(('status', 'connected')), fields=['last_synced_at'], name='connections_synced_idx'),
+        ),
+        migrations.RunSQL(
+            "UPDATE connections SET next_sync_at = now() + random() * interval '1 day'",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:41
+#
+# Records the day each recurring item falls on, so month-based schedules clamp
+# from it rather than from a next_date already clamped to a short month.
+# Existing items take next_date's day.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_connection_sync_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringtransaction',
+            name='day_of_month',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE recurring_transactions SET day_of_month = EXTRACT(DAY FROM next_date)",
+            migrations.RunSQL.noop,
+        ),
+    ]
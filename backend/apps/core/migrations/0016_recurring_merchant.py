@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:53
+#
+# Recurring items remember their canonical merchant, so detection dedupes on
+# it rather than on names that aliases map together. Existing items get it
+# from their name the next time detection runs for their user.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recurring_day_of_month'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringtransaction',
+            name='merchant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.merchant'),
+        ),
+    ]
@@ -2,6 +2,7 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -24,10 +25,21 @@ class Connection(models.Model):
     institution_logo = models.URLField(blank=True)
     status = models.CharField(max_length=20, default='connected')
     last_synced_at = models.DateTimeField(null=True)
+    # When the scheduler syncs it next, and failed attempts since the last success (see apps.core.scheduler)
+    next_sync_at = models.DateTimeField(null=True, default=timezone.now)
+    sync_failures = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'connections'
+        indexes = [
+            models.Index(
+                fields=['next_sync_at'], name='connections_due_idx', condition=models.Q(status='connected'),
+            ),
+            models.Index(
+                fields=['last_synced_at'], name='connections_synced_idx', condition=models.Q(status='connected'),
+            ),
+        ]
 
 
 class Account(models.Model):
@@ -37,13 +49,15 @@ class Account(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     connection = models.ForeignKey(Connection, on_delete=models.CASCADE, related_name='accounts')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='accounts')
-    mono_account_id = models.CharField(max_length=255, blank=True, default='')
+    mono_account_id = models.CharField(max_length=255, blank=True, default='', db_index=True)
     name = models.CharField(max_length=255)
     type = models.CharField(max_length=20, choices=TYPES)
     account_number_masked = models.CharField(max_length=20)
     currency = models.CharField(max_length=3, default='NGN')
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     available_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    # Balance before the first transaction on record, the start of the ledger (see apps.core.ledger)
+    opening_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     last_synced_at = models.DateTimeField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -51,6 +65,39 @@ class Account(models.Model):
         db_table = 'accounts'
 
 
+class BalanceSnapshot(models.Model):
+    """End-of-day account balance, thinned with age (see apps.core.snapshots)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    
+    class Meta:
+        db_table = 'balance_snapshots'
+        # Also serves per-account date range reads
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='balance_snapshots_account_date_uniq'),
+        ]
+
+
+class ExchangeRate(models.Model):
+    """Daily FX rate: units of `quote` per one `base` (see apps.core.fx)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    base = models.CharField(max_length=3)
+    quote = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    source = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'exchange_rates'
+        # Also serves the "latest rate on or before a date" lookup
+        constraints = [
+            models.UniqueConstraint(fields=['base', 'quote', 'date'], name='exchange_rates_pair_date_uniq'),
+        ]
+
+
 class Category(models.Model):
     """Transaction category"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -60,10 +107,37 @@ class Category(models.Model):
     color = models.CharField(max_length=7)
     is_system = models.BooleanField(default=False)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True)
+    # "<root id>/.../<own id>/", kept current by database triggers (see apps.core.categories)
+    path = models.TextField(default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'categories'
+        indexes = [models.Index(fields=['path'], name='categories_path_idx', opclasses=['text_pattern_ops'])]
+
+
+class Merchant(models.Model):
+    """Canonical merchant that transactions resolve to (see apps.core.merchants)"""
+    # Integer key, so transactions group and join on a compact column
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True)  # normalize_merchant() form
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'merchants'
+
+
+class MerchantAlias(models.Model):
+    """Pattern that maps normalized merchant text to a canonical merchant"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    merchant = models.ForeignKey(Merchant, on_delete=models.CASCADE, related_name='aliases')
+    match_type = models.CharField(max_length=20)  # exact/prefix/regex
+    pattern = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'merchant_aliases'
 
 
 class Transaction(models.Model):
@@ -74,16 +148,53 @@ class Transaction(models.Model):
     date = models.DateField()
     description = models.CharField(max_length=500)
     merchant_name = models.CharField(max_length=255, blank=True)
+    merchant = models.ForeignKey(Merchant, on_delete=models.SET_NULL, null=True, related_name='transactions')
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     type = models.CharField(max_length=10)  # debit/credit
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     notes = models.TextField(blank=True)
     is_recurring = models.BooleanField(default=False)
+    # Account balance after this transaction in (date, created_at, id) order, see apps.core.ledger
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'transactions'
         ordering = ['-date', '-created_at']
+        # Partitioned by RANGE (date) in PostgreSQL, see apps.core.partitions
+        indexes = [
+            models.Index(fields=['user', 'date'], name='transactions_user_date_idx'),
+            models.Index(fields=['account', 'date', 'created_at', 'id'], name='transactions_ledger_idx'),
+            # Watermark reads of the columnar cache, see apps.core.columnar
+            models.Index(fields=['user', 'created_at'], name='transactions_user_created_idx'),
+        ]
+
+
+class TransactionHistory(models.Model):
+    """Read-only view over hot and archived transactions, see apps.core.archive.
+
+    Mirrors Transaction's columns: a migration that changes those must change
+    transactions_archive and the transactions_history view to match.
+    """
+    id = models.UUIDField(primary_key=True)
+    account = models.ForeignKey(Account, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    date = models.DateField()
+    description = models.CharField(max_length=500)
+    merchant_name = models.CharField(max_length=255, blank=True)
+    merchant = models.ForeignKey(Merchant, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    type = models.CharField(max_length=10)
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    notes = models.TextField(blank=True)
+    is_recurring = models.BooleanField(default=False)
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2, null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'transactions_history'
+        ordering = ['-date', '-created_at']
 
 
 class Budget(models.Model):
@@ -137,8 +248,13 @@ class RecurringTransaction(models.Model):
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     frequency = models.CharField(max_length=20)
     next_date = models.DateField()
+    # Day monthly/quarterly/yearly occurrences fall on, clamped in shorter months;
+    # next_date's day when unset
+    day_of_month = models.PositiveSmallIntegerField(null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True)
+    # Canonical merchant the item was detected from (or its name resolves to)
+    merchant = models.ForeignKey(Merchant, on_delete=models.SET_NULL, null=True, related_name='+')
     status = models.CharField(max_length=20, default='active')
     type = models.CharField(max_length=20, default='bill')
     reminder_days = models.IntegerField(null=True)
@@ -193,3 +309,30 @@ class Export(models.Model):
     
     class Meta:
         db_table = 'exports'
+        # Queue depth and oldest pending job for /ready, see apps.core.readiness
+        indexes = [
+            models.Index(
+                fields=['created_at'], name='exports_pending_idx', condition=models.Q(status='processing'),
+            ),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """Provider webhook event, stored on receipt and applied later (see apps.core.webhooks)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.CharField(max_length=100)
+    # The provider's account id the event is about (Connection.mono_id or Account.mono_account_id)
+    account_key = models.CharField(max_length=255)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'webhook_events'
+        indexes = [
+            models.Index(
+                fields=['received_at'], name='webhook_events_pending_idx', condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
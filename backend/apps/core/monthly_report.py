@@ -0,0 +1,182 @@
+"""Monthly report computed in a single GROUPING SETS query
+
+Every transaction of the report month and the month before it is converted
+to the report currency once and grouped three ways in the same pass: per
+(month, type) for the totals and the month-on-month comparison, per category
+for spending, income sources and budget performance, and per canonical
+merchant (apps.core.merchants) for top merchants. Parent-category and budget
+figures roll the per-category totals up along catalog paths, so
+subcategories count toward their ancestors without further queries.
+"""
+import calendar
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import BooleanField, Case, F, Value, When
+
+from . import archive, catalog, categories, fx
+from .dates import add_months, month_bounds
+from .insights import monthly_limit
+from .models import Budget
+
+TOP_MERCHANTS = 10
+
+REPORT_SQL = """
+SELECT t.is_current, t.type, t.category_id, t.merchant_id, t.merchant_label,
+       GROUPING(t.category_id, t.merchant_id), SUM(t.converted), COUNT(*)
+FROM ({rows}) t
+GROUP BY GROUPING SETS (
+    (t.is_current, t.type),
+    (t.is_current, t.type, t.category_id),
+    (t.is_current, t.type, t.merchant_id, t.merchant_label)
+)
+"""
+
+# GROUPING() of (category_id, merchant_id) for each set: a bit is set when
+# that column is rolled up
+TOTALS, BY_CATEGORY, BY_MERCHANT = 3, 1, 2
+
+
+def budget_status(percentage):
+    if percentage >= 100:
+        return 'over'
+    if percentage >= 90:
+        return 'critical'
+    if percentage >= 70:
+        return 'warning'
+    return 'on_track'
+
+
+def _change_percent(amount, previous):
+    if not previous:
+        return 100.0 if amount else 0.0
+    return round(float((amount - previous) / previous * 100), 1)
+
+
+def _share(amount, total):
+    return float(amount / total * 100) if total > 0 else 0
+
+
+def report_query(user_id, currency, start, end):
+    """(sql, params, database alias) of REPORT_SQL over [previous month start, end)"""
+    since = add_months(start, -1)
+    rows = archive.transactions(since).filter(
+        user_id=user_id, date__gte=since, date__lt=end,
+    ).annotate(
+        is_current=Case(When(date__gte=start, then=Value(True)), default=Value(False), output_field=BooleanField()),
+        converted=fx.converted(currency),
+        merchant_label=F('merchant__name'),
+    ).values('is_current', 'type', 'category_id', 'merchant_id', 'merchant_label', 'converted')
+    sql, params = rows.query.get_compiler(rows.db).as_sql()
+    return REPORT_SQL.format(rows=sql), params, rows.db
+
+
+def _grouped(user_id, currency, start, end):
+    """Rows of REPORT_SQL over [previous month start, end)"""
+    sql, params, alias = report_query(user_id, currency, start, end)
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _by_category(totals, known, overall):
+    items = []
+    for category_id, amount in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        entry = known.get(category_id)
+        items.append({
+            'category_id': str(category_id) if category_id else None,
+            'category_name': entry.name if entry else None,
+            'category_color': entry.color if entry else None,
+            'amount': float(amount),
+            'percentage': _share(amount, overall),
+        })
+    return items
+
+
+def monthly_report(user_id, currency, year, month):
+    """The report for `year`-`month` in `currency`, as returned by the API"""
+    start, end = month_bounds(year, month)
+    totals = {}
+    spending, income_sources = {}, {}
+    merchants = {True: {}, False: {}}
+    rows = _grouped(user_id, currency, start, end)
+    for is_current, txn_type, category_id, merchant_id, merchant, grouping, amount, count in rows:
+        # Amounts in a currency without rates convert to NULL
+        amount = amount or Decimal(0)
+        if grouping == TOTALS:
+            totals[is_current, txn_type] = amount
+        elif grouping == BY_CATEGORY and is_current:
+            (spending if txn_type == 'debit' else income_sources)[category_id] = amount
+        elif grouping == BY_MERCHANT and txn_type == 'debit' and merchant_id:
+            merchants[is_current][merchant_id] = (merchant, amount, count)
+
+    income, expenses = totals.get((True, 'credit'), Decimal(0)), totals.get((True, 'debit'), Decimal(0))
+    previous_income = totals.get((False, 'credit'), Decimal(0))
+    previous_expenses = totals.get((False, 'debit'), Decimal(0))
+    known = catalog.for_user(user_id)
+
+    top_merchants = []
+    for merchant_id, (name, amount, count) in sorted(
+        merchants[True].items(), key=lambda item: item[1][1], reverse=True,
+    )[:TOP_MERCHANTS]:
+        previous = merchants[False].get(merchant_id, (None, Decimal(0), 0))[1]
+        top_merchants.append({
+            'merchant_id': merchant_id,
+            'merchant_name': name,
+            'amount': float(amount),
+            'transaction_count': count,
+            'percentage': _share(amount, expenses),
+            'previous_amount': float(previous),
+            'change_percent': _change_percent(amount, previous),
+        })
+
+    days_in_month = calendar.monthrange(year, month)[1]
+    budget_performance = []
+    for budget in Budget.objects.filter(user_id=user_id).only('id', 'category_id', 'amount', 'period'):
+        entry = known.get(budget.category_id)
+        spent = categories.subtree_total(spending, known, entry.path) if entry else Decimal(0)
+        limit = monthly_limit(budget, days_in_month)
+        percentage = float(spent) / limit * 100 if limit > 0 else 0
+        budget_performance.append({
+            'budget_id': str(budget.id),
+            'category_id': str(budget.category_id),
+            'category_name': entry.name if entry else None,
+            'category_color': entry.color if entry else None,
+            'budgeted': round(limit, 2),
+            'spent': float(spent),
+            'remaining': round(limit - float(spent), 2),
+            'percentage': round(percentage, 1),
+            'status': budget_status(percentage),
+        })
+
+    return {
+        'currency': currency,
+        'unconverted_currencies': fx.unconvertible(user_id, currency),
+        'summary': {
+            'total_income': float(income),
+            'total_expenses': float(expenses),
+            'net': float(income - expenses),
+            'savings_rate': float((income - expenses) / income * 100) if income else 0
+        },
+        'spending_by_category': _by_category(spending, known, expenses),
+        # Subcategory spend rolled up into its top-level category
+        'spending_by_parent_category': [
+            {
+                'category_id': str(root.id) if root else None,
+                'category_name': root.name if root else None,
+                'category_color': root.color if root else None,
+                'amount': float(total),
+                'percentage': _share(total, expenses),
+            }
+            for root, total in categories.roll_up(spending, known)
+        ],
+        'income_by_source': _by_category(income_sources, known, income),
+        'top_merchants': top_merchants,
+        'budget_performance': budget_performance,
+        'comparison': {
+            'previous_income': float(previous_income),
+            'previous_expenses': float(previous_expenses),
+            'income_change_percent': _change_percent(income, previous_income),
+            'expense_change_percent': _change_percent(expenses, previous_expenses),
+        },
+    }
@@ -0,0 +1,232 @@
+"""Monthly range partitions for the transactions table
+
+The transactions table is declaratively partitioned by RANGE (date). History
+that existed before the conversion lives in `transactions_legacy` until
+`split_legacy_month` has moved it, newest month first, into monthly
+partitions; every month from the cutover onwards gets its own
+`transactions_pYYYY_MM` partition, and `transactions_default` catches anything
+outside the pre-created window.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+from .dates import add_months, month_start
+
+PARENT_TABLE = 'transactions'
+LEGACY_PARTITION = 'transactions_legacy'
+LEGACY_BOUND = 'transactions_legacy_bound'
+LEGACY_DATE_INDEX = 'transactions_legacy_date'
+DEFAULT_PARTITION = 'transactions_default'
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_p{month.year}_{month.month:02d}'
+
+
+def is_partitioned():
+    """True when the transactions table is a partitioned parent (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [PARENT_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Return [(name, bound_expression)] for every attached partition"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [PARENT_TABLE]
+        )
+        return cursor.fetchall()
+
+
+def legacy_upper_bound():
+    """First date not covered by the legacy partition, or None once it is gone"""
+    for name, bound in list_partitions():
+        if name == LEGACY_PARTITION:
+            return date.fromisoformat(bound.split("'")[-2])
+    return None
+
+
+def create_month_partition(month):
+    """Create the partition for `month` if it does not exist yet.
+
+    Rows already sitting in the default partition for that month are moved
+    across in the same transaction, otherwise PostgreSQL refuses the new bound.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if name in {row[0] for row in list_partitions()}:
+        return False
+
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    spill = f'_spill_{name}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {spill} ON COMMIT DROP AS "
+            f"SELECT * FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s",
+            [start, end]
+        )
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s", [start, end])
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        cursor.execute(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {spill}")
+    return True
+
+
+def ensure_future_partitions(months_ahead, today=None):
+    """Pre-create partitions from the current month through `months_ahead` months"""
+    current = month_start(today or date.today())
+    legacy_end = legacy_upper_bound()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if legacy_end and month < legacy_end:
+            continue
+        if create_month_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def monthly_partitions_before(cutoff):
+    """Names of monthly partitions whose whole range ends on or before `cutoff`"""
+    names = []
+    for name, _ in list_partitions():
+        if not name.startswith(f'{PARENT_TABLE}_p'):
+            continue
+        year, month = name[len(PARENT_TABLE) + 2:].split('_')
+        if add_months(date(int(year), int(month), 1), 1) <= cutoff:
+            names.append(name)
+    return names
+
+
+def detach_partition(name):
+    """Detach a partition so it stops being scanned or vacuumed as part of the parent.
+
+    Not CONCURRENTLY: PostgreSQL refuses that while the table has a default
+    partition. A plain detach needs no scan, so its lock is brief.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+
+
+def drop_partition_if_empty(name):
+    """Detach and drop a partition that holds no rows; returns whether it did"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT 1 FROM {name} LIMIT 1")
+        if cursor.fetchone():
+            return False
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+    return True
+
+
+def _columns(cursor):
+    cursor.execute(
+        "SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+        [PARENT_TABLE]
+    )
+    return cursor.fetchone()[0]
+
+
+def index_legacy():
+    """Index the legacy partition by date so each split reads only its month.
+    CONCURRENTLY, so it needs autocommit; a no-op once legacy is gone.
+    """
+    if legacy_upper_bound() is None:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_DATE_INDEX} ON {LEGACY_PARTITION} (date)"
+        )
+
+
+def split_legacy_month():
+    """Move the newest month of rows in the legacy partition into its own
+    monthly partition, and shrink legacy to end where that month starts.
+
+    Empty months between it and legacy's old bound get (empty) partitions too,
+    and legacy is dropped once nothing is left in it. Legacy is detached for
+    the duration, so writes to the table wait for this one transaction: one
+    month's copy and a scan of what remains to prove the new bound. Returns the
+    names of the partitions created, or None when there is no legacy partition.
+    """
+    end = legacy_upper_bound()
+    if end is None:
+        return None
+    with transaction.atomic(), connection.cursor() as cursor:
+        columns = _columns(cursor)
+        detach_partition(LEGACY_PARTITION)
+        cursor.execute(f"SELECT MAX(date) FROM {LEGACY_PARTITION}")
+        newest = cursor.fetchone()[0]
+        if newest is None:
+            cursor.execute(f"DROP TABLE {LEGACY_PARTITION}")
+            return []
+
+        month = month_start(newest)
+        created, current = [], month
+        while current < end:
+            following = min(add_months(current, 1), end)
+            name = partition_name(current)
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{current.isoformat()}') TO ('{following.isoformat()}')"
+            )
+            created.append(name)
+            current = following
+        cursor.execute(
+            f"INSERT INTO {partition_name(month)} ({columns}) "
+            f"SELECT {columns} FROM {LEGACY_PARTITION} WHERE date >= %s",
+            [month]
+        )
+        cursor.execute(f"DELETE FROM {LEGACY_PARTITION} WHERE date >= %s", [month])
+
+        cursor.execute(f"SELECT 1 FROM {LEGACY_PARTITION} LIMIT 1")
+        if cursor.fetchone() is None:
+            cursor.execute(f"DROP TABLE {LEGACY_PARTITION}")
+            return created
+        # A valid CHECK matching the bound lets ATTACH skip its own scan
+        cursor.execute(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT IF EXISTS {LEGACY_BOUND}")
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_PARTITION} ADD CONSTRAINT {LEGACY_BOUND} CHECK (date < '{month.isoformat()}')"
+        )
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{month.isoformat()}')"
+        )
+    return created
+
+
+def archive_partition(name, schema):
+    """Move a detached partition into an archive schema, out of the hot search path"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        cursor.execute(f"ALTER TABLE {name} SET SCHEMA {schema}")
+
+
+def explain(sql, params):
+    """EXPLAIN a query and return the partitions its plan touches"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = [row[0] for row in cursor.fetchall()]
+    known = {row[0] for row in list_partitions()}
+    scanned = sorted({
+        token for line in plan for token in line.replace('(', ' ').split()
+        if token in known
+    })
+    return plan, scanned
@@ -0,0 +1,16 @@
+"""API permissions"""
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+class IsMetricsClient(BasePermission):
+    """Staff users, or monitoring sending METRICS_TOKEN in the X-Metrics-Token header"""
+
+    def has_permission(self, request, view):
+        expected = settings.METRICS_TOKEN
+        sent = request.headers.get('X-Metrics-Token', '')
+        if expected and hmac.compare_digest(sent.encode(), expected.encode()):
+            return True
+        return bool(request.user and request.user.is_staff)
@@ -0,0 +1,166 @@
+"""Readiness probes for load balancers
+
+`GET /api/v1/health` only says the process answers. `GET /api/v1/ready`
+says whether it can serve: the database and its migrations, the shared
+cache, the export job queue and this worker's connection pool.
+
+Polling must not turn into database load, so the probes that touch a
+server run in a background thread per worker, every READINESS_PROBE_INTERVAL
+seconds, however often /ready is asked; requests read the latest round. The
+pool figures are this process's own counters and are read live. A round older
+than STALE_INTERVALS intervals (the thread is stuck, e.g. on a hung
+connection) makes the worker not ready.
+
+Each check has an `ok` flag. A failed database, migration, cache or pool
+check makes the worker not ready (503); a backed-up job queue only degrades
+it, as web requests are still served.
+"""
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .db.base import pool_metrics
+from .db.replicas import replica_lag
+from .models import Export
+
+STALE_INTERVALS = 3
+CACHE_KEY = 'readiness:probe'
+BLOCKING = ('database', 'migrations', 'cache', 'pool')
+
+_lock = threading.Lock()
+_state = {'pid': None, 'thread': None, 'result': None}
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, round((time.perf_counter() - started) * 1000, 2)
+
+
+def _probe_database():
+    """Round trip, pending migrations and the job queue in one short transaction"""
+    connection = connections[DEFAULT_DB_ALIAS]
+    timeout_ms = int(settings.READINESS_PROBE_TIMEOUT * 1000)
+    checks = {}
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL statement_timeout = %s', [timeout_ms])
+
+            def round_trip():
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+
+            _, latency = _timed(round_trip)
+        checks['database'] = {
+            'ok': True,
+            'latency_ms': latency,
+            'replica_lag_seconds': {alias: replica_lag(alias) for alias in settings.DATABASE_REPLICAS},
+        }
+
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        checks['migrations'] = {'ok': not plan, 'pending': [f'{m.app_label}.{m.name}' for m, _ in plan]}
+
+        queue = Export.objects.using(DEFAULT_DB_ALIAS).filter(status='processing').aggregate(
+            depth=Count('id'), oldest=Min('created_at'),
+        )
+        age = (timezone.now() - queue['oldest']).total_seconds() if queue['oldest'] else 0
+        checks['jobs'] = {
+            'ok': age <= settings.READINESS_MAX_JOB_AGE,
+            'depth': queue['depth'],
+            'oldest_age_seconds': round(age, 1),
+        }
+    return checks
+
+
+def _probe_cache():
+    token = uuid.uuid4().hex
+
+    def round_trip():
+        cache.set(CACHE_KEY, token, 60)
+        return cache.get(CACHE_KEY)
+
+    value, latency = _timed(round_trip)
+    return {'ok': value == token, 'latency_ms': latency}
+
+
+def probe():
+    """Run every server probe once; a probe that raises is reported as failed"""
+    checks = {}
+    try:
+        checks.update(_probe_database())
+    except Exception as exc:
+        error = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        checks.update(database=error, migrations=error, jobs=error)
+    finally:
+        connections.close_all()
+    try:
+        checks['cache'] = _probe_cache()
+    except Exception as exc:
+        checks['cache'] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+    return {'checked_at': time.time(), 'checks': checks}
+
+
+def _run():
+    interval = settings.READINESS_PROBE_INTERVAL
+    while True:
+        time.sleep(interval)
+        result = probe()
+        with _lock:
+            _state['result'] = result
+
+
+def _latest():
+    """The last round, probing inline and starting the thread on first use in a process"""
+    with _lock:
+        if _state['pid'] == os.getpid() and _state['thread'].is_alive():
+            return _state['result']
+        # First call, or a fork or crash left no prober in this process
+        _state.update(pid=os.getpid(), result=probe())
+        _state['thread'] = threading.Thread(target=_run, name='readiness-probe', daemon=True)
+        _state['thread'].start()
+        return _state['result']
+
+
+def _pool_check():
+    """Live figures for this worker's pools; exhausted when requests queue at full size"""
+    pools = {}
+    for alias, stats in pool_metrics().items():
+        pools[alias] = {
+            'saturation': stats['saturation'],
+            'in_use': stats['in_use'],
+            'size': stats.get('pool_size', 0),
+            'max_size': stats.get('pool_max', 0),
+            'requests_waiting': stats.get('requests_waiting', 0),
+        }
+    exhausted = any(pool['requests_waiting'] and pool['saturation'] >= 1 for pool in pools.values())
+    return {'ok': not exhausted, 'pools': pools}
+
+
+def readiness():
+    """(status, report) for this worker; status is 'ready', 'degraded' or 'not_ready'"""
+    result = _latest()
+    age = time.time() - result['checked_at']
+    checks = {**result['checks'], 'pool': _pool_check()}
+    stale = age > STALE_INTERVALS * settings.READINESS_PROBE_INTERVAL
+    if stale or not all(checks[name]['ok'] for name in BLOCKING):
+        status = 'not_ready'
+    elif not all(check['ok'] for check in checks.values()):
+        status = 'degraded'
+    else:
+        status = 'ready'
+    return status, {
+        'status': status,
+        'pid': os.getpid(),
+        'probe_age_seconds': round(age, 1),
+        'stale': stale,
+        'checks': checks,
+    }
@@ -0,0 +1,128 @@
+"""Vectorized expansion of recurring schedules into dated occurrences
+
+Every active RecurringTransaction is expanded over a horizon with NumPy:
+day-based frequencies are arithmetic progressions of ordinals, month-based
+ones step through datetime64[M] and clamp to the anchor day so a bill due on
+the 31st lands on the last day of shorter months without drifting. The anchor
+is the item's `day_of_month`, kept apart from next_date since a clamped
+next_date (the 28th of February) no longer says which day it stood for.
+"""
+from datetime import date
+
+import numpy as np
+from django.utils.dateparse import parse_date
+
+from .models import RecurringTransaction
+
+DAY_STEPS = {'daily': 1, 'weekly': 7, 'biweekly': 14}
+MONTH_STEPS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+INFLOW_TYPES = {'income'}
+
+
+def anchor_day(start):
+    """Day of month for a schedule starting on `start`, a date or ISO string;
+    None when it isn't one
+    """
+    if not isinstance(start, date):
+        try:
+            start = parse_date(str(start))
+        except ValueError:
+            return None
+    return start.day if start else None
+
+
+def _anchor(item):
+    return item.day_of_month or item.next_date.day
+
+
+def _month_occurrences(anchor_days, first_months, steps, counts):
+    """Dates for `counts[i]` steps of `steps[i]` months from `first_months[i]`"""
+    item = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    months = first_months[item] + offsets * steps[item]
+    month_days = (months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')
+    days = np.minimum(anchor_days[item], month_days.astype(np.int64))
+    return item, months.astype('datetime64[D]') + (days - 1)
+
+
+def expand(items, start, end):
+    """Expand schedules into occurrences with start <= date <= end.
+
+    `items` is a sequence of objects with `next_date`, `day_of_month` and `frequency`. Returns
+    (item_index, dates) arrays, dates as datetime64[D], sorted by date.
+    Unknown frequencies are treated as monthly.
+    """
+    start64, end64 = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    result_items, result_dates = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype='datetime64[D]')]
+
+    day_idx = np.array([i for i, item in enumerate(items) if item.frequency in DAY_STEPS], dtype=np.int64)
+    if len(day_idx):
+        first = np.array([items[i].next_date for i in day_idx], dtype='datetime64[D]')
+        steps = np.array([DAY_STEPS[items[i].frequency] for i in day_idx], dtype=np.int64)
+        # Skip whole steps that fall before the window (stale next_date values)
+        behind = np.maximum((start64 - first).astype(np.int64), 0)
+        first = first + (-(-behind // steps)) * steps
+        counts = np.where(first <= end64, (end64 - first).astype(np.int64) // steps + 1, 0)
+        item = np.repeat(np.arange(len(day_idx)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        result_items.append(day_idx[item])
+        result_dates.append(first[item] + offsets * steps[item])
+
+    month_idx = np.array([i for i, item in enumerate(items) if item.frequency not in DAY_STEPS], dtype=np.int64)
+    if len(month_idx):
+        next_dates = [items[i].next_date for i in month_idx]
+        anchor_days = np.array([_anchor(items[i]) for i in month_idx], dtype=np.int64)
+        first_months = np.array(next_dates, dtype='datetime64[M]')
+        steps = np.array([MONTH_STEPS.get(items[i].frequency, 1) for i in month_idx], dtype=np.int64)
+        # Start one step early when stale; the date filter below trims the extra occurrence
+        behind = np.maximum((np.datetime64(start, 'M') - first_months).astype(np.int64) // steps - 1, 0)
+        first_months = first_months + behind * steps
+        span = (np.datetime64(end, 'M') - first_months).astype(np.int64)
+        counts = np.where(span >= 0, span // steps + 1, 0)
+        item, dates = _month_occurrences(anchor_days, first_months, steps, counts)
+        result_items.append(month_idx[item])
+        result_dates.append(dates)
+
+    item_index = np.concatenate(result_items)
+    dates = np.concatenate(result_dates)
+    keep = (dates >= start64) & (dates <= end64)
+    item_index, dates = item_index[keep], dates[keep]
+    order = np.argsort(dates, kind='stable')
+    return item_index[order], dates[order]
+
+
+def signed_amounts(items):
+    """Amounts as float64, negative for outflows"""
+    return np.array([
+        float(item.amount) * (1 if item.type in INFLOW_TYPES else -1) for item in items
+    ])
+
+
+def active_items(user):
+    return list(RecurringTransaction.objects.filter(user=user, status='active'))
+
+
+def roll_forward(today=None, batch_size=1000):
+    """Advance next_date of every active item whose date has passed to its next occurrence on or after today.
+
+    Returns the number of items updated.
+    """
+    today = today or date.today()
+    stale = list(
+        RecurringTransaction.objects.filter(status='active', next_date__lt=today)
+        .only('id', 'next_date', 'day_of_month', 'frequency')
+    )
+    if not stale:
+        return 0
+    for item in stale:
+        # Keep the day before next_date is clamped to a short month
+        item.day_of_month = _anchor(item)
+    # The largest step is a year, so a 366-day window always holds the next occurrence
+    item_index, dates = expand(stale, today, date.fromordinal(today.toordinal() + 366))
+    first = {}
+    for i, day in zip(item_index.tolist(), dates.astype(object)):
+        first.setdefault(i, day)
+    for i, item in enumerate(stale):
+        item.next_date = first.get(i, item.next_date)
+    RecurringTransaction.objects.bulk_update(stale, ['next_date', 'day_of_month'], batch_size=batch_size)
+    return len(stale)
@@ -0,0 +1,179 @@
+"""Detect recurring transactions and subscriptions from history
+
+Transactions are streamed per user ordered by date (the database sort is the
+O(n log n) step), grouped by canonical merchant, and each group's day
+intervals are bucketed into frequency bands with NumPy.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import groupby
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from . import archive, merchants
+from .merchants import normalize_merchant
+from .models import RecurringTransaction, Transaction, User
+
+# (frequency, min interval days, max interval days, minimum occurrences, step)
+BANDS = [
+    ('weekly', 6, 8, 4, relativedelta(weeks=1)),
+    ('monthly', 27, 34, 3, relativedelta(months=1)),
+    ('yearly', 355, 376, 2, relativedelta(years=1)),
+]
+AMOUNT_TOLERANCE = 0.15
+MIN_BAND_SHARE = 0.75
+HISTORY_YEARS = 3
+
+
+@dataclass
+class Series:
+    user_id: object
+    key: str
+    name: str
+    txn_type: str
+    frequency: str
+    amount: float
+    next_date: date
+    category_id: object
+    account_id: object
+    merchant_id: object = None
+    transaction_ids: list = field(default_factory=list)
+
+    @property
+    def recurring_type(self):
+        if self.txn_type == 'credit':
+            return 'income'
+        return 'subscription' if self.frequency != 'yearly' else 'bill'
+
+
+def _detect_group(user_id, key, rows, today):
+    """Find a periodic series in one merchant's rows ((id, date, amount, ...)) sorted by date"""
+    amounts = np.array([float(row[2]) for row in rows])
+    median = float(np.median(amounts))
+    keep = np.abs(amounts - median) <= max(AMOUNT_TOLERANCE * median, 1.0)
+    kept = [row for row, ok in zip(rows, keep) if ok]
+
+    ordinals = np.unique(np.array([row[1].toordinal() for row in kept]))
+    if len(ordinals) < 2:
+        return None
+    intervals = np.diff(ordinals)
+
+    for frequency, low, high, min_count, step in BANDS:
+        in_band = (intervals >= low) & (intervals <= high)
+        if len(ordinals) < min_count or in_band.mean() < MIN_BAND_SHARE:
+            continue
+        last = kept[-1][1]
+        # A series that missed more than one cycle has been cancelled
+        if (today - last).days > high * 1.5:
+            return None
+        next_date = last + step
+        while next_date <= today:
+            next_date += step
+        # Raw names that vary per charge ("SHOWMAX*1013") fall back to the normalized key
+        name, count = Counter(row[4] or row[5] for row in kept).most_common(1)[0]
+        merchant_ids = Counter(row[10] for row in kept if row[10])
+        return Series(
+            user_id=user_id,
+            key=key,
+            name=name if count * 2 >= len(kept) else key.title(),
+            txn_type=kept[-1][3],
+            frequency=frequency,
+            amount=float(kept[-1][2]),
+            next_date=next_date,
+            category_id=Counter(row[6] for row in kept).most_common(1)[0][0],
+            account_id=Counter(row[7] for row in kept).most_common(1)[0][0],
+            merchant_id=merchant_ids.most_common(1)[0][0] if merchant_ids else None,
+            transaction_ids=[row[0] for row in kept],
+        )
+    return None
+
+
+def detect_for_user(user_id, rows, today):
+    """Detect every periodic series in one user's date-ordered rows"""
+    groups = defaultdict(list)
+    for row in rows:
+        # Canonical merchant key, so aliases of one merchant form one series
+        key = row[9] or normalize_merchant(row[4] or row[5])
+        if key:
+            groups[(row[3], key)].append(row)
+    found = []
+    for (_, key), group in groups.items():
+        series = _detect_group(user_id, key, group, today)
+        if series:
+            found.append(series)
+    return found
+
+
+def stream_user_rows(user_ids, today):
+    """Yield (user_id, rows) for a chunk of users from one date-ordered streaming query"""
+    since = today - relativedelta(years=HISTORY_YEARS)
+    rows = (
+        archive.transactions(since)
+        .filter(user_id__in=user_ids, date__gte=since)
+        .order_by('user_id', 'date')
+        .values_list('id', 'date', 'amount', 'type', 'merchant_name', 'description',
+                     'category_id', 'account_id', 'user_id', 'merchant__key', 'merchant_id')
+        .iterator(chunk_size=5000)
+    )
+    for user_id, user_rows in groupby(rows, key=lambda row: row[8]):
+        yield user_id, list(user_rows)
+
+
+def save_series(user_id, found, status):
+    """Create RecurringTransaction rows for series whose merchant has none yet and
+    flag their transactions
+    """
+    with transaction.atomic():
+        # Series from transactions not yet linked to a merchant resolve their key
+        unlinked = [series for series in found if series.merchant_id is None]
+        for series, merchant_id in zip(unlinked, merchants.resolve(series.key for series in unlinked)):
+            series.merchant_id = merchant_id
+        existing = list(RecurringTransaction.objects.filter(user_id=user_id).only('name', 'merchant_id'))
+        # Items added by hand or before merchants were stored get theirs from the name
+        named = [item for item in existing if item.merchant_id is None]
+        for item, merchant_id in zip(named, merchants.resolve(item.name for item in named)):
+            item.merchant_id = merchant_id
+        RecurringTransaction.objects.bulk_update([item for item in named if item.merchant_id], ['merchant_id'])
+        known = {item.merchant_id for item in existing}
+        new = [series for series in found if series.merchant_id not in known]
+        RecurringTransaction.objects.bulk_create([
+            RecurringTransaction(
+                user_id=user_id,
+                name=series.name,
+                amount=series.amount,
+                frequency=series.frequency,
+                next_date=series.next_date,
+                day_of_month=series.next_date.day,
+                category_id=series.category_id,
+                account_id=series.account_id,
+                merchant_id=series.merchant_id,
+                status=status,
+                type=series.recurring_type,
+            )
+            for series in new
+        ])
+        flagged = Transaction.objects.filter(
+            user_id=user_id,
+            id__in=[txn_id for series in found for txn_id in series.transaction_ids],
+            is_recurring=False,
+        ).update(is_recurring=True)
+    return len(new), flagged
+
+
+def run(chunk_size=200, status='suggested', today=None, user_ids=None, dry_run=False):
+    """Detect recurring series for all users. Yields (user_id, series, created, flagged)."""
+    today = today or date.today()
+    ids = user_ids if user_ids is not None else list(
+        User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(ids), chunk_size):
+        for user_id, rows in stream_user_rows(ids[start:start + chunk_size], today):
+            found = detect_for_user(user_id, rows, today)
+            if dry_run or not found:
+                yield user_id, found, 0, 0
+                continue
+            created, flagged = save_series(user_id, found, status)
+            yield user_id, found, created, flagged
@@ -0,0 +1,106 @@
+"""Scheduled connection syncs
+
+Each connected connection has a `next_sync_at`. A successful sync sets it
+from the accounts' recent activity, with jitter (apps.core.sync), so syncs
+stay spread over the day instead of bunching at one hour. The run_sync_scheduler
+command repeatedly claims the connections that are due, oldest first, and
+syncs them on a thread pool within two caps:
+- SYNC_MAX_CONCURRENCY syncs at once in total
+- SYNC_MAX_PER_INSTITUTION syncs at once per bank
+Due connections that a cap holds back stay due and show up as queue lag.
+
+Claiming moves `next_sync_at` forward by SYNC_LEASE_SECONDS. A scheduler
+that dies mid-sync therefore delays those connections rather than losing
+them, and a second scheduler won't pick them up. The caps are per scheduler
+process, so run one.
+
+A failed sync is retried after SYNC_RETRY_BASE_SECONDS, doubling with each
+consecutive failure up to SYNC_RETRY_MAX_SECONDS. After SYNC_MAX_FAILURES
+failures the connection is marked `reauth_required` and is no longer
+scheduled. A successful sync (webhook, endpoint or scheduler) clears the count.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import sync
+from .models import Connection
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(failures):
+    """Wait before retrying after `failures` consecutive failures"""
+    seconds = settings.SYNC_RETRY_BASE_SECONDS * 2 ** (failures - 1)
+    return sync.jittered(timedelta(seconds=min(seconds, settings.SYNC_RETRY_MAX_SECONDS)))
+
+
+def claim(running, limit, per_institution=None):
+    """Claim up to `limit` due connections, skipping institutions that already
+    have `per_institution` syncs in the `running` Counter of institution names.
+    Returns [(id, institution)].
+    """
+    if limit <= 0:
+        return []
+    per_institution = per_institution or settings.SYNC_MAX_PER_INSTITUTION
+    now = timezone.now()
+    claimed, counts = [], Counter(running)
+    with transaction.atomic():
+        due = (
+            Connection.objects.select_for_update(skip_locked=True)
+            .filter(status='connected', next_sync_at__lte=now).order_by('next_sync_at')
+            .values_list('id', 'institution_name')[:limit * 10]
+        )
+        for pk, institution in due:
+            if counts[institution] >= per_institution:
+                continue
+            counts[institution] += 1
+            claimed.append((pk, institution))
+            if len(claimed) == limit:
+                break
+        Connection.objects.filter(pk__in=[pk for pk, _ in claimed]).update(
+            next_sync_at=now + timedelta(seconds=settings.SYNC_LEASE_SECONDS),
+        )
+    return claimed
+
+
+def sync_one(connection_id):
+    """Sync one claimed connection, recording a failure with backoff. Returns success."""
+    try:
+        connection = Connection.objects.get(pk=connection_id)
+        sync.run(connection)
+        return True
+    except Exception:
+        logger.warning('Sync of connection %s failed', connection_id, exc_info=True)
+        failures = Connection.objects.filter(pk=connection_id).values_list('sync_failures', flat=True).first()
+        if failures is None:
+            return False
+        failures += 1
+        if failures >= settings.SYNC_MAX_FAILURES:
+            update = {'status': 'reauth_required'}
+        else:
+            update = {'next_sync_at': timezone.now() + retry_delay(failures)}
+        Connection.objects.filter(pk=connection_id).update(sync_failures=F('sync_failures') + 1, **update)
+        return False
+    finally:
+        connections.close_all()
+
+
+def queue_stats():
+    """Due and stale connections, and the lag of the oldest due sync"""
+    now = timezone.now()
+    connected = Connection.objects.filter(status='connected')
+    due = connected.filter(next_sync_at__lte=now).aggregate(count=Count('id'), oldest=Min('next_sync_at'))
+    stalest = connected.aggregate(oldest=Min('last_synced_at'))['oldest']
+    return {
+        'due': due['count'],
+        'lag_seconds': round((now - due['oldest']).total_seconds(), 1) if due['oldest'] else 0.0,
+        'stalest_sync_seconds': round((now - stalest).total_seconds(), 1) if stalest else None,
+        'never_synced': connected.filter(last_synced_at__isnull=True).count(),
+        'reauth_required': Connection.objects.filter(status='reauth_required').count(),
+    }
@@ -1,8 +1,30 @@
 """Serializers for NairaTrack API"""
 from rest_framework import serializers
+from . import catalog, goals
 from .models import *
 
 
+class CategoryAttributeField(serializers.ReadOnlyField):
+    """An attribute of the row's category, read from the process category catalog
+    (apps.core.catalog) instead of a join or a query per row
+    """
+
+    def __init__(self, attribute, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+        self.attribute = attribute
+
+    def to_representation(self, obj):
+        if obj.category_id is None:
+            return None
+        catalogs = self.context.setdefault('category_catalogs', {})
+        if obj.user_id not in catalogs:
+            catalogs[obj.user_id] = catalog.for_user(obj.user_id)
+        # A category committed after the catalog was read falls back to the query
+        entry = catalogs[obj.user_id].get(obj.category_id) or obj.category
+        return getattr(entry, self.attribute)
+
+
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
@@ -11,16 +33,40 @@ class AccountSerializer(serializers.ModelSerializer):
 
 
 class TransactionSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
-    category_color = serializers.CharField(source='category.color', read_only=True, allow_null=True)
+    category_name = CategoryAttributeField('name')
+    category_color = CategoryAttributeField('color')
     
     class Meta:
         model = Transaction
-        fields = ['id', 'account_id', 'date', 'description', 'merchant_name', 'amount',
+        fields = ['id', 'account_id', 'date', 'description', 'merchant_name', 'merchant_id', 'amount',
                   'type', 'category_id', 'category_name', 'category_color', 'notes', 
                   'is_recurring', 'created_at']
 
 
+class TransactionCreateSerializer(serializers.Serializer):
+    """Input for a manually created transaction"""
+    account_id = serializers.UUIDField()
+    date = serializers.DateField()
+    description = serializers.CharField(max_length=500)
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    type = serializers.ChoiceField(choices=['debit', 'credit'])
+    category_id = serializers.UUIDField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    is_recurring = serializers.BooleanField(required=False)
+
+
+class TransactionUpdateSerializer(serializers.Serializer):
+    """Input for editing a transaction; only the fields a user may change"""
+    category_id = serializers.UUIDField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    is_recurring = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('No fields to update')
+        return attrs
+
+
 class CategorySerializer(serializers.ModelSerializer):
     transaction_count_this_month = serializers.IntegerField(read_only=True, default=0)
     
@@ -30,7 +76,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class CategoryRuleSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True)
+    category_name = CategoryAttributeField('name')
     
     class Meta:
         model = CategoryRule
@@ -38,9 +84,9 @@ class CategoryRuleSerializer(serializers.ModelSerializer):
 
 
 class BudgetSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True)
-    category_icon = serializers.CharField(source='category.icon', read_only=True)
-    category_color = serializers.CharField(source='category.color', read_only=True)
+    category_name = CategoryAttributeField('name')
+    category_icon = CategoryAttributeField('icon')
+    category_color = CategoryAttributeField('color')
     spent = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True, default=0)
     remaining = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True, default=0)
     percentage = serializers.FloatField(read_only=True, default=0)
@@ -53,25 +99,31 @@ class BudgetSerializer(serializers.ModelSerializer):
 
 
 class GoalSerializer(serializers.ModelSerializer):
+    """Goal with contribution analytics; annotate the queryset with goals.with_contribution_stats"""
     percentage = serializers.SerializerMethodField()
-    monthly_contribution_needed = serializers.SerializerMethodField()
+    contributed_total = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True, default=0)
+    contribution_count = serializers.IntegerField(read_only=True, default=0)
+    last_contribution_date = serializers.DateField(read_only=True, default=None)
     
     class Meta:
         model = Goal
         fields = ['id', 'name', 'emoji', 'target_amount', 'current_amount', 'percentage',
-                  'target_date', 'monthly_contribution_needed', 'status']
+                  'target_date', 'status', 'contributed_total', 'contribution_count',
+                  'last_contribution_date']
     
     def get_percentage(self, obj):
         if obj.target_amount:
             return float(obj.current_amount / obj.target_amount * 100)
         return 0
     
-    def get_monthly_contribution_needed(self, obj):
-        return 0
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        data.update(goals.projection(obj))
+        return data
 
 
 class RecurringSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    category_name = CategoryAttributeField('name')
     
     class Meta:
         model = RecurringTransaction
@@ -0,0 +1,181 @@
+"""Daily account balance snapshots for long-range charts
+
+Snapshots are end-of-day balances sampled from the ledger (apps.core.ledger)
+and kept fresh by `ledger.recompute`. The sync path records today's, the
+nightly job records yesterday's and then thins old rows: every day is kept
+for DAILY_DAYS, the last day of each week and of each month for WEEKLY_DAYS,
+and only month ends after that. Charts sample exactly those days, so a
+1-year or 5-year series is a single indexed read of a few hundred rows; any
+day without a snapshot falls back to a ledger lookup.
+"""
+from datetime import date, timedelta
+
+from django.db import connection
+
+from .dates import add_months
+from .ledger import BALANCE_ON, SIGNED_AMOUNT
+
+DAILY_DAYS = 90
+WEEKLY_DAYS = 730
+
+# Chart period: (sampling, days covered)
+PERIODS = {
+    '1m': ('daily', 30),
+    '3m': ('daily', 90),
+    '1y': ('weekly', 365),
+    '5y': ('monthly', 5 * 365),
+}
+
+BALANCES_SQL = f"""
+SELECT a.id, a.currency, d.day, COALESCE(s.balance, {BALANCE_ON.format(day='d.day')})
+FROM accounts a
+CROSS JOIN unnest(%(days)s::date[]) AS d(day)
+LEFT JOIN balance_snapshots s ON s.account_id = a.id AND s.date = d.day
+WHERE a.user_id = %(user_id)s {{accounts}}
+ORDER BY d.day
+"""
+
+CAPTURE_SQL = f"""
+INSERT INTO balance_snapshots (id, account_id, date, balance)
+SELECT gen_random_uuid(), a.id, d.day, {BALANCE_ON.format(day='d.day')}
+FROM accounts a
+CROSS JOIN unnest(%(days)s::date[]) AS d(day)
+WHERE {{accounts}}
+ON CONFLICT (account_id, date) DO UPDATE SET balance = EXCLUDED.balance
+WHERE balance_snapshots.balance IS DISTINCT FROM EXCLUDED.balance
+"""
+
+COMPACT_SQL = """
+DELETE FROM balance_snapshots s
+USING (
+    SELECT id, date,
+           ROW_NUMBER() OVER (PARTITION BY account_id, date_trunc('week', date) ORDER BY date DESC) AS week_rank,
+           ROW_NUMBER() OVER (PARTITION BY account_id, date_trunc('month', date) ORDER BY date DESC) AS month_rank
+    FROM balance_snapshots
+    WHERE date < %(daily_since)s
+) ranked
+WHERE s.id = ranked.id
+  AND ranked.month_rank > 1
+  AND (ranked.date < %(weekly_since)s OR ranked.week_rank > 1)
+"""
+
+# Snapshots against opening balance plus every transaction up to their date,
+# summed independently of balance_after in one pass per account. Archiving
+# folds archived flow into opening_balance (apps.core.archive), so that is
+# taken back out and the archived rows replayed.
+RECONCILE_SQL = f"""
+WITH scope AS (
+    SELECT a.id, a.opening_balance - COALESCE((
+        SELECT SUM({SIGNED_AMOUNT}) FROM transactions_archive t WHERE t.account_id = a.id
+    ), 0) AS opening_balance
+    FROM accounts a WHERE {{users}}
+), timeline AS (
+    SELECT t.account_id, t.date, {SIGNED_AMOUNT} AS amount, NULL::uuid AS snapshot_id, NULL::numeric AS balance
+    FROM transactions_history t JOIN scope ON scope.id = t.account_id
+    UNION ALL
+    SELECT s.account_id, s.date, 0, s.id, s.balance
+    FROM balance_snapshots s JOIN scope ON scope.id = s.account_id
+), running AS (
+    SELECT account_id, date, snapshot_id, balance,
+           SUM(amount) OVER (
+               PARTITION BY account_id ORDER BY date, snapshot_id NULLS FIRST
+               ROWS UNBOUNDED PRECEDING
+           ) AS flow
+    FROM timeline
+)
+SELECT r.snapshot_id, r.account_id, r.date, r.balance, scope.opening_balance + r.flow
+FROM running r JOIN scope ON scope.id = r.account_id
+WHERE r.snapshot_id IS NOT NULL
+  AND r.balance IS DISTINCT FROM scope.opening_balance + r.flow
+ORDER BY r.account_id, r.date
+"""
+
+
+def _week_end(day):
+    return day.weekday() == 6
+
+
+def _month_end(day):
+    return (day + timedelta(days=1)).day == 1
+
+
+def retained_days(start, today):
+    """Days from start to today that compaction keeps a snapshot for"""
+    daily_since, weekly_since = today - timedelta(days=DAILY_DAYS), today - timedelta(days=WEEKLY_DAYS)
+    days, day = [], start
+    while day <= today:
+        if day >= daily_since or _month_end(day) or (day >= weekly_since and _week_end(day)):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def chart_days(period, today):
+    """Days a chart over `period` plots, oldest first and ending today"""
+    sampling, span = PERIODS[period]
+    start = today - timedelta(days=span - 1)
+    if sampling == 'daily':
+        return [start + timedelta(days=i) for i in range(span)]
+    if sampling == 'weekly':
+        first = start + timedelta(days=(6 - start.weekday()) % 7)
+        days = [first + timedelta(weeks=i) for i in range((today - first).days // 7 + 1)]
+    else:
+        days, month = [], start
+        while True:
+            end = add_months(month, 1) - timedelta(days=1)
+            if end > today:
+                break
+            days.append(end)
+            month = add_months(month, 1)
+    return [day for day in days if day < today] + [today]
+
+
+def balances_on(user_id, days, account_id=None):
+    """(account_id, currency, day, balance) at the end of each day for the user's accounts"""
+    sql = BALANCES_SQL.format(accounts='AND a.id = %(account_id)s' if account_id else '')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'days': list(days), 'user_id': user_id, 'account_id': account_id})
+        return cursor.fetchall()
+
+
+def capture(days, account_ids=None, user_ids=None):
+    """Upsert end-of-day snapshots from the ledger; every account when no filter is given.
+    Returns the number of rows written.
+    """
+    if account_ids is not None:
+        accounts, params = 'a.id = ANY(%(ids)s::uuid[])', list(account_ids)
+    elif user_ids is not None:
+        accounts, params = 'a.user_id = ANY(%(ids)s::uuid[])', list(user_ids)
+    else:
+        accounts, params = 'true', None
+    with connection.cursor() as cursor:
+        cursor.execute(CAPTURE_SQL.format(accounts=accounts), {'days': list(days), 'ids': params})
+        return cursor.rowcount
+
+
+def compact(today=None):
+    """Thin snapshots to the retention tiers. Returns the number of rows deleted."""
+    today = today or date.today()
+    with connection.cursor() as cursor:
+        cursor.execute(COMPACT_SQL, {
+            'daily_since': today - timedelta(days=DAILY_DAYS),
+            'weekly_since': today - timedelta(days=WEEKLY_DAYS),
+        })
+        return cursor.rowcount
+
+
+def reconcile(user_ids=None, fix=False):
+    """Snapshots that disagree with their transactions, as
+    (account_id, date, snapshot balance, derived balance); with `fix`, corrected.
+    """
+    users = 'a.user_id = ANY(%(ids)s::uuid[])' if user_ids is not None else 'true'
+    with connection.cursor() as cursor:
+        cursor.execute(RECONCILE_SQL.format(users=users), {'ids': list(user_ids or [])})
+        rows = cursor.fetchall()
+        if fix and rows:
+            cursor.execute(
+                "UPDATE balance_snapshots s SET balance = fixed.balance "
+                "FROM unnest(%s::uuid[], %s::numeric[]) AS fixed(id, balance) WHERE s.id = fixed.id",
+                [[row[0] for row in rows], [row[4] for row in rows]],
+            )
+    return [row[1:] for row in rows]
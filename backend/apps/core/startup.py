@@ -0,0 +1,89 @@
+"""Worker start-up: preloading and warm-up
+
+gunicorn loads the application in its master (`preload_app`, see
+backend/gunicorn.conf.py), and the ASGI/WSGI modules call `preload` once the
+application exists. It imports what Django and DRF otherwise import on the
+first request: the URLconf with every view and its dependencies, and DRF's
+configured classes. Forked workers then share those pages instead of each
+importing them while a request waits. Nothing done in the master may leave a
+connection open or a thread running, as workers would inherit them.
+
+Each worker then calls `warm_up` before accepting requests, which fills what
+is kept per process:
+- the Auth0 signing keys (JWKS)
+- the system category catalog
+- the database pools, up to their min_size connections
+A step that fails is logged and skipped; the first request that needs it
+does it instead.
+"""
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+from . import catalog
+from .authentication import Auth0JWTAuthentication, jwks_client
+from .db.base import close_pools
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the code that uses them
+MODULES = ('psycopg_pool', 'dateutil.relativedelta', 'numpy')
+API_SETTINGS = (
+    'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES', 'DEFAULT_FILTER_BACKENDS', 'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS', 'EXCEPTION_HANDLER',
+)
+
+
+def preload():
+    """Import everything the first request would; safe to run before forking"""
+    for name in MODULES:
+        import_module(name)
+    # Importing the URLconf imports the views; reverse_dict compiles the patterns
+    get_resolver().reverse_dict
+    for name in API_SETTINGS:
+        getattr(api_settings, name)
+    # Nothing above should connect, but a forked worker must not share a socket
+    connections.close_all()
+    close_pools()
+
+
+def _warm_jwks():
+    if any(issubclass(cls, Auth0JWTAuthentication) for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES):
+        jwks_client().get_jwk_set()
+
+
+def _warm_categories():
+    catalog.system()
+
+
+def _warm_pools():
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            pool.wait(timeout=settings.STARTUP_WARM_UP_TIMEOUT)
+
+
+STEPS = (('jwks', _warm_jwks), ('system_categories', _warm_categories), ('db_pool', _warm_pools))
+
+
+def warm_up():
+    """Prime this process's caches and pools. {step: milliseconds, None if it failed}"""
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning('Warm-up step %s failed', name, exc_info=True)
+            timings[name] = None
+        else:
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    # Hand this thread's connections back to the pool for request threads
+    connections.close_all()
+    return timings
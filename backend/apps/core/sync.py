@@ -0,0 +1,70 @@
+"""Bank connection syncs
+
+A sync brings a connection's accounts up to date: it stores the balances the
+provider reported, aligns the ledger with them (apps.core.ledger.align), stamps
+the connection and records today's balance snapshots from the ledger
+(apps.core.snapshots), so net worth agrees with the account balances. Balances reach this tree
+through Mono webhook events (apps.core.webhooks); a sync without any, as
+from the sync endpoint or the scheduler, refreshes the snapshots and the stamp.
+
+Every successful sync also sets when the scheduler (apps.core.scheduler)
+syncs the connection next: sooner for busy accounts, per ACTIVITY_INTERVALS,
+give or take JITTER so connections stay spread across the day.
+"""
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import coalesce, ledger, snapshots
+from .models import Account, Connection, Transaction
+
+ACTIVITY_DAYS = 30
+# (transactions in the last ACTIVITY_DAYS, at least; time between scheduled syncs)
+ACTIVITY_INTERVALS = (
+    (60, timedelta(hours=4)),
+    (10, timedelta(hours=8)),
+    (1, timedelta(hours=12)),
+    (0, timedelta(hours=24)),
+)
+JITTER = 0.2
+
+
+def jittered(interval):
+    """`interval` stretched or shrunk by up to JITTER at random"""
+    return interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def interval_for(account_ids, today=None):
+    """Time until the next scheduled sync of a connection with these accounts"""
+    today = today or date.today()
+    recent = Transaction.objects.filter(
+        account_id__in=account_ids, date__gt=today - timedelta(days=ACTIVITY_DAYS), date__lte=today,
+    ).count()
+    return next(interval for threshold, interval in ACTIVITY_INTERVALS if recent >= threshold)
+
+
+def run(connection, balances=None, status=None):
+    """Sync `connection`. `balances` maps its account ids to the provider's
+    current balance; `status`, when given, replaces the connection's. Returns
+    the number of snapshots written.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        account_ids = list(connection.accounts.values_list('id', flat=True))
+        reported = {pk: balance for pk, balance in (balances or {}).items() if pk in account_ids}
+        for account_id, balance in reported.items():
+            Account.objects.filter(pk=account_id).update(balance=balance, last_synced_at=now)
+        ledger.align(reported)
+        stamp = {
+            'last_synced_at': now,
+            'next_sync_at': now + jittered(interval_for(account_ids)),
+            'sync_failures': 0,
+        }
+        if status is not None:
+            stamp['status'] = status
+        Connection.objects.filter(pk=connection.pk).update(**stamp)
+        written = snapshots.capture([date.today()], account_ids=account_ids)
+        transaction.on_commit(lambda: coalesce.data_changed(connection.user_id))
+    return written
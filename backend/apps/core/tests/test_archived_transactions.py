@@ -0,0 +1,87 @@
+"""Edits to archived transactions (apps.core.archive)"""
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.core import archive, catalog
+from apps.core.models import Account, Category, Connection, Transaction, User
+
+
+class ArchivedTransactionEditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='archived', email='archived@example.com')
+        connection = Connection.objects.create(user=cls.user, mono_id='mono-archived', institution_name='Bank')
+        cls.account = Account.objects.create(
+            connection=connection, user=cls.user, name='Current', type='current', account_number_masked='****0001',
+        )
+        cls.food = Category.objects.create(user=None, name='Food', icon='x', color='#000000', is_system=True)
+        cls.old = cls.make(date(2020, 1, 10))
+        cls.recent = cls.make(date(2024, 5, 10))
+        archive.archive_users([cls.user.id], date(2021, 1, 1))
+
+    @classmethod
+    def make(cls, day):
+        return Transaction.objects.create(
+            user=cls.user, account=cls.account, date=day, description='Spend', amount=Decimal('10'), type='debit',
+        )
+
+    def setUp(self):
+        archive.publish_horizon()
+        self.addCleanup(cache.delete, archive.HORIZON_KEY)
+        catalog.clear_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def category(self, txn):
+        return archive.transactions().get(pk=txn.pk).category_id
+
+    def test_archived_transactions_are_readable_but_not_editable(self):
+        url = f'/api/v1/transactions/{self.old.id}'
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.patch(url, {'category_id': str(self.food.id)}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {'error': archive.ARCHIVED_ERROR})
+        self.assertIsNone(self.category(self.old))
+        self.assertEqual(self.client.patch(f'/api/v1/transactions/{uuid.uuid4()}', {}, format='json').status_code, 404)
+
+    def test_bulk_categorize_refuses_batches_with_archived_transactions(self):
+        ids = [str(self.recent.id), str(self.old.id)]
+        response = self.client.post(
+            '/api/v1/transactions/bulk-categorize', {'transaction_ids': ids, 'category_id': str(self.food.id)}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['archived_ids'], [str(self.old.id)])
+        self.assertIsNone(self.category(self.recent))
+
+        response = self.client.post(
+            '/api/v1/transactions/bulk-categorize',
+            {'transaction_ids': ids[:1], 'category_id': str(self.food.id)}, format='json',
+        )
+        self.assertEqual((response.status_code, response.data), (200, {'updated_count': 1}))
+        self.assertEqual(self.category(self.recent), self.food.id)
+
+    def test_bulk_categorize_rejects_malformed_ids(self):
+        response = self.client.post(
+            '/api/v1/transactions/bulk-categorize', {'transaction_ids': ['nope'], 'category_id': None}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_batches_report_archived_transactions(self):
+        response = self.client.post('/api/v1/transactions/batch', {'operations': [
+            {'op': 'update', 'id': str(self.recent.id), 'data': {'notes': 'fine'}},
+            {'op': 'delete', 'id': str(self.old.id)},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['operations'], [
+            {'index': 1, 'op': 'delete', 'errors': {'id': [archive.ARCHIVED_ERROR]}},
+        ])
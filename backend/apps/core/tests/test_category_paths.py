@@ -0,0 +1,82 @@
+"""Category path triggers from migration 0008 (PostgreSQL)"""
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from apps.core.models import Category, User
+
+
+def path_of(*categories):
+    return ''.join(f'{category.id}/' for category in categories)
+
+
+class CategoryPathTriggerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='paths', email='paths@example.com')
+        # food > groceries > produce > fruit > apples, and a separate home root
+        cls.food = cls.make('Food')
+        cls.groceries = cls.make('Groceries', cls.food)
+        cls.produce = cls.make('Produce', cls.groceries)
+        cls.fruit = cls.make('Fruit', cls.produce)
+        cls.apples = cls.make('Apples', cls.fruit)
+        cls.vegetables = cls.make('Vegetables', cls.produce)
+        cls.home = cls.make('Home')
+        cls.kitchen = cls.make('Kitchen', cls.home)
+
+    @classmethod
+    def make(cls, name, parent=None):
+        return Category.objects.create(user=cls.user, name=name, icon='x', color='#000000', parent=parent)
+
+    def paths(self):
+        return dict(Category.objects.filter(user=self.user).values_list('id', 'path'))
+
+    def assertPath(self, category, *ancestors):
+        path = self.paths()[category.id]
+        self.assertEqual(path, path_of(*ancestors, category))
+        self.assertEqual(path.count('/'), len(ancestors) + 1)
+
+    def move(self, category, parent):
+        category.parent = parent
+        category.save(update_fields=['parent'])
+
+    def test_inserts_derive_the_path_from_the_parent(self):
+        self.assertPath(self.food)
+        self.assertPath(self.groceries, self.food)
+        self.assertPath(self.produce, self.food, self.groceries)
+        self.assertPath(self.fruit, self.food, self.groceries, self.produce)
+        self.assertPath(self.apples, self.food, self.groceries, self.produce, self.fruit)
+
+    def test_moving_a_mid_level_subtree_repaths_every_descendant(self):
+        self.move(self.produce, self.kitchen)
+
+        self.assertPath(self.produce, self.home, self.kitchen)
+        self.assertPath(self.fruit, self.home, self.kitchen, self.produce)
+        self.assertPath(self.vegetables, self.home, self.kitchen, self.produce)
+        self.assertPath(self.apples, self.home, self.kitchen, self.produce, self.fruit)
+        # The old ancestors keep their own paths
+        self.assertPath(self.groceries, self.food)
+        self.assertPath(self.kitchen, self.home)
+
+    def test_moving_a_subtree_to_the_top_level(self):
+        self.move(self.groceries, None)
+
+        self.assertPath(self.groceries)
+        self.assertPath(self.produce, self.groceries)
+        self.assertPath(self.apples, self.groceries, self.produce, self.fruit)
+
+    def test_moving_a_category_under_its_own_descendant_is_rejected(self):
+        before = self.paths()
+        for descendant in (self.produce, self.apples):
+            with self.subTest(descendant=descendant.name):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    self.move(self.groceries, descendant)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.move(self.fruit, self.fruit)
+        self.assertEqual(self.paths(), before)
+
+    def test_deleting_a_parent_promotes_its_children(self):
+        self.produce.delete()
+
+        self.assertPath(self.fruit)
+        self.assertPath(self.vegetables)
+        self.assertPath(self.apples, self.fruit)
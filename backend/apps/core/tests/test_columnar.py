@@ -0,0 +1,79 @@
+"""Per-user columnar transaction cache (apps.core.columnar)"""
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.core import coalesce, columnar
+from apps.core.models import Account, Connection, Transaction, User
+
+
+class ColumnarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='columns', email='columns@example.com')
+        connection = Connection.objects.create(user=cls.user, mono_id='mono-columns', institution_name='Bank')
+        cls.account = Account.objects.create(
+            connection=connection, user=cls.user, name='Current', type='current', account_number_masked='****0001',
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(ANALYTICS_CACHE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Maps kept open by earlier tests point at other directories
+        columnar._open.clear()
+
+    def load(self):
+        """Columns from a fresh process's point of view, and how many times it queried"""
+        columnar._open.clear()
+        with mock.patch.object(columnar, '_rows', wraps=columnar._rows) as rows:
+            columns = columnar.load(self.user.id)
+        return columns, rows.call_count
+
+    def generation(self):
+        return columnar._read_meta(self.user.id)['generation']
+
+    def spend(self, amount):
+        Transaction.objects.create(
+            user=self.user, account=self.account, date=date(2024, 3, 1), description='Spend',
+            amount=Decimal(amount), type='debit',
+        )
+
+    def test_a_user_without_transactions_is_current_once_built(self):
+        columns, queries = self.load()
+        self.assertEqual((len(columns.day), queries), (0, 1))
+        generation = self.generation()
+
+        columns, queries = self.load()
+        self.assertEqual((len(columns.day), queries), (0, 0))
+
+        # A new data version with still nothing to add checks, but writes no new files
+        coalesce.data_changed(self.user.id)
+        columns, queries = self.load()
+        self.assertEqual((len(columns.day), queries), (0, 1))
+        self.assertEqual(self.generation(), generation)
+
+    def test_a_user_without_transactions_gets_their_first_ones_appended(self):
+        self.load()
+
+        self.spend(25)
+        coalesce.data_changed(self.user.id)
+        columns, queries = self.load()
+
+        self.assertEqual((columns.cents.tolist(), queries), ([2500], 1))
+        self.assertIsNotNone(columnar._read_meta(self.user.id)['watermark'])
+
+    def test_new_transactions_are_appended_after_the_watermark(self):
+        self.spend(10)
+        self.load()
+
+        self.spend(20)
+        coalesce.data_changed(self.user.id)
+        columns, queries = self.load()
+
+        self.assertEqual((sorted(columns.cents.tolist()), queries), ([1000, 2000], 1))
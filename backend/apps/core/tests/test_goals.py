@@ -0,0 +1,99 @@
+"""Goal contributions (goals.contribute, CONTRIBUTE_SQL)"""
+import threading
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.core import goals
+from apps.core.models import Goal, GoalContribution, User
+
+
+def make_goal(user, target, current=0, status='active'):
+    return Goal.objects.create(
+        user=user, name='Laptop', emoji='💻', target_amount=Decimal(target),
+        current_amount=Decimal(current), status=status,
+    )
+
+
+class ContributeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='saver', email='saver@example.com')
+        cls.other = User.objects.create(username='other', email='other@example.com')
+        cls.goal = make_goal(cls.user, 1000, current=900)
+
+    def contributions(self):
+        return list(GoalContribution.objects.order_by('created_at').values_list('goal_id', 'amount', 'date'))
+
+    def test_a_contribution_is_added_and_recorded(self):
+        result = goals.contribute(self.goal.id, self.user.id, Decimal('50'), on=date(2024, 5, 1))
+
+        self.assertEqual(result, (Decimal('950.00'), 'active'))
+        self.assertEqual(self.contributions(), [(self.goal.id, Decimal('50.00'), date(2024, 5, 1))])
+
+    def test_over_contributing_completes_the_goal_and_keeps_the_surplus(self):
+        result = goals.contribute(self.goal.id, self.user.id, Decimal('250'))
+
+        self.assertEqual(result, (Decimal('1150.00'), 'completed'))
+        self.goal.refresh_from_db()
+        self.assertEqual((self.goal.current_amount, self.goal.status), (Decimal('1150.00'), 'completed'))
+        self.assertEqual(goals.projection(self.goal)['remaining_amount'], 0.0)
+
+        # Later contributions still count and don't reopen or re-complete it
+        self.assertEqual(goals.contribute(self.goal.id, self.user.id, Decimal('10')), (Decimal('1160.00'), 'completed'))
+
+    def test_a_paused_goal_is_not_completed_by_reaching_its_target(self):
+        paused = make_goal(self.user, 100, status='paused')
+
+        self.assertEqual(goals.contribute(paused.id, self.user.id, Decimal('100')), (Decimal('100.00'), 'paused'))
+
+    def test_a_missing_or_foreign_goal_changes_nothing(self):
+        foreign = make_goal(self.other, 1000)
+        missing = Goal(user=self.user).id
+
+        for goal_id in (missing, foreign.id):
+            with self.subTest(goal_id=goal_id):
+                self.assertIsNone(goals.contribute(goal_id, self.user.id, Decimal('50')))
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.current_amount, Decimal('0.00'))
+        self.assertEqual(self.contributions(), [])
+
+
+class ConcurrentContributeTests(TransactionTestCase):
+    # Set so the flush between tests may TRUNCATE ... CASCADE, which the
+    # archive table's foreign keys need
+    available_apps = settings.INSTALLED_APPS
+    THREADS = 8
+    EACH = 5
+
+    def test_concurrent_contributions_all_count(self):
+        user = User.objects.create(username='saver', email='saver@example.com')
+        goal = make_goal(user, 300)
+        start = threading.Barrier(self.THREADS)
+        errors = []
+
+        def contribute():
+            try:
+                start.wait()
+                for _ in range(self.EACH):
+                    goals.contribute(goal.id, user.id, Decimal('10'))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=contribute) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        goal.refresh_from_db()
+        total = Decimal(10 * self.THREADS * self.EACH)
+        self.assertEqual((goal.current_amount, goal.status), (total, 'completed'))
+        self.assertEqual(GoalContribution.objects.filter(goal=goal).count(), self.THREADS * self.EACH)
+        self.assertEqual(sum(GoalContribution.objects.filter(goal=goal).values_list('amount', flat=True)), total)
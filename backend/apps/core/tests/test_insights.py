@@ -0,0 +1,67 @@
+"""Vectorized insight detectors over a chunk's series"""
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from apps.core.insights import MIN_AMOUNT, ChunkSeries, detect_budget_risk
+from apps.core.models import Account, Budget, Category, Connection, Transaction, User
+
+TODAY = date(2024, 6, 10)
+
+
+class BudgetRiskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.spender = cls.make_user('spender')
+        cls.idle = cls.make_user('idle')
+        cls.food = Category.objects.create(user=None, name='Food', icon='x', color='#000000', is_system=True)
+        cls.rent = Category.objects.create(user=None, name='Rent', icon='x', color='#000000', is_system=True)
+
+    @classmethod
+    def make_user(cls, name):
+        user = User.objects.create(username=name, email=f'{name}@example.com')
+        connection = Connection.objects.create(user=user, mono_id=f'mono-{name}', institution_name='Bank')
+        Account.objects.create(
+            connection=connection, user=user, name='Current', type='current', account_number_masked='****0001',
+        )
+        return user
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(ANALYTICS_CACHE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def budget(self, user, category, amount):
+        return Budget.objects.create(user=user, category=category, amount=Decimal(amount), period='monthly')
+
+    def spend(self, user, category, amount):
+        Transaction.objects.create(
+            user=user, account=user.accounts.get(), date=TODAY, description='Spend',
+            amount=Decimal(amount), type='debit', category=category,
+        )
+
+    def test_a_chunk_with_budgets_but_no_debits(self):
+        budgets = [self.budget(self.idle, self.food, 10000), self.budget(self.idle, self.rent, 50000)]
+        series = ChunkSeries([self.idle.id], TODAY)
+
+        self.assertEqual(series.series_keys, [])
+        self.assertEqual(detect_budget_risk(series, budgets), [])
+
+    def test_budgets_without_a_series_count_as_unspent(self):
+        over = self.budget(self.spender, self.food, 10000)
+        untouched = self.budget(self.spender, self.rent, 10000)
+        idle = self.budget(self.idle, self.food, 10000)
+        self.spend(self.spender, self.food, max(MIN_AMOUNT, 9000))
+        series = ChunkSeries([self.spender.id, self.idle.id], TODAY)
+
+        hits = detect_budget_risk(series, [untouched, idle, over])
+
+        self.assertEqual([budget for budget, *_ in hits], [over])
+        _, spent, projected, limit = hits[0]
+        self.assertEqual(spent, max(MIN_AMOUNT, 9000))
+        self.assertEqual(projected, spent / TODAY.day * 30)
+        self.assertEqual(limit, 10000)
@@ -0,0 +1,156 @@
+"""Per-account running balances (apps.core.ledger)"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.core import ledger
+from apps.core.models import Account, BalanceSnapshot, Connection, Transaction, User
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ledger', email='ledger@example.com')
+        connection = Connection.objects.create(user=cls.user, mono_id='mono-ledger', institution_name='Bank')
+        cls.account = cls.make_account(connection, 'Current', opening=1000)
+        cls.savings = cls.make_account(connection, 'Savings', opening=50)
+        for day, amount, type in [(3, 100, 'debit'), (5, 400, 'credit'), (9, 50, 'debit')]:
+            cls.make(cls.account, date(2024, 3, day), amount, type)
+        cls.make(cls.savings, date(2024, 3, 4), 25, 'credit')
+        ledger.recompute([(cls.account.id, date.min), (cls.savings.id, date.min)])
+
+    @classmethod
+    def make_account(cls, connection, name, opening):
+        return Account.objects.create(
+            connection=connection, user=cls.user, name=name, type='current',
+            account_number_masked='****0001', opening_balance=Decimal(opening),
+        )
+
+    @classmethod
+    def make(cls, account, day, amount, type='debit'):
+        return Transaction.objects.create(
+            user=cls.user, account=account, date=day, description='Entry', amount=Decimal(amount), type=type,
+        )
+
+    def ledger(self, account=None):
+        return [
+            (day, float(balance)) for day, balance in
+            Transaction.objects.filter(account=account or self.account)
+            .order_by('date', 'created_at', 'id').values_list('date', 'balance_after')
+        ]
+
+    def assertLedger(self, account=None):
+        """Stored balances match a running sum over the account's rows from its opening balance"""
+        account = Account.objects.get(pk=(account or self.account).pk)
+        balance, expected = account.opening_balance, []
+        for txn in Transaction.objects.filter(account=account).order_by('date', 'created_at', 'id'):
+            balance += txn.amount if txn.type == 'credit' else -txn.amount
+            expected.append((txn.date, float(balance)))
+        self.assertEqual(self.ledger(account), expected)
+        return expected
+
+    def test_initial_ledger(self):
+        self.assertEqual(self.assertLedger(), [
+            (date(2024, 3, 3), 900.0), (date(2024, 3, 5), 1300.0), (date(2024, 3, 9), 1250.0),
+        ])
+        self.assertEqual(self.assertLedger(self.savings), [(date(2024, 3, 4), 75.0)])
+
+    def test_an_out_of_order_insert_shifts_only_later_rows(self):
+        txn = self.make(self.account, date(2024, 3, 4), 200)
+
+        rewritten = ledger.recompute([(self.account.id, txn.date)])
+
+        # The new row and the two after it; the row on the 3rd is untouched
+        self.assertEqual(rewritten, 3)
+        self.assertEqual(self.assertLedger(), [
+            (date(2024, 3, 3), 900.0), (date(2024, 3, 4), 700.0), (date(2024, 3, 5), 1100.0), (date(2024, 3, 9), 1050.0),
+        ])
+        self.assertLedger(self.savings)
+
+    def test_inserts_on_the_same_day_follow_creation_order(self):
+        self.make(self.account, date(2024, 3, 5), 10)
+        self.make(self.account, date(2024, 3, 5), 20, 'credit')
+
+        ledger.recompute([(self.account.id, date(2024, 3, 5))])
+
+        self.assertEqual([balance for _, balance in self.assertLedger()], [900.0, 1300.0, 1290.0, 1310.0, 1260.0])
+
+    def test_editing_an_amount(self):
+        txn = Transaction.objects.get(account=self.account, date=date(2024, 3, 5))
+        txn.amount = Decimal('100')
+        txn.save()
+
+        ledger.recompute([(self.account.id, txn.date)])
+
+        self.assertEqual([balance for _, balance in self.assertLedger()], [900.0, 1000.0, 950.0])
+
+    def test_moving_a_transaction_earlier(self):
+        txn = Transaction.objects.get(account=self.account, date=date(2024, 3, 9))
+        Transaction.objects.filter(pk=txn.pk).update(date=date(2024, 3, 1))
+
+        ledger.recompute([(self.account.id, date(2024, 3, 1))])
+
+        self.assertEqual(self.assertLedger(), [
+            (date(2024, 3, 1), 950.0), (date(2024, 3, 3), 850.0), (date(2024, 3, 5), 1250.0),
+        ])
+
+    def test_deleting(self):
+        first = Transaction.objects.get(account=self.account, date=date(2024, 3, 3))
+        first.delete()
+
+        ledger.recompute([(self.account.id, first.date)])
+
+        self.assertEqual([balance for _, balance in self.assertLedger()], [1400.0, 1350.0])
+
+    def test_several_changes_recompute_from_the_earliest(self):
+        self.make(self.account, date(2024, 3, 8), 5)
+        self.make(self.account, date(2024, 3, 2), 1, 'credit')
+        self.make(self.savings, date(2024, 3, 1), 5)
+
+        ledger.recompute([
+            (self.account.id, date(2024, 3, 8)), (self.account.id, date(2024, 3, 2)), (self.savings.id, date(2024, 3, 1)),
+        ])
+
+        self.assertEqual([balance for _, balance in self.assertLedger()], [1001.0, 901.0, 1301.0, 1296.0, 1246.0])
+        self.assertEqual([balance for _, balance in self.assertLedger(self.savings)], [45.0, 70.0])
+
+    def test_snapshots_on_and_after_the_change_are_refreshed(self):
+        early = BalanceSnapshot.objects.create(account=self.account, date=date(2024, 3, 3), balance=Decimal('900'))
+        later = BalanceSnapshot.objects.create(account=self.account, date=date(2024, 3, 6), balance=Decimal('1300'))
+        self.make(self.account, date(2024, 3, 4), 200)
+
+        ledger.recompute([(self.account.id, date(2024, 3, 4))])
+
+        early.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual((early.balance, later.balance), (Decimal('900.00'), Decimal('1100.00')))
+
+    def test_align_moves_the_opening_balance_by_the_unexplained_difference(self):
+        # The bank reports 1200 today; the ledger ends at 1250
+        rewritten = ledger.align({self.account.id: Decimal('1200'), self.savings.id: Decimal('75')}, today=date(2024, 3, 20))
+
+        self.assertEqual(rewritten, 3)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).opening_balance, Decimal('950.00'))
+        self.assertEqual([balance for _, balance in self.assertLedger()], [850.0, 1250.0, 1200.0])
+        # Already in agreement, so untouched
+        self.assertEqual(Account.objects.get(pk=self.savings.pk).opening_balance, Decimal('50.00'))
+
+    def test_align_compares_against_the_balance_on_today(self):
+        # A row dated after `today` isn't part of the reported balance
+        self.make(self.account, date(2024, 3, 25), 1000)
+        ledger.recompute([(self.account.id, date(2024, 3, 25))])
+
+        ledger.align({self.account.id: Decimal('1250')}, today=date(2024, 3, 20))
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).opening_balance, Decimal('1000.00'))
+        self.assertEqual([balance for _, balance in self.assertLedger()], [900.0, 1300.0, 1250.0, 250.0])
+
+    def test_rebuild_derives_the_opening_balance_from_the_current_balance(self):
+        Account.objects.filter(pk=self.account.pk).update(balance=Decimal('2000'), opening_balance=0)
+        Transaction.objects.filter(account=self.account).update(balance_after=None)
+
+        ledger.rebuild([self.user.id])
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).opening_balance, Decimal('1750.00'))
+        self.assertEqual([balance for _, balance in self.assertLedger()], [1650.0, 2050.0, 2000.0])
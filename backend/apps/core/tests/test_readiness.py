@@ -0,0 +1,51 @@
+"""Readiness endpoint (GET ready)"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.core import readiness
+from apps.core.models import User
+
+URL = '/api/v1/ready'
+REPORT = {
+    'status': 'not_ready',
+    'pid': 4242,
+    'probe_age_seconds': 0.5,
+    'stale': False,
+    'checks': {'migrations': {'ok': False, 'pending': ['core.0016_recurring_merchant']}},
+}
+
+
+@override_settings(METRICS_TOKEN='metrics-secret')
+class ReadinessViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='ops', email='ops@example.com', is_staff=True)
+        cls.user = User.objects.create(username='member', email='member@example.com')
+
+    def get(self, state='not_ready', user=None, **headers):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        with mock.patch.object(readiness, 'readiness', return_value=(state, {**REPORT, 'status': state})):
+            return client.get(URL, **headers)
+
+    def test_anonymous_callers_only_get_the_status(self):
+        for state, code in [('ready', 200), ('degraded', 200), ('not_ready', 503)]:
+            with self.subTest(state=state):
+                response = self.get(state)
+                self.assertEqual((response.status_code, response.data), (code, {'status': state}))
+
+    def test_users_without_metrics_access_only_get_the_status(self):
+        for headers in ({'HTTP_X_METRICS_TOKEN': 'wrong'}, {}):
+            with self.subTest(headers=headers):
+                response = self.get(user=self.user, **headers)
+                self.assertEqual((response.status_code, response.data), (503, {'status': 'not_ready'}))
+
+    def test_metrics_clients_get_the_checks(self):
+        for kwargs in ({'HTTP_X_METRICS_TOKEN': 'metrics-secret'}, {'user': self.staff}):
+            with self.subTest(kwargs=kwargs):
+                response = self.get(**kwargs)
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response.data, REPORT)
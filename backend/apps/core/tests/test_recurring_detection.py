@@ -0,0 +1,59 @@
+"""Recurring series detection and saving"""
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.test import TestCase
+
+from apps.core import merchants, recurring_detection
+from apps.core.models import Account, Connection, Merchant, MerchantAlias, RecurringTransaction, Transaction, User
+
+TODAY = date(2024, 6, 20)
+
+
+class SaveSeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='recurring', email='recurring@example.com')
+        connection = Connection.objects.create(user=cls.user, mono_id='mono-recurring', institution_name='Bank')
+        cls.account = Account.objects.create(
+            connection=connection, user=cls.user, name='Current', type='current', account_number_masked='****0001',
+        )
+        cls.netflix = Merchant.objects.create(name='Netflix', key='netflix')
+        MerchantAlias.objects.create(merchant=cls.netflix, match_type='prefix', pattern='NFLX')
+        # Six monthly charges under the processor's name, linked to the canonical merchant
+        for months in range(6):
+            Transaction.objects.create(
+                user=cls.user, account=cls.account, date=TODAY - relativedelta(months=months, days=5),
+                description='NFLX.COM 4471', merchant_name='NFLX.COM', merchant=cls.netflix,
+                amount=Decimal('4400'), type='debit',
+            )
+
+    def setUp(self):
+        merchants.clear_cache()
+
+    def detect(self):
+        return list(recurring_detection.run(today=TODAY, user_ids=[self.user.id]))
+
+    def items(self):
+        return list(RecurringTransaction.objects.filter(user=self.user).values_list('name', 'merchant_id'))
+
+    def test_aliased_series_are_created_once(self):
+        [(_, found, created, _)] = self.detect()
+        self.assertEqual(len(found), 1)
+        self.assertEqual(created, 1)
+        self.assertEqual(self.items(), [('NFLX.COM', self.netflix.id)])
+
+        [(_, _, created, flagged)] = self.detect()
+        self.assertEqual((created, flagged), (0, 0))
+        self.assertEqual(len(self.items()), 1)
+
+    def test_an_item_named_after_the_merchant_is_not_duplicated(self):
+        RecurringTransaction.objects.create(
+            user=self.user, name='Netflix', amount=Decimal('4400'), frequency='monthly', next_date=TODAY,
+        )
+
+        [(_, _, created, _)] = self.detect()
+
+        self.assertEqual(created, 0)
+        self.assertEqual(self.items(), [('Netflix', self.netflix.id)])
@@ -0,0 +1,114 @@
+"""Scheduled connection syncs (apps.core.scheduler)"""
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.core import scheduler, sync
+from apps.core.models import Account, Connection, User
+
+
+class ClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='scheduled', email='scheduled@example.com')
+        now = timezone.now()
+        # Oldest due first: three at Bank A, two at Bank B, one at Bank C
+        cls.due = [
+            cls.make(institution, now - timedelta(minutes=60 - i))
+            for i, institution in enumerate(['Bank A', 'Bank A', 'Bank B', 'Bank A', 'Bank B', 'Bank C'])
+        ]
+        cls.later = cls.make('Bank C', now + timedelta(hours=1))
+        cls.reauth = cls.make('Bank C', now - timedelta(hours=2), status='reauth_required')
+
+    @classmethod
+    def make(cls, institution, next_sync_at, status='connected'):
+        count = Connection.objects.count()
+        return Connection.objects.create(
+            user=cls.user, mono_id=f'conn-{count}', institution_name=institution,
+            next_sync_at=next_sync_at, status=status,
+        )
+
+    def ids(self, claimed):
+        return [pk for pk, _ in claimed]
+
+    def test_claims_due_connections_oldest_first_within_the_institution_cap(self):
+        claimed = scheduler.claim(Counter(), limit=10, per_institution=2)
+
+        self.assertEqual(self.ids(claimed), [self.due[i].pk for i in (0, 1, 2, 4, 5)])
+        self.assertEqual(Counter(institution for _, institution in claimed), {'Bank A': 2, 'Bank B': 2, 'Bank C': 1})
+
+    def test_running_syncs_count_against_the_cap(self):
+        claimed = scheduler.claim(Counter({'Bank A': 2, 'Bank B': 1}), limit=10, per_institution=2)
+
+        self.assertEqual(self.ids(claimed), [self.due[i].pk for i in (2, 5)])
+
+    def test_the_limit_caps_the_total(self):
+        self.assertEqual(self.ids(scheduler.claim(Counter(), limit=2, per_institution=2)), [self.due[0].pk, self.due[1].pk])
+        self.assertEqual(scheduler.claim(Counter(), limit=0), [])
+
+    @override_settings(SYNC_LEASE_SECONDS=900)
+    def test_claimed_connections_are_leased_and_not_claimed_again(self):
+        before = timezone.now()
+        first = self.ids(scheduler.claim(Counter(), limit=10, per_institution=2))
+
+        leased = Connection.objects.filter(pk__in=first).values_list('next_sync_at', flat=True)
+        for next_sync_at in leased:
+            self.assertGreaterEqual(next_sync_at, before + timedelta(seconds=900))
+        # Only the one held back by the cap is left
+        self.assertEqual(self.ids(scheduler.claim(Counter(), limit=10, per_institution=2)), [self.due[3].pk])
+        self.assertEqual(scheduler.claim(Counter(), limit=10, per_institution=2), [])
+
+
+@override_settings(SYNC_RETRY_BASE_SECONDS=300, SYNC_RETRY_MAX_SECONDS=1000, SYNC_MAX_FAILURES=4)
+class SyncOneTests(TransactionTestCase):
+    # sync_one closes its connections, so it can't run inside a test transaction;
+    # available_apps lets the flush between tests cascade to the archive table
+    available_apps = settings.INSTALLED_APPS
+
+    def setUp(self):
+        user = User.objects.create(username='scheduled', email='scheduled@example.com')
+        self.connection = Connection.objects.create(user=user, mono_id='conn', institution_name='Bank A')
+        Account.objects.create(
+            connection=self.connection, user=user, name='Current', type='current', account_number_masked='****0001',
+        )
+
+    def refreshed(self):
+        return Connection.objects.get(pk=self.connection.pk)
+
+    def fail(self):
+        started = timezone.now()
+        with mock.patch.object(sync, 'run', side_effect=RuntimeError('provider timeout')):
+            self.assertFalse(scheduler.sync_one(self.connection.pk))
+        return started, self.refreshed()
+
+    def test_failures_back_off_exponentially_up_to_the_maximum(self):
+        for failures, delay in [(1, 300), (2, 600), (3, 1000)]:
+            with self.subTest(failures=failures):
+                started, connection = self.fail()
+                self.assertEqual((connection.sync_failures, connection.status), (failures, 'connected'))
+                wait = (connection.next_sync_at - started).total_seconds()
+                self.assertGreaterEqual(wait, delay * (1 - sync.JITTER) - 1)
+                self.assertLessEqual(wait, delay * (1 + sync.JITTER) + 1)
+
+    def test_too_many_failures_require_reauthorisation(self):
+        for _ in range(4):
+            _, connection = self.fail()
+
+        self.assertEqual((connection.sync_failures, connection.status), (4, 'reauth_required'))
+        Connection.objects.filter(pk=connection.pk).update(next_sync_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(scheduler.claim(Counter(), limit=10), [])
+
+    def test_a_successful_sync_clears_the_failures(self):
+        self.fail()
+        self.fail()
+
+        self.assertTrue(scheduler.sync_one(self.connection.pk))
+
+        connection = self.refreshed()
+        self.assertEqual((connection.sync_failures, connection.status), (0, 'connected'))
+        self.assertIsNotNone(connection.last_synced_at)
+        self.assertGreater(connection.next_sync_at, timezone.now())
@@ -0,0 +1,169 @@
+"""Batched transaction mutations (apps.core.batch, POST transactions/batch)"""
+import tempfile
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.core import catalog, columnar, ledger, merchants
+from apps.core.models import Account, Category, Connection, Transaction, User
+
+URL = '/api/v1/transactions/batch'
+
+
+class TransactionBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='batch', email='batch@example.com')
+        cls.other = User.objects.create(username='other', email='other@example.com')
+        cls.account = cls.make_account(cls.user, opening=1000)
+        cls.foreign_account = cls.make_account(cls.other)
+        cls.food = Category.objects.create(user=None, name='Food', icon='x', color='#000000', is_system=True)
+        cls.rent = Category.objects.create(user=None, name='Rent', icon='x', color='#000000', is_system=True)
+        cls.lunch = cls.make(cls.user, date(2024, 3, 1), 100, category=cls.food)
+        cls.taxi = cls.make(cls.user, date(2024, 3, 5), 50)
+        cls.foreign = cls.make(cls.other, date(2024, 3, 1), 10)
+
+    @classmethod
+    def make_account(cls, user, opening=0):
+        connection = Connection.objects.create(user=user, mono_id=f'mono-{user.username}', institution_name='Bank')
+        return Account.objects.create(
+            connection=connection, user=user, name='Current', type='current',
+            account_number_masked='****0001', opening_balance=Decimal(opening),
+        )
+
+    @classmethod
+    def make(cls, user, day, amount, type='debit', category=None):
+        return Transaction.objects.create(
+            user=user, account=user.accounts.get(), date=day, description='Spend',
+            amount=Decimal(amount), type=type, category=category,
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(ANALYTICS_CACHE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Rows created above, or cached by earlier tests and rolled back since,
+        # bypassed the per-process caches
+        catalog.clear_cache()
+        merchants.clear_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, *operations):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(URL, {'operations': list(operations)}, format='json')
+
+    def create(self, day, amount, type='debit', account=None):
+        return {'op': 'create', 'data': {
+            'account_id': str((account or self.account).id), 'date': day.isoformat(),
+            'description': 'Added', 'amount': str(amount), 'type': type,
+        }}
+
+    def state(self):
+        return sorted(Transaction.objects.filter(user=self.user).values_list('date', 'amount', 'category_id'))
+
+    def balances(self):
+        return list(
+            Transaction.objects.filter(account=self.account)
+            .order_by('date', 'created_at', 'id').values_list('balance_after', flat=True)
+        )
+
+    def test_every_invalid_operation_is_reported_by_index(self):
+        response = self.post(
+            {'op': 'rename', 'id': str(self.lunch.id)},
+            {'op': 'update', 'id': str(self.lunch.id), 'data': {}},
+            {'op': 'delete', 'id': 'not-a-uuid'},
+            self.create(date(2024, 3, 2), 'abc'),
+            'delete everything',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        errors = {error['index']: error for error in response.data['operations']}
+        self.assertEqual(sorted(errors), [0, 1, 2, 3, 4])
+        self.assertIn('op', errors[0]['errors'])
+        self.assertIn('non_field_errors', errors[1]['errors'])
+        self.assertIn('id', errors[2]['errors'])
+        self.assertIn('amount', errors[3]['errors'])
+        self.assertIn('op', errors[4]['errors'])
+
+    def test_ownership_and_duplicates_are_checked_before_writing(self):
+        before = self.state()
+        response = self.post(
+            self.create(date(2024, 3, 2), 20),
+            {'op': 'delete', 'id': str(self.foreign.id)},
+            {'op': 'delete', 'id': str(uuid.uuid4())},
+            self.create(date(2024, 3, 2), 20, account=self.foreign_account),
+            {'op': 'update', 'id': str(self.taxi.id), 'data': {'category_id': str(uuid.uuid4())}},
+            {'op': 'delete', 'id': str(self.taxi.id)},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['index'], sorted(error['errors'])) for error in response.data['operations']],
+            [(1, ['id']), (2, ['id']), (3, ['account_id']), (4, ['category_id']), (5, ['id'])],
+        )
+        self.assertEqual(self.state(), before)
+        self.assertTrue(Transaction.objects.filter(id=self.foreign.id).exists())
+
+    def test_a_failure_while_writing_rolls_back_the_whole_batch(self):
+        before = self.state()
+        with mock.patch('apps.core.ledger.recompute', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.post(
+                    self.create(date(2024, 3, 2), 20),
+                    {'op': 'update', 'id': str(self.lunch.id), 'data': {'category_id': str(self.rent.id)}},
+                    {'op': 'delete', 'id': str(self.taxi.id)},
+                )
+
+        self.assertEqual(self.state(), before)
+
+    def test_a_valid_batch_applies_every_operation(self):
+        response = self.post(
+            self.create(date(2024, 3, 2), 30),
+            self.create(date(2024, 2, 20), 500, type='credit'),
+            {'op': 'update', 'id': str(self.lunch.id), 'data': {'category_id': str(self.rent.id)}},
+            {'op': 'delete', 'id': str(self.taxi.id)},
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), (2, 1, 1))
+        self.assertEqual([result['index'] for result in response.data['results']], [0, 1, 2, 3])
+        self.assertEqual(response.data['results'][2]['transaction']['category_id'], self.rent.id)
+        self.assertEqual(self.state(), [
+            (date(2024, 2, 20), Decimal('500.00'), None),
+            (date(2024, 3, 1), Decimal('100.00'), self.rent.id),
+            (date(2024, 3, 2), Decimal('30.00'), None),
+        ])
+
+    def test_the_ledger_follows_creates_and_deletes(self):
+        ledger.recompute([(self.account.id, date.min)])
+        self.assertEqual(self.balances(), [Decimal('900.00'), Decimal('850.00')])
+
+        # An earlier credit shifts every later balance; the deleted debit drops out
+        self.post(
+            self.create(date(2024, 2, 20), 500, type='credit'),
+            self.create(date(2024, 3, 2), 30),
+            {'op': 'delete', 'id': str(self.taxi.id)},
+        )
+
+        self.assertEqual(self.balances(), [Decimal('1500.00'), Decimal('1400.00'), Decimal('1370.00')])
+
+    def test_analytics_columns_see_edits_and_deletes(self):
+        columns = columnar.load(self.user.id)
+        self.assertEqual(sorted(columns.cents), [5000, 10000])
+
+        self.post(
+            self.create(date(2024, 3, 2), 30),
+            {'op': 'update', 'id': str(self.lunch.id), 'data': {'category_id': str(self.rent.id)}},
+            {'op': 'delete', 'id': str(self.taxi.id)},
+        )
+
+        columns = columnar.load(self.user.id)
+        rows = sorted(zip(columns.cents.tolist(), map(columns.category_id, columns.category.tolist())))
+        self.assertEqual(rows, [(3000, None), (10000, self.rent.id)])
@@ -0,0 +1,132 @@
+"""Webhook event processing (webhooks.process_pending)"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core import sync, webhooks
+from apps.core.models import Account, Connection, User, WebhookEvent
+
+UPDATED = 'mono.events.account_updated'
+REAUTH = 'mono.events.reauthorisation_required'
+
+
+class ProcessPendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='hooks', email='hooks@example.com')
+        # Two accounts under one connection, addressed by account id; one under
+        # another, addressed by the connection's id
+        cls.joint = Connection.objects.create(user=cls.user, mono_id='conn-joint', institution_name='Bank')
+        cls.current = cls.make_account(cls.joint, 'acct-current')
+        cls.savings = cls.make_account(cls.joint, 'acct-savings')
+        cls.single = Connection.objects.create(user=cls.user, mono_id='conn-single', institution_name='Other')
+        cls.wallet = cls.make_account(cls.single, '')
+
+    @classmethod
+    def make_account(cls, connection, mono_id):
+        return Account.objects.create(
+            connection=connection, user=cls.user, mono_account_id=mono_id, name='Account', type='current',
+            account_number_masked='****0001',
+        )
+
+    def setUp(self):
+        self.received = timezone.now() - timedelta(minutes=10)
+
+    def event(self, key, event=UPDATED, balance=None):
+        account = {'_id': key}
+        if balance is not None:
+            account['balance'] = balance
+        stored = webhooks.receive({'event': event, 'data': {'account': account}})
+        # Received in the order created
+        self.received += timedelta(seconds=1)
+        WebhookEvent.objects.filter(pk=stored.pk).update(received_at=self.received)
+        return stored
+
+    def process(self, **kwargs):
+        with mock.patch.object(sync, 'run', wraps=sync.run) as run:
+            stats = webhooks.process_pending(**kwargs)
+        return stats, {call.args[0].pk: call.args[1] for call in run.call_args_list}, run.call_count
+
+    def pending(self):
+        return set(WebhookEvent.objects.filter(processed_at__isnull=True).values_list('id', flat=True))
+
+    def balance(self, account):
+        return Account.objects.get(pk=account.pk).balance
+
+    def test_a_burst_syncs_each_connection_once_with_the_newest_balances(self):
+        self.event('acct-current', balance=10000)
+        self.event('acct-savings', balance=50000)
+        self.event('acct-current', balance=12500)
+        self.event('conn-single', balance=700)
+        self.event('conn-single', event='mono.events.account_synced')
+        self.event('unknown-account', balance=1)
+
+        stats, synced, calls = self.process()
+
+        self.assertEqual(calls, 2)
+        self.assertEqual(synced, {
+            self.joint.pk: {self.current.pk: Decimal('125'), self.savings.pk: Decimal('500')},
+            self.single.pk: {self.wallet.pk: Decimal('7')},
+        })
+        self.assertEqual(stats, {'events': 6, 'synced': 2, 'reauth': 0, 'failed': 0, 'unmatched': 1})
+        self.assertEqual((self.balance(self.current), self.balance(self.savings)), (Decimal('125'), Decimal('500')))
+        self.assertEqual(self.pending(), set())
+        unmatched = WebhookEvent.objects.get(account_key='unknown-account')
+        self.assertEqual((unmatched.attempts, unmatched.error), (1, 'No account or connection has this id'))
+
+    def test_a_batch_takes_the_oldest_events(self):
+        first = [self.event('acct-current', balance=100).pk, self.event('conn-single', balance=200).pk]
+        later = self.event('acct-savings', balance=300).pk
+
+        stats, synced, _ = self.process(batch_size=2)
+
+        self.assertEqual(stats['events'], 2)
+        self.assertEqual(set(synced), {self.joint.pk, self.single.pk})
+        self.assertEqual(self.pending(), {later})
+        self.assertFalse(WebhookEvent.objects.filter(pk__in=first, processed_at__isnull=True).exists())
+
+    def test_a_newest_reauth_event_marks_the_connection_without_syncing(self):
+        self.event('acct-current', balance=100)
+        self.event('acct-savings', event=REAUTH)
+        self.event('conn-single', event=REAUTH)
+        self.event('conn-single', balance=300)
+
+        stats, synced, _ = self.process()
+
+        self.assertEqual((stats['synced'], stats['reauth']), (1, 1))
+        self.assertEqual(list(synced), [self.single.pk])
+        self.assertEqual(Connection.objects.get(pk=self.joint.pk).status, 'reauth_required')
+        self.assertEqual(self.balance(self.current), Decimal('0'))
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=3)
+    def test_failed_syncs_are_retried_up_to_the_attempt_limit(self):
+        failing = {self.event('acct-current', balance=100).pk, self.event('acct-savings', balance=200).pk}
+        healthy = self.event('conn-single', balance=300).pk
+
+        real_run = sync.run
+
+        def run(connection, *args, **kwargs):
+            if connection.pk == self.joint.pk:
+                raise RuntimeError('provider timeout')
+            return real_run(connection, *args, **kwargs)
+
+        with mock.patch.object(sync, 'run', side_effect=run):
+            stats = webhooks.process_pending()
+            self.assertEqual((stats['synced'], stats['failed']), (1, 2))
+            self.assertEqual(self.pending(), failing)
+            self.assertEqual(self.balance(self.wallet), Decimal('3'))
+            self.assertTrue(WebhookEvent.objects.get(pk=healthy).processed_at)
+
+            for _ in range(2):
+                stats = webhooks.process_pending()
+                self.assertEqual((stats['events'], stats['failed']), (2, 2))
+            # Given up after the third attempt
+            self.assertEqual(self.pending(), set())
+            self.assertEqual(webhooks.process_pending()['events'], 0)
+
+        for event in WebhookEvent.objects.filter(pk__in=failing):
+            self.assertEqual((event.attempts, event.error), (3, 'RuntimeError: provider timeout'))
+        self.assertEqual(self.balance(self.current), Decimal('0'))
@@ -0,0 +1,138 @@
+"""Per-category spending trends over the columnar cache
+
+Debits in the window are bucketed per (category, period) from the user's
+columns (apps.core.columnar) with one scatter-add. Rolling averages come
+from running sums along each category's row, and the current period's
+movers are ranked by their change on the previous one, ties sharing a rank.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from . import catalog, columnar
+from .dates import add_months, month_start
+
+PERIODS = {
+    'weekly': {'default_horizon': 12, 'max_horizon': 260},
+    'monthly': {'default_horizon': 6, 'max_horizon': 60},
+}
+
+# Extra periods read before the visible window so the first rolling averages are complete
+LOOKBACK = 5
+TOP_MOVERS = 5
+
+
+def period_window(period, horizon, today):
+    """Return (visible_start, query_start, last_period_start, end) for the trend window"""
+    if period == 'weekly':
+        current = today - timedelta(days=today.weekday())
+        visible_start = current - timedelta(weeks=horizon - 1)
+        query_start = visible_start - timedelta(weeks=LOOKBACK)
+        end = current + timedelta(weeks=1)
+    else:
+        current = month_start(today)
+        visible_start = add_months(current, -(horizon - 1))
+        query_start = add_months(visible_start, -LOOKBACK)
+        end = add_months(current, 1)
+    return visible_start, query_start, current, end
+
+
+def _change_percent(amount, previous):
+    if not previous:
+        return 100.0 if amount else 0.0
+    return round((amount - previous) / previous * 100, 1)
+
+
+def _rolling_mean(grid, window):
+    """Mean of each cell and up to window - 1 before it along the row"""
+    sums = np.cumsum(grid, axis=1)
+    before = np.zeros_like(sums)
+    before[:, window:] = sums[:, :-window]
+    return (sums - before) / np.minimum(np.arange(1, grid.shape[1] + 1), window)
+
+
+def period_grid(columns, period, query_start, current, end):
+    """(category indexes, period starts, debit cents per category and period) from query_start to current"""
+    starts = [query_start]
+    while starts[-1] < current:
+        starts.append(starts[-1] + timedelta(weeks=1) if period == 'weekly' else add_months(starts[-1], 1))
+    rows = (
+        (columns.type == columnar.DEBIT)
+        & (columns.day >= query_start.toordinal())
+        & (columns.day < end.toordinal())
+    )
+    days = columns.day[rows]
+    if period == 'weekly':
+        buckets = (days - query_start.toordinal()) // 7
+    else:
+        buckets = columnar.months(days) - columnar.month_index(query_start)
+    categories, category_rows = np.unique(columns.category[rows], return_inverse=True)
+    grid = np.zeros((len(categories), len(starts)), dtype=np.int64)
+    np.add.at(grid, (category_rows, buckets), columns.cents[rows])
+    return categories, starts, grid
+
+
+def spending_trends(user_id, period='monthly', horizon=None, today=None):
+    """Spending per category per period with rolling averages, deltas and top movers"""
+    config = PERIODS[period]
+    horizon = min(max(int(horizon or config['default_horizon']), 1), config['max_horizon'])
+    today = today or date.today()
+    visible_start, query_start, current, end = period_window(period, horizon, today)
+
+    columns = columnar.load(user_id)
+    categories, starts, grid = period_grid(columns, period, query_start, current, end)
+    amounts = grid / 100
+    averages_3, averages_6 = _rolling_mean(grid, 3) / 100, _rolling_mean(grid, 6) / 100
+    previous = np.zeros_like(amounts)
+    previous[:, 1:] = amounts[:, :-1]
+    moved = np.abs(amounts[:, -1] - previous[:, -1])
+    mover_ranks = 1 + (moved[None, :] > moved[:, None]).sum(axis=1)
+
+    known = catalog.for_user(user_id)
+    entries = [known.get(columns.category_id(index)) for index in categories]
+    order = sorted(
+        range(len(categories)),
+        key=lambda row: (entries[row] is None, entries[row].name if entries[row] else '',
+                         str(columns.category_id(categories[row]) or '')),
+    )
+    first = starts.index(visible_start)
+
+    trends = {}
+    movers = []
+    for row in order:
+        category_id = columns.category_id(categories[row])
+        key = str(category_id) if category_id else None
+        entry = entries[row]
+        series = trends[key] = {
+            'category_id': key,
+            'category_name': entry.name if entry else 'Uncategorized',
+            'category_color': entry.color if entry else None,
+            'points': [],
+        }
+        for column in range(first, len(starts)):
+            amount, before = float(amounts[row, column]), float(previous[row, column])
+            series['points'].append({
+                'period': starts[column].isoformat(),
+                'amount': amount,
+                'rolling_avg_3': round(float(averages_3[row, column]), 2),
+                'rolling_avg_6': round(float(averages_6[row, column]), 2),
+                'change': amount - before,
+                'change_percent': _change_percent(amount, before),
+            })
+        amount, before = float(amounts[row, -1]), float(previous[row, -1])
+        if mover_ranks[row] <= TOP_MOVERS and amount != before:
+            movers.append((mover_ranks[row], {
+                'category_id': key,
+                'category_name': series['category_name'],
+                'amount': amount,
+                'previous': before,
+                'change': amount - before,
+                'change_percent': _change_percent(amount, before),
+            }))
+
+    return {
+        'period': period,
+        'horizon': horizon,
+        'trends': list(trends.values()),
+        'top_movers': [mover for _, mover in sorted(movers, key=lambda item: item[0])],
+    }
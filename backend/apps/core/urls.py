@@ -5,6 +5,10 @@ from . import views
 urlpatterns = [
     # Health Check
     path('health', views.HealthCheckView.as_view()),
+    path('ready', views.ReadinessView.as_view()),
+    path('metrics/db-pool', views.DatabasePoolMetricsView.as_view()),
+    path('metrics/coalescing', views.CoalescingMetricsView.as_view()),
+    path('metrics/sync-queue', views.SyncQueueMetricsView.as_view()),
     
     # Auth
     path('auth/me', views.UserMeView.as_view()),
@@ -13,12 +17,14 @@ urlpatterns = [
     # Accounts
     path('accounts', views.AccountListView.as_view()),
     path('accounts/<uuid:pk>', views.AccountDetailView.as_view()),
+    path('accounts/<uuid:pk>/history', views.AccountHistoryView.as_view()),
     
     # Transactions
     path('transactions', views.TransactionListView.as_view()),
     path('transactions/<uuid:pk>', views.TransactionDetailView.as_view()),
     path('transactions/bulk-categorize', views.BulkCategorizeView.as_view()),
     path('transactions/manual', views.ManualTransactionView.as_view()),
+    path('transactions/batch', views.TransactionBatchView.as_view()),
     
     # Categories
     path('categories', views.CategoryListView.as_view()),
@@ -37,6 +43,7 @@ urlpatterns = [
     path('goals', views.GoalListView.as_view()),
     path('goals/<uuid:pk>', views.GoalDetailView.as_view()),
     path('goals/<uuid:pk>/contribute', views.GoalContributeView.as_view()),
+    path('goals/<uuid:pk>/history', views.GoalHistoryView.as_view()),
     
     # Recurring
     path('recurring', views.RecurringListView.as_view()),
@@ -48,6 +55,8 @@ urlpatterns = [
     path('reports/net-worth', views.NetWorthView.as_view()),
     path('reports/spending-trends', views.SpendingTrendsView.as_view()),
     path('reports/cash-flow', views.CashFlowView.as_view()),
+    path('reports/forecast', views.ForecastView.as_view()),
+    path('reports/dashboard', views.DashboardView.as_view()),
     
     # Insights
     path('insights', views.InsightListView.as_view()),
@@ -61,4 +70,7 @@ urlpatterns = [
     path('connections', views.ConnectionListView.as_view()),
     path('connections/<uuid:pk>', views.ConnectionDetailView.as_view()),
     path('connections/<uuid:pk>/sync', views.ConnectionSyncView.as_view()),
+
+    # Provider webhooks
+    path('webhooks/mono', views.MonoWebhookView.as_view()),
 ]
@@ -2,12 +2,29 @@
 from rest_framework import generics, status, views
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Sum, Count
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Count, Q, Subquery, OuterRef, DecimalField, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
-from datetime import datetime, timedelta
-from decimal import Decimal
+from django.utils.dateparse import parse_date
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import numpy as np
+import os
+from . import (
+    archive, batch, cash_flow, catalog, categories, coalesce, columnar, fx, goals, ledger, merchants, readiness,
+    recurrence, scheduler, snapshots, sync, webhooks,
+)
+from .async_views import AsyncAPIView, gather_queries
+from .dates import add_months, month_bounds, month_start
+from .db.base import pool_metrics
+from .db.replicas import ReplicaReadMixin
+from .permissions import IsMetricsClient
 from .models import *
+from .monthly_report import budget_status, monthly_report
 from .serializers import *
+from .trends import PERIODS, spending_trends
 
 
 # Health Check - Public endpoint
@@ -24,6 +41,43 @@ class HealthCheckView(views.APIView):
         })
 
 
+class ReadinessView(views.APIView):
+    """Whether this worker can serve: 200 when ready or degraded, 503 otherwise.
+    Only metrics clients see the checks behind the status.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        state, report = readiness.readiness()
+        if not IsMetricsClient().has_permission(request, self):
+            report = {'status': state}
+        return Response(report, status=503 if state == 'not_ready' else 200)
+
+
+class DatabasePoolMetricsView(views.APIView):
+    """Connection pool wait time and saturation for the worker serving the request"""
+    permission_classes = [IsMetricsClient]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'pools': pool_metrics()})
+
+
+class CoalescingMetricsView(views.APIView):
+    """Report computations run and shared by the worker serving the request"""
+    permission_classes = [IsMetricsClient]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'reports': coalesce.stats()})
+
+
+class SyncQueueMetricsView(views.APIView):
+    """Connections due for a scheduled sync and how far behind the scheduler is"""
+    permission_classes = [IsMetricsClient]
+
+    def get(self, request):
+        return Response({'syncs': scheduler.queue_stats()})
+
+
 # Auth Views
 class UserMeView(views.APIView):
     def get(self, request):
@@ -48,7 +102,7 @@ class UserMeView(views.APIView):
 
 
 # Account Views
-class AccountListView(views.APIView):
+class AccountListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         accounts = Account.objects.filter(user=request.user)
         account_type = request.query_params.get('type')
@@ -66,10 +120,33 @@ class AccountDetailView(views.APIView):
             return Response({'error': 'Not found'}, status=404)
 
 
+class AccountHistoryView(ReplicaReadMixin, views.APIView):
+    """End-of-day balances of one account over 1m, 3m, 1y or 5y, in the account's currency"""
+    def get(self, request, pk):
+        period = request.query_params.get('period', '1m')
+        if period not in snapshots.PERIODS:
+            return Response({'error': f'period must be one of {", ".join(snapshots.PERIODS)}'}, status=400)
+        days = snapshots.chart_days(period, datetime.now().date())
+        rows = snapshots.balances_on(request.user.id, days, account_id=pk)
+        if not rows:
+            return Response({'error': 'Not found'}, status=404)
+        return Response({
+            'account_id': pk,
+            'currency': rows[0][1],
+            'period': period,
+            'data_points': [{'date': day.isoformat(), 'balance': float(balance)} for _, _, day, balance in rows],
+        })
+
+
 # Transaction Views
-class TransactionListView(views.APIView):
+class TransactionListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
-        txns = Transaction.objects.filter(user=request.user)
+        try:
+            since = parse_date(request.query_params.get('from', ''))
+        except ValueError:
+            since = None
+        # Archived rows only come into play when the range reaches back to them
+        txns = archive.transactions(since).filter(user=request.user)
         
         if request.query_params.get('account_id'):
             txns = txns.filter(account_id=request.query_params['account_id'])
@@ -101,9 +178,9 @@ class TransactionListView(views.APIView):
 class TransactionDetailView(views.APIView):
     def get(self, request, pk):
         try:
-            txn = Transaction.objects.get(pk=pk, user=request.user)
+            txn = archive.transactions().get(pk=pk, user=request.user)
             return Response(TransactionSerializer(txn).data)
-        except Transaction.DoesNotExist:
+        except (Transaction.DoesNotExist, TransactionHistory.DoesNotExist):
             return Response({'error': 'Not found'}, status=404)
     
     def patch(self, request, pk):
@@ -116,8 +193,12 @@ class TransactionDetailView(views.APIView):
                     else:
                         setattr(txn, field, request.data[field])
             txn.save()
+            if 'category_id' in request.data:
+                columnar.reset(request.user.id)
             return Response(TransactionSerializer(txn).data)
         except Transaction.DoesNotExist:
+            if archive.archived(request.user.id, [pk]):
+                return Response({'error': archive.ARCHIVED_ERROR}, status=409)
             return Response({'error': 'Not found'}, status=404)
 
 
@@ -125,40 +206,84 @@ class BulkCategorizeView(views.APIView):
     def post(self, request):
         ids = request.data.get('transaction_ids', [])
         category_id = request.data.get('category_id')
+        try:
+            archived = archive.archived(request.user.id, ids)
+        except (TypeError, ValueError):
+            return Response({'error': 'transaction_ids must be a list of ids'}, status=400)
+        if archived:
+            return Response({
+                'error': 'Some transactions are archived; restore them first',
+                'archived_ids': sorted(str(pk) for pk in archived),
+            }, status=409)
         updated = Transaction.objects.filter(user=request.user, id__in=ids).update(category_id=category_id)
+        columnar.reset(request.user.id)
         return Response({'updated_count': updated})
 
 
+class TransactionBatchView(views.APIView):
+    """Create, edit and delete many transactions in one request, all or nothing"""
+
+    def post(self, request):
+        operations = request.data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'operations must be a non-empty list'}, status=400)
+        if len(operations) > batch.MAX_OPERATIONS:
+            return Response({'error': f'At most {batch.MAX_OPERATIONS} operations per batch'}, status=400)
+
+        parsed, errors = batch.validate(request.user, operations)
+        if errors:
+            return Response({'error': 'Invalid operations', 'operations': errors}, status=400)
+
+        results = batch.apply(request.user, parsed)
+        for result in results:
+            if 'transaction' in result:
+                result['transaction'] = TransactionSerializer(result['transaction']).data
+        counts = {op: sum(1 for result in results if result['op'] == op) for op in batch.OPERATIONS}
+        return Response({
+            'results': results,
+            'created': counts['create'],
+            'updated': counts['update'],
+            'deleted': counts['delete'],
+        })
+
+
 class ManualTransactionView(views.APIView):
     def post(self, request):
         data = request.data
-        txn = Transaction.objects.create(
-            user=request.user,
-            account_id=data['account_id'],
-            date=data['date'],
-            description=data['description'],
-            amount=data['amount'],
-            type=data['type'],
-            category_id=data.get('category_id'),
-            notes=data.get('notes', '')
-        )
+        with transaction.atomic():
+            txn = Transaction.objects.create(
+                user=request.user,
+                account_id=data['account_id'],
+                date=data['date'],
+                description=data['description'],
+                amount=data['amount'],
+                type=data['type'],
+                category_id=data.get('category_id'),
+                merchant_id=merchants.resolve([data['description']])[0],
+                notes=data.get('notes', '')
+            )
+            ledger.recompute([(txn.account_id, txn.date)])
         return Response(TransactionSerializer(txn).data, status=201)
 
 
 # Category Views
 class CategoryListView(views.APIView):
     def get(self, request):
-        cats = Category.objects.filter(user=request.user) | Category.objects.filter(is_system=True)
+        cats = catalog.for_user(request.user.id).entries
         return Response({'categories': CategorySerializer(cats, many=True).data})
     
     def post(self, request):
+        parent_id = request.data.get('parent_id')
+        if parent_id and not catalog.for_user(request.user.id).get(parent_id):
+            return Response({'error': 'Parent category not found'}, status=400)
         cat = Category.objects.create(
             user=request.user,
             name=request.data['name'],
             icon=request.data['icon'],
             color=request.data['color'],
-            parent_id=request.data.get('parent_id')
+            parent_id=parent_id
         )
+        catalog.changed(request.user.id)
         return Response(CategorySerializer(cat).data, status=201)
 
 
@@ -169,18 +294,32 @@ class CategoryDetailView(views.APIView):
             for field in ['name', 'icon', 'color']:
                 if field in request.data:
                     setattr(cat, field, request.data[field])
-            cat.save()
+            if 'parent_id' in request.data:
+                parent_id = request.data['parent_id']
+                if parent_id and not catalog.for_user(request.user.id).get(parent_id):
+                    return Response({'error': 'Parent category not found'}, status=400)
+                cat.parent_id = parent_id
+            try:
+                # Moving a category re-paths its whole subtree in the database
+                with transaction.atomic():
+                    cat.save()
+            except IntegrityError:
+                return Response({'error': 'A category cannot be moved under its own subcategory'}, status=400)
+            catalog.changed(request.user.id)
             return Response(CategorySerializer(cat).data)
         except Category.DoesNotExist:
             return Response({'error': 'Not found'}, status=404)
     
     def delete(self, request, pk):
         Category.objects.filter(pk=pk, user=request.user).delete()
+        catalog.changed(request.user.id)
+        # Its transactions become uncategorized
+        columnar.reset(request.user.id)
         return Response({'success': True})
 
 
 # Category Rule Views
-class CategoryRuleListView(views.APIView):
+class CategoryRuleListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         rules = CategoryRule.objects.filter(user=request.user)
         return Response({'rules': CategoryRuleSerializer(rules, many=True).data})
@@ -213,65 +352,63 @@ class CategoryRuleDetailView(views.APIView):
 
 
 # Budget Views
-class BudgetListView(views.APIView):
-    def get(self, request):
-        from django.db.models import Subquery, OuterRef, DecimalField, Value
-        from django.db.models.functions import Coalesce
-        
-        # Get current month date range
+def budget_summaries(user_id, today):
+    """Current-month spend, remaining and status for each of a user's budgets"""
+    start_of_month = today.replace(day=1)
+
+    # Calculate spent amount for each budget's category and its subcategories
+    spent_subquery = Transaction.objects.filter(
+        categories.in_subtree(OuterRef('category__path')),
+        user_id=user_id,
+        type='debit',
+        date__gte=start_of_month,
+        date__lte=today
+    ).values('user_id').annotate(
+        total=Sum('amount')
+    ).values('total')
+
+    budgets = Budget.objects.filter(user_id=user_id).annotate(
+        spent=Coalesce(Subquery(spent_subquery), Value(0), output_field=DecimalField()),
+    )
+
+    # Manually calculate remaining, percentage, status for each budget
+    known = catalog.for_user(user_id)
+    budget_data = []
+    for budget in budgets:
+        category = known.get(budget.category_id) or budget.category
+        spent = float(budget.spent or 0)
+        amount = float(budget.amount or 1)
+        remaining = amount - spent
+        percentage = (spent / amount * 100) if amount > 0 else 0
+
+        budget_data.append({
+            'id': str(budget.id),
+            'category_id': str(budget.category_id) if budget.category_id else None,
+            'category_name': category.name if category else None,
+            'category_icon': category.icon if category else None,
+            'category_color': category.color if category else None,
+            'amount': float(budget.amount),
+            'period': budget.period,
+            'spent': spent,
+            'remaining': remaining,
+            'percentage': round(percentage, 1),
+            'status': budget_status(percentage),
+            'rollover': budget.rollover,
+        })
+    return budget_data
+
+
+class BudgetListView(ReplicaReadMixin, AsyncAPIView):
+    async def get(self, request):
+        user_id = request.user.id
         today = datetime.now().date()
-        start_of_month = today.replace(day=1)
-        
-        # Calculate spent amount for each budget's category
-        spent_subquery = Transaction.objects.filter(
-            user=request.user,
-            category_id=OuterRef('category_id'),
-            type='debit',
-            date__gte=start_of_month,
-            date__lte=today
-        ).values('category_id').annotate(
-            total=Sum('amount')
-        ).values('total')
-        
-        budgets = Budget.objects.filter(user=request.user).select_related('category').annotate(
-            spent=Coalesce(Subquery(spent_subquery), Value(0), output_field=DecimalField()),
-        )
-        
-        # Manually calculate remaining, percentage, status for each budget
-        budget_data = []
-        for budget in budgets:
-            spent = float(budget.spent or 0)
-            amount = float(budget.amount or 1)
-            remaining = amount - spent
-            percentage = (spent / amount * 100) if amount > 0 else 0
-            
-            if percentage >= 100:
-                status = 'over'
-            elif percentage >= 90:
-                status = 'critical'
-            elif percentage >= 70:
-                status = 'warning'
-            else:
-                status = 'on_track'
-            
-            budget_data.append({
-                'id': str(budget.id),
-                'category_id': str(budget.category_id) if budget.category_id else None,
-                'category_name': budget.category.name if budget.category else None,
-                'category_icon': budget.category.icon if budget.category else None,
-                'category_color': budget.category.color if budget.category else None,
-                'amount': float(budget.amount),
-                'period': budget.period,
-                'spent': spent,
-                'remaining': remaining,
-                'percentage': round(percentage, 1),
-                'status': status,
-                'rollover': budget.rollover,
-            })
-        
+        budget_data, = await gather_queries(lambda: budget_summaries(user_id, today))
         return Response({'budgets': budget_data})
     
-    def post(self, request):
+    async def post(self, request):
+        return await sync_to_async(self.create)(request)
+
+    def create(self, request):
         budget = Budget.objects.create(
             user=request.user,
             category_id=request.data['category_id'],
@@ -306,15 +443,15 @@ class BudgetDetailView(views.APIView):
         return Response({'success': True})
 
 
-class BudgetProgressView(views.APIView):
+class BudgetProgressView(ReplicaReadMixin, views.APIView):
     def get(self, request, pk):
         try:
             budget = Budget.objects.get(pk=pk, user=request.user)
             today = datetime.now().date()
             start = today.replace(day=1)
             spent = Transaction.objects.filter(
-                user=request.user, category=budget.category,
-                type='debit', date__gte=start
+                categories.in_subtree(budget.category.path),
+                user=request.user, type='debit', date__gte=start
             ).aggregate(total=Sum('amount'))['total'] or 0
             return Response({
                 'spent': float(spent),
@@ -328,10 +465,14 @@ class BudgetProgressView(views.APIView):
 
 
 # Goal Views
-class GoalListView(views.APIView):
+def user_goals(user):
+    """The user's goals with contribution stats, fetched in one grouped query"""
+    return goals.with_contribution_stats(Goal.objects.filter(user=user))
+
+
+class GoalListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
-        goals = Goal.objects.filter(user=request.user)
-        return Response({'goals': GoalSerializer(goals, many=True).data})
+        return Response({'goals': GoalSerializer(user_goals(request.user), many=True).data})
     
     def post(self, request):
         goal = Goal.objects.create(
@@ -341,14 +482,13 @@ class GoalListView(views.APIView):
             target_amount=request.data['target_amount'],
             target_date=request.data.get('target_date')
         )
-        return Response(GoalSerializer(goal).data, status=201)
+        return Response(GoalSerializer(user_goals(request.user).get(pk=goal.pk)).data, status=201)
 
 
 class GoalDetailView(views.APIView):
     def get(self, request, pk):
         try:
-            goal = Goal.objects.get(pk=pk, user=request.user)
-            return Response(GoalSerializer(goal).data)
+            return Response(GoalSerializer(user_goals(request.user).get(pk=pk)).data)
         except Goal.DoesNotExist:
             return Response({'error': 'Not found'}, status=404)
     
@@ -359,7 +499,7 @@ class GoalDetailView(views.APIView):
                 if field in request.data:
                     setattr(goal, field, request.data[field])
             goal.save()
-            return Response(GoalSerializer(goal).data)
+            return Response(GoalSerializer(user_goals(request.user).get(pk=pk)).data)
         except Goal.DoesNotExist:
             return Response({'error': 'Not found'}, status=404)
     
@@ -371,20 +511,28 @@ class GoalDetailView(views.APIView):
 class GoalContributeView(views.APIView):
     def post(self, request, pk):
         try:
-            goal = Goal.objects.get(pk=pk, user=request.user)
             amount = Decimal(str(request.data['amount']))
-            GoalContribution.objects.create(goal=goal, amount=amount, date=datetime.now().date())
-            goal.current_amount += amount
-            if goal.current_amount >= goal.target_amount:
-                goal.status = 'completed'
-            goal.save()
-            return Response(GoalSerializer(goal).data)
+        except (KeyError, InvalidOperation):
+            return Response({'error': 'amount must be a number'}, status=400)
+        if not amount.is_finite() or amount <= 0:
+            return Response({'error': 'amount must be positive'}, status=400)
+        if goals.contribute(pk, request.user.id, amount) is None:
+            return Response({'error': 'Not found'}, status=404)
+        return Response(GoalSerializer(user_goals(request.user).get(pk=pk)).data)
+
+
+class GoalHistoryView(ReplicaReadMixin, views.APIView):
+    """Contributions per month, oldest first, with a running total"""
+    def get(self, request, pk):
+        try:
+            goal = Goal.objects.get(pk=pk, user=request.user)
         except Goal.DoesNotExist:
             return Response({'error': 'Not found'}, status=404)
+        return Response({'goal_id': str(goal.id), 'history': goals.contribution_history(goal)})
 
 
 # Recurring Views
-class RecurringListView(views.APIView):
+class RecurringListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         recurring = RecurringTransaction.objects.filter(user=request.user)
         return Response({'recurring': RecurringSerializer(recurring, many=True).data})
@@ -397,6 +545,7 @@ class RecurringListView(views.APIView):
             category_id = None
         if account_id == '' or account_id == 'undefined':
             account_id = None
+        start = request.data.get('start_date') or request.data.get('next_date')
             
         rec = RecurringTransaction.objects.create(
             user=request.user,
@@ -404,7 +553,8 @@ class RecurringListView(views.APIView):
             icon=request.data.get('icon', '📦'),
             amount=request.data['amount'],
             frequency=request.data['frequency'],
-            next_date=request.data.get('start_date') or request.data.get('next_date'),
+            next_date=start,
+            day_of_month=recurrence.anchor_day(start),
             category_id=category_id,
             account_id=account_id,
             reminder_days=request.data.get('reminder_days'),
@@ -430,185 +580,234 @@ class RecurringDetailView(views.APIView):
         return Response({'success': True})
 
 
-class RecurringUpcomingView(views.APIView):
-    def get(self, request):
-        upcoming = RecurringTransaction.objects.filter(
-            user=request.user, status='active',
-            next_date__lte=datetime.now().date() + timedelta(days=30)
-        ).order_by('next_date')
-        total = upcoming.aggregate(total=Sum('amount'))['total'] or 0
-        return Response({
-            'upcoming': RecurringSerializer(upcoming, many=True).data,
-            'total_due_30_days': float(total)
-        })
-
-
-# Report Views
-class MonthlyReportView(views.APIView):
+class RecurringUpcomingView(ReplicaReadMixin, views.APIView):
+    """Every occurrence due in the next 30 days, so a weekly bill counts each week"""
     def get(self, request):
-        year = int(request.query_params.get('year', datetime.now().year))
-        month = int(request.query_params.get('month', datetime.now().month))
-        
-        txns = Transaction.objects.filter(user=request.user, date__year=year, date__month=month)
-        income = txns.filter(type='credit').aggregate(total=Sum('amount'))['total'] or 0
-        expenses = txns.filter(type='debit').aggregate(total=Sum('amount'))['total'] or 0
-        
-        spending_by_cat = txns.filter(type='debit').values('category__name', 'category__color').annotate(
-            amount=Sum('amount')
-        )
-        
-        # Helper to format category spending
-        spending_formatted = []
-        for item in spending_by_cat:
-            spending_formatted.append({
-                'category_name': item['category__name'],
-                'category_color': item['category__color'],
-                'amount': float(item['amount']),
-                'percentage': float(item['amount'] / expenses * 100) if expenses > 0 else 0
+        today = datetime.now().date()
+        items = recurrence.active_items(request.user)
+        item_index, dates = recurrence.expand(items, today, today + timedelta(days=30))
+
+        due = sorted({items[i] for i in item_index.tolist()}, key=lambda item: item.next_date)
+        occurrences = []
+        total = Decimal(0)
+        for i, day in zip(item_index.tolist(), dates.astype(object)):
+            item = items[i]
+            if item.type not in recurrence.INFLOW_TYPES:
+                total += item.amount
+            occurrences.append({
+                'recurring_id': str(item.id),
+                'name': item.name,
+                'date': day.isoformat(),
+                'amount': float(item.amount),
+                'type': item.type,
             })
 
         return Response({
-            'summary': {
-                'total_income': float(income),
-                'total_expenses': float(expenses),
-                'net': float(income - expenses),
-                'savings_rate': float((income - expenses) / income * 100) if income else 0
-            },
-            'spending_by_category': spending_formatted,
-            'income_by_source': [],
-            'top_merchants': [],
-            'budget_performance': [],
-            'comparison': {'income_change_percent': 0, 'expense_change_percent': 0}
+            'upcoming': RecurringSerializer(due, many=True).data,
+            'occurrences': occurrences,
+            'total_due_30_days': float(total)
         })
 
 
-class NetWorthView(views.APIView):
-    def get(self, request):
-        accounts = Account.objects.filter(user=request.user)
-        current_net_worth = accounts.aggregate(total=Sum('balance'))['total'] or 0
-        current_net_worth = float(current_net_worth)
-        
-        # Calculate history for last 30 days
+# Report Views
+class MonthlyReportView(ReplicaReadMixin, AsyncAPIView):
+    async def get(self, request):
         today = datetime.now().date()
-        data_points = []
-        
-        # We start from current balance and work backwards
-        running_balance = current_net_worth
+        try:
+            year = int(request.query_params.get('year', today.year))
+            month = int(request.query_params.get('month', today.month))
+        except ValueError:
+            return Response({'error': 'year and month must be integers'}, status=400)
+        if not 1 <= month <= 12:
+            return Response({'error': 'month must be between 1 and 12'}, status=400)
+        # The report also covers the month before, and month_bounds the month after
+        if not date.min.year < year < date.max.year:
+            return Response({'error': f'year must be between {date.min.year + 1} and {date.max.year - 1}'}, status=400)
+        user_id = request.user.id
+        currency = request.user.currency
+        return Response(await coalesce.shared(
+            user_id, 'reports/monthly', {'year': year, 'month': month, 'currency': currency},
+            lambda: self.report(user_id, currency, year, month),
+        ))
+
+    async def report(self, user_id, currency, year, month):
+        (report,) = await gather_queries(lambda: monthly_report(user_id, currency, year, month))
+        return report
+
+
+class NetWorthView(ReplicaReadMixin, AsyncAPIView):
+    async def get(self, request):
+        period = request.query_params.get('period', '1m')
+        if period not in snapshots.PERIODS:
+            return Response({'error': f'period must be one of {", ".join(snapshots.PERIODS)}'}, status=400)
+        user_id = request.user.id
+        currency = request.user.currency
+        return Response(await coalesce.shared(
+            user_id, 'reports/net-worth', {'period': period, 'currency': currency},
+            lambda: self.report(user_id, currency, period),
+        ))
+
+    async def report(self, user_id, currency, period):
+        days = snapshots.chart_days(period, datetime.now().date())
         
-        # Add today's point
-        data_points.append({
-            'date': today.isoformat(),
-            'net_worth': running_balance
-        })
+        def daily_totals():
+            # Balances come from snapshots and convert at each day's rate
+            rows = snapshots.balances_on(user_id, days)
+            currencies = {row[1] for row in rows}
+            rates = fx.rate_table(currencies | {currency}, days[0], days[-1]) if currencies - {currency} else {}
+            totals = dict.fromkeys(days, Decimal(0))
+            for _, account_currency, day, balance in rows:
+                totals[day] += fx.convert(balance, account_currency, currency, day, rates) or 0
+            return totals
         
-        # Work backwards for 29 days
-        for i in range(1, 30):
-            day = today - timedelta(days=i)
-            # Find transactions for this specific day
-            day_txns = Transaction.objects.filter(
-                user=request.user,
-                date=day
-            )
-            
-            # Reverse the effect of transactions:
-            # - If we had income (credit), balance was LOWER before
-            # - If we had expense (debit), balance was HIGHER before
-            day_income = day_txns.filter(type='credit').aggregate(total=Sum('amount'))['total'] or 0
-            day_expense = day_txns.filter(type='debit').aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Previous Balance = Current Balance - Income + Expense
-            running_balance = running_balance - float(day_income) + float(day_expense)
-            
-            data_points.append({
-                'date': day.isoformat(),
-                'net_worth': running_balance
-            })
-            
-        # Reverse to get chronological order
-        data_points.reverse()
+        totals, unconverted = await gather_queries(daily_totals, lambda: fx.unconvertible(user_id, currency))
+        data_points = [{'date': day.isoformat(), 'net_worth': float(totals[day])} for day in days]
+        current_net_worth = data_points[-1]['net_worth']
         
-        # Calculate percent change (30 days ago vs now)
+        # Calculate percent change (start of the period vs now)
         start_balance = data_points[0]['net_worth']
         if start_balance != 0:
             change_percent = ((current_net_worth - start_balance) / start_balance) * 100
         else:
             change_percent = 100 if current_net_worth > 0 else 0
             
-        return Response({
+        return {
+            'currency': currency,
+            'unconverted_currencies': unconverted,
+            'period': period,
             'data_points': data_points,
             'current_net_worth': current_net_worth,
             'change_percent': round(change_percent, 1)
-        })
+        }
 
 
-class SpendingTrendsView(views.APIView):
+class SpendingTrendsView(ReplicaReadMixin, views.APIView):
+    """Per-category spending per week or month with rolling averages and top movers"""
     def get(self, request):
-        return Response({'trends': []})
+        period = request.query_params.get('period', 'monthly')
+        if period not in PERIODS:
+            return Response({'error': f'period must be one of {", ".join(PERIODS)}'}, status=400)
+        try:
+            horizon = int(request.query_params.get('horizon', 0)) or None
+        except ValueError:
+            return Response({'error': 'horizon must be an integer'}, status=400)
+        return Response(spending_trends(request.user.id, period=period, horizon=horizon))
 
 
-class CashFlowView(views.APIView):
+class CashFlowView(ReplicaReadMixin, AsyncAPIView):
     """Cash flow data for the last 6 months showing income vs expenses"""
-    def get(self, request):
-        from dateutil.relativedelta import relativedelta
-        
+    async def get(self, request):
         period = request.query_params.get('period', 'monthly')
-        today = datetime.now().date()
+        user_id = request.user.id
+        currency = request.user.currency
+        return Response(await coalesce.shared(
+            user_id, 'reports/cash-flow', {'period': period, 'currency': currency},
+            lambda: self.report(user_id, currency, period),
+        ))
+
+    async def report(self, user_id, currency, period):
+        starts, end, trunc, label = cash_flow.periods(period, datetime.now().date())
+        totals, unconverted = await gather_queries(lambda: {
+            row['period']: row for row in cash_flow.totals(user_id, currency, starts, end, trunc)
+        }, lambda: fx.unconvertible(user_id, currency))
+        
         cash_flow_data = []
+        for start in starts:
+            row = totals.get(start, {})
+            cash_flow_data.append({
+                'month': label(start),
+                'income': float(row.get('income') or 0),
+                'expenses': float(row.get('expenses') or 0),
+            })
         
-        if period == 'yearly':
-            # Last 5 years
-            for i in range(4, -1, -1):
-                year = today.year - i
-                start_date = datetime(year, 1, 1).date()
-                end_date = datetime(year, 12, 31).date()
-                
-                txns = Transaction.objects.filter(
-                    user=request.user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                )
-                
-                income = txns.filter(type='credit').aggregate(total=Sum('amount'))['total'] or 0
-                expenses = txns.filter(type='debit').aggregate(total=Sum('amount'))['total'] or 0
-                
-                cash_flow_data.append({
-                    'month': str(year),
-                    'income': float(income),
-                    'expenses': float(expenses),
-                })
-        else:
-            # Last 6 months (default)
-            for i in range(5, -1, -1):  # 5, 4, 3, 2, 1, 0 (oldest to newest)
-                month_date = today - relativedelta(months=i)
-                month_start = month_date.replace(day=1)
-                
-                # Get end of month
-                if month_date.month == 12:
-                    month_end = month_date.replace(year=month_date.year + 1, month=1, day=1) - timedelta(days=1)
-                else:
-                    month_end = month_date.replace(month=month_date.month + 1, day=1) - timedelta(days=1)
-                
-                # Query transactions for this month
-                txns = Transaction.objects.filter(
-                    user=request.user,
-                    date__gte=month_start,
-                    date__lte=month_end
-                )
-                
-                income = txns.filter(type='credit').aggregate(total=Sum('amount'))['total'] or 0
-                expenses = txns.filter(type='debit').aggregate(total=Sum('amount'))['total'] or 0
-                
-                cash_flow_data.append({
-                    'month': month_date.strftime('%b'),
-                    'income': float(income),
-                    'expenses': float(expenses),
-                })
+        return {'currency': currency, 'unconverted_currencies': unconverted, 'cash_flow': cash_flow_data}
+
+
+class DashboardView(ReplicaReadMixin, AsyncAPIView):
+    """Everything the dashboard shows, with the independent queries run concurrently"""
+    async def get(self, request):
+        user_id = request.user.id
+        currency = request.user.currency
+        today = datetime.now().date()
+        start, end = month_bounds(today.year, today.month)
+        amount = fx.converted(currency)
         
-        return Response({'cash_flow': cash_flow_data})
+        net_worth, month_totals, budgets, recent, insights_count, unconverted = await gather_queries(
+            lambda: Account.objects.filter(user_id=user_id).aggregate(
+                total=Sum(fx.converted_balance(currency))
+            )['total'] or 0,
+            lambda: Transaction.objects.filter(user_id=user_id, date__gte=start, date__lt=end).aggregate(
+                income=Sum(amount, filter=Q(type='credit')),
+                expenses=Sum(amount, filter=Q(type='debit')),
+            ),
+            lambda: budget_summaries(user_id, today),
+            lambda: TransactionSerializer(
+                Transaction.objects.filter(user_id=user_id)[:5], many=True
+            ).data,
+            lambda: Insight.objects.filter(user_id=user_id, dismissed=False).count(),
+            lambda: fx.unconvertible(user_id, currency),
+        )
+        income = float(month_totals['income'] or 0)
+        expenses = float(month_totals['expenses'] or 0)
+        
+        return Response({
+            'currency': currency,
+            'unconverted_currencies': unconverted,
+            'net_worth': float(net_worth),
+            'month': {'total_income': income, 'total_expenses': expenses, 'net': income - expenses},
+            'budgets': budgets,
+            'recent_transactions': recent,
+            'insights_count': insights_count,
+        })
+
+
+class ForecastView(ReplicaReadMixin, views.APIView):
+    """Projected daily balances from current account balances plus expanded recurring items"""
+    HORIZONS = (30, 90, 365)
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = None
+        if days not in self.HORIZONS:
+            return Response({'error': f'days must be one of {", ".join(map(str, self.HORIZONS))}'}, status=400)
+
+        today = datetime.now().date()
+        starting_balance = Account.objects.filter(user=request.user).aggregate(
+            total=Sum(fx.converted_balance(request.user.currency))
+        )['total'] or 0
+        items = recurrence.active_items(request.user)
+        item_index, dates = recurrence.expand(items, today + timedelta(days=1), today + timedelta(days=days))
+
+        amounts = recurrence.signed_amounts(items)[item_index] if items else np.empty(0)
+        day_offsets = (dates - np.datetime64(today, 'D')).astype(np.int64)
+        inflow = np.bincount(day_offsets, weights=np.clip(amounts, 0, None), minlength=days + 1)
+        outflow = np.bincount(day_offsets, weights=np.clip(-amounts, 0, None), minlength=days + 1)
+        balances = float(starting_balance) + np.cumsum(inflow - outflow)
+
+        data_points = [
+            {
+                'date': (today + timedelta(days=offset)).isoformat(),
+                'balance': round(float(balances[offset]), 2),
+                'inflow': float(inflow[offset]),
+                'outflow': float(outflow[offset]),
+            }
+            for offset in range(days + 1)
+        ]
+        lowest = int(np.argmin(balances))
+        return Response({
+            'days': days,
+            'unconverted_currencies': fx.unconvertible(request.user.id, request.user.currency),
+            'starting_balance': float(starting_balance),
+            'ending_balance': data_points[-1]['balance'],
+            'lowest_balance': data_points[lowest],
+            'data_points': data_points,
+        })
 
 
 # Insight Views
-class InsightListView(views.APIView):
+class InsightListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         insights = Insight.objects.filter(user=request.user, dismissed=False)
         return Response({'insights': InsightSerializer(insights, many=True).data})
@@ -621,7 +820,7 @@ class InsightDismissView(views.APIView):
 
 
 # Export Views
-class ExportListView(views.APIView):
+class ExportListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         exports = Export.objects.filter(user=request.user).order_by('-created_at')
         return Response({'exports': ExportSerializer(exports, many=True).data})
@@ -645,7 +844,7 @@ class ExportDetailView(views.APIView):
 
 
 # Connection Views
-class ConnectionListView(views.APIView):
+class ConnectionListView(ReplicaReadMixin, views.APIView):
     def get(self, request):
         conns = Connection.objects.filter(user=request.user)
         return Response({'connections': ConnectionSerializer(conns, many=True).data})
@@ -661,9 +860,30 @@ class ConnectionDetailView(views.APIView):
     
     def delete(self, request, pk):
         Connection.objects.filter(pk=pk, user=request.user).delete()
+        columnar.reset(request.user.id)
         return Response({'success': True})
 
 
 class ConnectionSyncView(views.APIView):
     def post(self, request, pk):
+        try:
+            conn = Connection.objects.get(pk=pk, user=request.user)
+        except Connection.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+        sync.run(conn)
         return Response({'job_id': 'sync-job', 'status': 'processing'})
+
+
+class MonoWebhookView(views.APIView):
+    """Mono webhook deliveries, stored for the process_webhooks worker"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        if not webhooks.verify(request.headers.get('mono-webhook-secret', '')):
+            return Response({'error': 'Invalid webhook secret'}, status=401)
+        try:
+            webhooks.receive(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({'received': True})
@@ -0,0 +1,156 @@
+"""Mono webhook ingestion
+
+The webhook endpoint only checks the secret Mono sends in the
+`mono-webhook-secret` header against MONO_WEBHOOK_SECRET and stores the
+event; it answers without touching anything else. The process_webhooks
+worker applies stored events with `process_pending`, which makes a burst
+cost one sync per connection rather than one per event:
+
+- a batch of pending events is claimed with FOR UPDATE SKIP LOCKED, so
+  several workers can share the queue and a crashed batch is retried
+- the batch is grouped by connection; each one is synced once
+  (apps.core.sync) with the newest balance reported per account, or only
+  marked `reauth_required` when its newest event asks for that
+- events for unknown accounts are closed with an error, and events whose
+  sync fails are retried on later batches up to WEBHOOK_MAX_ATTEMPTS times
+
+Events name Mono's account id. It is matched against Account.mono_account_id,
+then Connection.mono_id; a balance for a connection applies to its account
+when it has exactly one.
+"""
+import hmac
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import sync
+from .models import Account, Connection, WebhookEvent
+
+REAUTH_EVENTS = {'mono.events.reauthorisation_required'}
+BALANCE_EVENTS = {'mono.events.account_updated', 'mono.events.account_connected', 'mono.events.account_reauthorized'}
+
+
+def verify(secret):
+    """Whether `secret` is the configured webhook secret; always False when none is"""
+    expected = settings.MONO_WEBHOOK_SECRET
+    return bool(expected) and hmac.compare_digest(secret.encode(), expected.encode())
+
+
+def account_key(payload):
+    """Mono's id for the account an event is about; ValueError when there is none"""
+    if not isinstance(payload, dict) or not isinstance(payload.get('event'), str):
+        raise ValueError('Expected a JSON object with an "event"')
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else {}
+    account = data.get('account') if isinstance(data.get('account'), dict) else {}
+    key = account.get('_id') or account.get('id') or data.get('id')
+    if not isinstance(key, str) or not key:
+        raise ValueError('Event names no account')
+    return key
+
+
+def receive(payload):
+    """Store an event for the worker; ValueError when it isn't one"""
+    key = account_key(payload)
+    return WebhookEvent.objects.create(event=payload['event'][:100], account_key=key, payload=payload)
+
+
+def _balance(event):
+    """The balance an event reports, in major units; None when it has none"""
+    if event.event not in BALANCE_EVENTS:
+        return None
+    balance = ((event.payload.get('data') or {}).get('account') or {}).get('balance')
+    if isinstance(balance, bool) or not isinstance(balance, (int, float, str)):
+        return None
+    try:
+        # Mono reports amounts in kobo
+        return Decimal(str(balance)) / 100
+    except ArithmeticError:
+        return None
+
+
+def _targets(keys):
+    """{account key: (Connection, id of the account its balances apply to or None)}"""
+    targets = {}
+    for account in Account.objects.filter(mono_account_id__in=keys).select_related('connection'):
+        targets[account.mono_account_id] = (account.connection, account.id)
+    rest = set(keys) - targets.keys()
+    if rest:
+        connections = {connection.id: connection for connection in Connection.objects.filter(mono_id__in=rest)}
+        accounts = defaultdict(list)
+        for connection_id, account_id in Account.objects.filter(connection_id__in=connections).values_list(
+            'connection_id', 'id',
+        ):
+            accounts[connection_id].append(account_id)
+        for connection in connections.values():
+            only = accounts[connection.id]
+            targets[connection.mono_id] = (connection, only[0] if len(only) == 1 else None)
+    return targets
+
+
+def _apply(connection, items):
+    """Bring a connection up to date with its (event, account id) items, oldest
+    first. Returns whether it was synced.
+    """
+    if items[-1][0].event in REAUTH_EVENTS:
+        Connection.objects.filter(pk=connection.pk).update(status='reauth_required')
+        return False
+    balances = {}
+    for event, account_id in items:
+        balance = _balance(event)
+        if account_id is not None and balance is not None:
+            balances[account_id] = balance
+    sync.run(connection, balances, status='connected')
+    return True
+
+
+def process_pending(batch_size=None):
+    """Apply the oldest batch of pending events. Returns counts of events claimed,
+    connections synced or marked for reauth, and events failed or unmatched.
+    """
+    stats = {'events': 0, 'synced': 0, 'reauth': 0, 'failed': 0, 'unmatched': 0}
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True).order_by('received_at')[:batch_size or settings.WEBHOOK_BATCH_SIZE]
+        )
+        if not events:
+            return stats
+        now = timezone.now()
+        targets = _targets({event.account_key for event in events})
+        grouped, connections, unmatched = defaultdict(list), {}, []
+        for event in events:
+            if event.account_key not in targets:
+                unmatched.append(event.id)
+                continue
+            connection, account_id = targets[event.account_key]
+            connections[connection.id] = connection
+            grouped[connection.id].append((event, account_id))
+
+        done, failed = [], []
+        for connection_id, items in grouped.items():
+            ids = [event.id for event, _ in items]
+            try:
+                with transaction.atomic():
+                    synced = _apply(connections[connection_id], items)
+            except Exception as exc:
+                failed.append((ids, f'{type(exc).__name__}: {exc}'))
+                continue
+            done.extend(ids)
+            stats['synced' if synced else 'reauth'] += 1
+
+        pending = WebhookEvent.objects.filter(processed_at__isnull=True)
+        pending.filter(id__in=done).update(processed_at=now, attempts=F('attempts') + 1)
+        pending.filter(id__in=unmatched).update(
+            processed_at=now, attempts=F('attempts') + 1, error='No account or connection has this id',
+        )
+        for ids, error in failed:
+            pending.filter(id__in=ids).update(attempts=F('attempts') + 1, error=error)
+        pending.filter(id__in=[pk for ids, _ in failed for pk in ids], attempts__gte=settings.WEBHOOK_MAX_ATTEMPTS).update(
+            processed_at=now,
+        )
+    stats.update(events=len(events), failed=sum(len(ids) for ids, _ in failed), unmatched=len(unmatched))
+    return stats
@@ -0,0 +1,10 @@
+"""ASGI config for NairaTrack API."""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.prod')
+application = get_asgi_application()
+
+from apps.core import startup  # noqa: E402  (needs the app registry)
+
+startup.preload()
@@ -42,6 +42,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.db.replicas.ReplicaStickinessMiddleware',
+    'apps.core.coalesce.DataVersionMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -106,6 +108,7 @@ REST_FRAMEWORK = {
 AUTH0_DOMAIN = config('AUTH0_DOMAIN', default='dev-54nxe440ro81hlb6.us.auth0.com')
 AUTH0_API_AUDIENCE = config('AUTH0_API_AUDIENCE', default='https://personal-finance-api.namelesscompany.cc')
 AUTH0_ALGORITHMS = ['RS256']
+AUTH0_JWKS_TIMEOUT = config('AUTH0_JWKS_TIMEOUT', default=5, cast=int)
 
 # CORS
 CORS_ALLOWED_ORIGINS = config(
@@ -114,3 +117,109 @@ CORS_ALLOWED_ORIGINS = config(
     cast=lambda v: [s.strip() for s in v.split(',')]
 )
 CORS_ALLOW_CREDENTIALS = True
+
+# Transactions table partitioning (see apps.core.partitions)
+TRANSACTION_PARTITIONS_AHEAD = config('TRANSACTION_PARTITIONS_AHEAD', default=3, cast=int)
+
+# Transactions older than this many months move to transactions_archive (see apps.core.archive)
+TRANSACTION_ARCHIVE_MONTHS = config('TRANSACTION_ARCHIVE_MONTHS', default=24, cast=int)
+
+# Per-user memory-mapped transaction columns for analytics (see apps.core.columnar)
+ANALYTICS_CACHE_DIR = config('ANALYTICS_CACHE_DIR', default=str(BASE_DIR / 'analytics_cache'))
+
+# Each gunicorn worker primes its caches and DB pool before serving (see apps.core.startup),
+# waiting at most STARTUP_WARM_UP_TIMEOUT seconds for the pool to fill
+STARTUP_WARM_UP = config('STARTUP_WARM_UP', default=True, cast=bool)
+STARTUP_WARM_UP_TIMEOUT = config('STARTUP_WARM_UP_TIMEOUT', default=5, cast=float)
+
+# Mono webhooks (see apps.core.webhooks). Without a secret every delivery is refused.
+MONO_WEBHOOK_SECRET = config('MONO_WEBHOOK_SECRET', default='')
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=5000, cast=int)
+WEBHOOK_POLL_SECONDS = config('WEBHOOK_POLL_SECONDS', default=1, cast=float)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=5, cast=int)
+
+# Scheduled connection syncs (see apps.core.scheduler); concurrency caps are per scheduler process
+SYNC_MAX_CONCURRENCY = config('SYNC_MAX_CONCURRENCY', default=8, cast=int)
+SYNC_MAX_PER_INSTITUTION = config('SYNC_MAX_PER_INSTITUTION', default=2, cast=int)
+SYNC_POLL_SECONDS = config('SYNC_POLL_SECONDS', default=5, cast=float)
+SYNC_LEASE_SECONDS = config('SYNC_LEASE_SECONDS', default=900, cast=int)
+SYNC_RETRY_BASE_SECONDS = config('SYNC_RETRY_BASE_SECONDS', default=300, cast=int)
+SYNC_RETRY_MAX_SECONDS = config('SYNC_RETRY_MAX_SECONDS', default=6 * 3600, cast=int)
+SYNC_MAX_FAILURES = config('SYNC_MAX_FAILURES', default=6, cast=int)
+
+# /ready probes (see apps.core.readiness): each worker checks the database, migrations,
+# cache and job queue every READINESS_PROBE_INTERVAL seconds however often it is polled
+READINESS_PROBE_INTERVAL = config('READINESS_PROBE_INTERVAL', default=10, cast=float)
+READINESS_PROBE_TIMEOUT = config('READINESS_PROBE_TIMEOUT', default=2, cast=float)
+READINESS_MAX_JOB_AGE = config('READINESS_MAX_JOB_AGE', default=900, cast=int)
+
+# /metrics/* answer staff users, or monitoring that sends this in X-Metrics-Token
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Database connection pool (see apps.core.db). Sizes are per worker process.
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+DB_POOL_OPTIONS = {
+    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+    'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+}
+# Behind PgBouncer in transaction mode named cursors and prepared statements
+# cannot span transactions; Django already disables prepared statements for psycopg 3
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DATABASE_POOLING = {
+    'ENGINE': 'apps.core.db' if DB_POOL else 'django.db.backends.postgresql',
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': True,
+    'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+}
+
+# Read replicas (see apps.core.db.replicas). DB_REPLICA_URLS is a comma-separated
+# list of database URLs; each becomes a 'replica_<n>' alias.
+DB_REPLICA_URLS = config('DB_REPLICA_URLS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=float)
+REPLICA_CONNECT_TIMEOUT = config('REPLICA_CONNECT_TIMEOUT', default=2, cast=int)
+DATABASE_ROUTERS = ['apps.core.db.replicas.ReplicaRouter']
+
+
+def replica_database(primary, **overrides):
+    """A replica alias pooled like `primary` that fails fast when unreachable.
+
+    `overrides` are connection fields (e.g. from dj_database_url.parse);
+    engine and connection lifetime always follow the primary.
+    """
+    options = {**primary.get('OPTIONS', {}), **overrides.pop('OPTIONS', {}), 'connect_timeout': REPLICA_CONNECT_TIMEOUT}
+    if 'pool' in options:
+        options['pool'] = {**options['pool'], 'timeout': REPLICA_CONNECT_TIMEOUT}
+    for key in DATABASE_POOLING:
+        overrides.pop(key, None)
+    return {**primary, **overrides, 'OPTIONS': options, 'TEST': {'MIRROR': 'default'}}
+
+
+# Read-your-writes stickiness, category catalog versions, coalesced report
+# results and analytics cache tokens live here, so every process (web workers,
+# webhook and sync workers, jobs) must see the same cache: set REDIS_URL.
+# CACHE_BACKEND/CACHE_LOCATION override it; the locmem fallback is only
+# right for a single process such as runserver.
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.redis.RedisCache' if REDIS_URL
+            else 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': config('CACHE_LOCATION', default=REDIS_URL),
+    }
+}
+
+# Identical concurrent report requests share one computation (see apps.core.coalesce)
+REPORT_COALESCE_RESULT_SECONDS = config('REPORT_COALESCE_RESULT_SECONDS', default=5, cast=int)
+REPORT_COALESCE_WAIT_SECONDS = config('REPORT_COALESCE_WAIT_SECONDS', default=10, cast=int)
+
+# Exchange rates (see apps.core.fx): rates are stored as units per FX_BASE_CURRENCY
+FX_BASE_CURRENCY = config('FX_BASE_CURRENCY', default='USD')
+FX_CACHE_SECONDS = config('FX_CACHE_SECONDS', default=300, cast=int)
@@ -1,26 +1,39 @@
 """Development settings"""
 from .base import *
+import dj_database_url
 
 DEBUG = True
 ALLOWED_HOSTS = ['*']
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        **DATABASE_POOLING,
         'NAME': config('DB_NAME', default='nairatrack'),
         'USER': config('DB_USER', default='nairatrack'),
         'PASSWORD': config('DB_PASSWORD', default='nairatrack'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'OPTIONS': {'pool': DB_POOL_OPTIONS} if DB_POOL else {},
     }
 }
 
+# Replicas: DB_REPLICA_URLS for a real second server, or DB_SIMULATE_REPLICA to
+# add an alias on the same database with an optional fake lag in seconds
+for n, url in enumerate(DB_REPLICA_URLS, 1):
+    DATABASES[f'replica_{n}'] = replica_database(DATABASES['default'], **dj_database_url.parse(url))
+if config('DB_SIMULATE_REPLICA', default=False, cast=bool):
+    DATABASES['replica_sim'] = replica_database(
+        DATABASES['default'], SIMULATED_LAG=config('DB_SIMULATED_REPLICA_LAG', default=0, cast=float)
+    )
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
 # Allow all CORS in development
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Mono Sandbox Keys (for development)
 MONO_PUBLIC_KEY = config('MONO_PUBLIC_KEY', default='test_pk_p8ytbx827qwqxk6mdu53')
 MONO_SECRET_KEY = config('MONO_SECRET_KEY', default='test_sk_kaemd5grhs5tke3n2o2s')
+MONO_WEBHOOK_SECRET = config('MONO_WEBHOOK_SECRET', default='test_webhook_secret')
 
 # Development Authentication - Use simple session auth for testing
 # Set DEV_AUTH_BYPASS=true to bypass Auth0 and use test user
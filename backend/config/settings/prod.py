@@ -1,4 +1,6 @@
 """Production settings"""
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 import dj_database_url
 
@@ -6,8 +8,23 @@ DEBUG = False
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=lambda v: [s.strip() for s in v.split(',')])
 
 DATABASES = {
-    'default': dj_database_url.config(default=config('DATABASE_URL', default=''))
+    'default': {
+        **dj_database_url.config(default=config('DATABASE_URL', default='')),
+        **DATABASE_POOLING,
+    }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS'] = {**DATABASES['default'].get('OPTIONS', {}), 'pool': DB_POOL_OPTIONS}
+for n, url in enumerate(DB_REPLICA_URLS, 1):
+    DATABASES[f'replica_{n}'] = replica_database(DATABASES['default'], **dj_database_url.parse(url))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# Gunicorn runs several workers next to the webhook and sync workers, and they
+# coordinate through the cache, so a per-process locmem cache would be wrong.
+# The database cache is no substitute: it counts the table on every set, the
+# coalescing waiters poll it, and reads could be routed to a lagging replica.
+if CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    raise ImproperlyConfigured('Production needs a shared cache: set REDIS_URL (or CACHE_BACKEND and CACHE_LOCATION)')
 
 # Disable SSL redirect since Cloudflare handles HTTPS termination
 # The traffic from Cloudflare tunnel -> Traefik -> Django is HTTP internally
@@ -0,0 +1,19 @@
+"""gunicorn settings, read from the working directory (/app in the image)
+
+The Dockerfile's command line sets the application, bind address and worker
+count. See apps.core.startup for what preloading and warm-up do.
+"""
+import os
+
+# Import the application once in the master, before forking workers
+preload_app = True
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    from apps.core import startup
+
+    if settings.STARTUP_WARM_UP:
+        timings = startup.warm_up()
+        worker.log.info('Worker %s warmed up: %s', os.getpid(), timings)
@@ -4,6 +4,9 @@ set -e
 # Run migrations
 python manage.py migrate --noinput
 
+# Pre-create upcoming transaction partitions
+python manage.py manage_partitions
+
 # Collect static files
 python manage.py collectstatic --noinput
 